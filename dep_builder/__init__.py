@@ -5,12 +5,52 @@ Index
 .. currentmodule:: dep_builder
 .. autosummary::
     download_and_unpack
+    download
+    SourceCache
+    get_source_cache
+    prefetch
+    remove_tree
+    Cleaner
+    get_cleaner
     configure
     read_config_log
     build
+    build_all
+    load_manifest
+    Package
+    JobServer
+    get_job_count
+    BuildCache
+    get_build_cache
+    build_key
+    source_digest
+    restore_build
+    install_build
+    compiler_cache
+    find_compiler_launcher
+    compile_profile
+    capture_output
+    run_captured
+    get_autoconf_cache_file
+    toolchain_key
+    Checkpoint
+    autogen
+    autogen_key
+    BuildBackend
+    AutotoolsBackend
+    CMakeBackend
+    get_backend
+    Span
+    Tracer
+    get_tracer
+    History
+    Comparison
+    get_history
+    record_history
     parse_version
     BaseTimeLogger
     TimeLogger
+    TimeRecord
     logger
     __version__
     __version_tuple__
@@ -18,13 +58,66 @@ Index
 API
 ---
 .. autofunction:: download_and_unpack
+.. autofunction:: download
+.. autoclass:: SourceCache
+    :members: directory, max_size, lookup, insert, writer, fetch, evict, log_summary
+.. autofunction:: get_source_cache
+.. autofunction:: prefetch
+.. autofunction:: remove_tree
+.. autoclass:: Cleaner
+    :members: max_workers, remove, wait, close, log_summary
+.. autofunction:: get_cleaner
 .. autofunction:: configure
 .. autofunction:: read_config_log
 .. autofunction:: build
+.. autofunction:: build_all
+.. autofunction:: load_manifest
+.. autoclass:: Package
+    :members: name, commands, requires, compile
+.. autoclass:: JobServer
+    :members: jobs, fds, close, makeflags, env
+.. autofunction:: get_job_count
+.. autoclass:: BuildCache
+    :members: directory, max_size, lookup, restore, insert, log_summary
+.. autofunction:: get_build_cache
+.. autofunction:: build_key
+.. autofunction:: source_digest
+.. autofunction:: restore_build
+.. autofunction:: install_build
+.. autofunction:: compiler_cache
+.. autofunction:: find_compiler_launcher
+.. autofunction:: compile_profile
+.. autofunction:: capture_output
+.. autofunction:: run_captured
+.. autofunction:: get_autoconf_cache_file
+.. autofunction:: toolchain_key
+.. autoclass:: Checkpoint
+    :members: path, stages, run, clear
+.. autofunction:: autogen
+.. autofunction:: autogen_key
+.. autoclass:: BuildBackend
+    :members: name, config_logs, configure, build
+.. autoclass:: AutotoolsBackend
+.. autoclass:: CMakeBackend
+    :members: generator
+.. autofunction:: get_backend
+.. autoclass:: Span
+    :members: end
+.. autoclass:: Tracer
+    :members: spans, depth, span, add, extend, load, summary, chrome_trace, write_chrome_trace, write_summary
+.. autofunction:: get_tracer
+.. autoclass:: History
+    :members: path, append, entries, compare
+.. autoclass:: Comparison
+    :members: ratio
+.. autofunction:: get_history
+.. autofunction:: record_history
 .. autofunction:: parse_version
 .. autoclass:: BaseTimeLogger
-    :members: message, logger, write, flush
+    :members: message, logger, profile, record, write, flush
 .. autoclass:: TimeLogger
+.. autoclass:: TimeRecord
+    :members: cpu_utilization
 .. autodata:: logger
 .. autodata:: __version__
 .. autodata:: __version_tuple__
@@ -37,8 +130,27 @@ import logging
 from typing import TYPE_CHECKING
 
 from ._version import __version__, __version_tuple__
-from ._logger import logger, TimeLogger, BaseTimeLogger
+from ._logger import logger, TimeLogger, BaseTimeLogger, TimeRecord
 from ._core import download_and_unpack, configure, read_config_log, build, parse_version, unpack
+from ._download import download
+from ._cache import SourceCache, get_source_cache
+from ._prefetch import prefetch
+from ._cleanup import Cleaner, get_cleaner, remove_tree
+from ._compiler_cache import compiler_cache, find_compiler_launcher
+from ._compile_profile import compile_profile
+from ._capture import capture_output, run_captured
+from ._schedule import Package, load_manifest, build_all
+from ._jobserver import JobServer
+from ._jobs import get_job_count
+from ._build_cache import (
+    BuildCache, get_build_cache, build_key, toolchain_key, source_digest, restore_build, install_build,
+)
+from ._autoconf import get_autoconf_cache_file
+from ._checkpoint import Checkpoint
+from ._autogen import autogen, autogen_key
+from ._backend import BuildBackend, AutotoolsBackend, CMakeBackend, get_backend
+from ._trace import Span, Tracer, get_tracer
+from ._history import History, Comparison, get_history, record_history
 from . import _argparse as _argparse  # noqa: F401
 
 __all__ = [
@@ -47,12 +159,52 @@ __all__ = [
     "logger",
     "BaseTimeLogger",
     "TimeLogger",
+    "TimeRecord",
     "download_and_unpack",
     "configure",
     "read_config_log",
     "build",
     "parse_version",
     "unpack",
+    "download",
+    "SourceCache",
+    "get_source_cache",
+    "prefetch",
+    "Cleaner",
+    "get_cleaner",
+    "remove_tree",
+    "Package",
+    "load_manifest",
+    "build_all",
+    "JobServer",
+    "get_job_count",
+    "BuildCache",
+    "get_build_cache",
+    "build_key",
+    "source_digest",
+    "restore_build",
+    "install_build",
+    "compiler_cache",
+    "find_compiler_launcher",
+    "compile_profile",
+    "capture_output",
+    "run_captured",
+    "get_autoconf_cache_file",
+    "toolchain_key",
+    "Checkpoint",
+    "autogen",
+    "autogen_key",
+    "BuildBackend",
+    "AutotoolsBackend",
+    "CMakeBackend",
+    "get_backend",
+    "Span",
+    "Tracer",
+    "get_tracer",
+    "History",
+    "Comparison",
+    "get_history",
+    "record_history",
 ]
 
 # Redeclare these objects in the scope of the main namespace so they're picked
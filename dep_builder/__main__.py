@@ -0,0 +1,140 @@
+"""The :mod:`dep_builder` command line interface.
+
+Examples
+--------
+.. code-block:: bash
+
+    python -m dep_builder build-all tools/deps.toml --prefix=/usr/local --trace=trace.json
+    python -m dep_builder report --check
+
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+from collections.abc import Iterator
+
+from . import __version__, TimeLogger, load_manifest, build_all, get_tracer, History, get_history, capture_output
+from ._argparse import LicenseAction
+from ._trace import TRACE_DIR_ENV_VAR
+from ._environ import _patched_environ
+
+
+@contextlib.contextmanager
+def _trace(trace: None | str, summary: None | str) -> Iterator[None]:
+    """Context manager for collecting the spans of the current process and all its children."""
+    if trace is None and summary is None:
+        yield
+        return
+
+    with tempfile.TemporaryDirectory(prefix="dep_builder_trace-") as trace_dir:
+        try:
+            with _patched_environ(**{TRACE_DIR_ENV_VAR: trace_dir}):
+                yield
+        finally:
+            tracer = get_tracer()
+            for path in sorted(Path(trace_dir).glob("spans-*.json")):
+                tracer.load(path)
+            if trace is not None:
+                tracer.write_chrome_trace(trace)
+            if summary is not None:
+                tracer.write_summary(summary)
+
+
+def _report(history: History, window: int, threshold: float, min_ratio: float) -> bool:
+    """Print the comparison of the latest run of every package against its baseline, returning whether it regressed."""
+    comparisons = history.compare(window, threshold, min_ratio)
+    if not comparisons:
+        print(f"No packages with at least 3 successful runs in {os.fspath(history.path)!r}")
+        return False
+
+    print(f"{'package':<24} {'stage':<36} {'metric':<10} {'latest':>10} {'baseline':>20} {'change':>8}")
+    for i in sorted(comparisons, key=lambda i: (i.package, i.stage, i.metric)):
+        baseline = f"{i.mean:.2f}s ± {i.stdev:.2f}s"
+        flag = "  REGRESSION" if i.regression else ""
+        print(
+            f"{f'{i.package} {i.version}':<24} {i.stage:<36} {i.metric:<10} "
+            f"{f'{i.value:.2f}s':>10} {baseline:>20} {100 * (i.ratio - 1):>+7.0f}%{flag}"
+        )
+
+    n_regressions = sum(i.regression for i in comparisons)
+    print(f"\n{n_regressions} regression(s) against a baseline of up to {window} previous run(s)")
+    return n_regressions > 0
+
+
+def main(args: None | list[str] = None) -> None:
+    """Run the :mod:`dep_builder` command line interface."""
+    parser = argparse.ArgumentParser(prog="python -m dep_builder", description=__doc__.split("\n")[0])
+    parser.add_argument("--license", dest="license", action=LicenseAction)
+    parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_build = subparsers.add_parser(
+        "build-all", help="Install all packages from a TOML manifest, building independent packages concurrently",
+    )
+    parser_build.add_argument("manifest", help="The path to the TOML build manifest")
+    parser_build.add_argument("--prefix", default="/usr/local", help="The installation prefix")
+    parser_build.add_argument(
+        "-j", "--jobs", type=int, default=None,
+        help="The total number of CPU cores shared by all concurrent builds",
+    )
+    parser_build.add_argument(
+        "--workdir", default=".", help="The directory wherein all packages are downloaded and built",
+    )
+    parser_build.add_argument(
+        "--trace", default=None, metavar="FILE",
+        help="Write the timings of all packages and their stages as Chrome trace events (viewable in Perfetto)",
+    )
+    parser_build.add_argument(
+        "--trace-summary", default=None, metavar="FILE",
+        help="Write the timings of all packages and their stages as a flat JSON summary",
+    )
+    parser_build.add_argument(
+        "--log-dir", default=None, metavar="DIR",
+        help="Write the output of all configure and build steps to compressed log files in DIR/<package>",
+    )
+
+    parser_report = subparsers.add_parser(
+        "report", help="Compare the stage timings of the latest builds against their history",
+    )
+    parser_report.add_argument(
+        "--history", default=None, metavar="FILE",
+        help="The path to the history file; defaults to 'history.jsonl' in the cache directory",
+    )
+    parser_report.add_argument(
+        "--window", type=int, default=10, help="The maximum number of previous runs in the baseline",
+    )
+    parser_report.add_argument(
+        "--threshold", type=float, default=3.0,
+        help="The number of baseline standard deviations above which a stage is flagged",
+    )
+    parser_report.add_argument(
+        "--min-ratio", type=float, default=1.1,
+        help="The minimum ratio between the latest value and the baseline mean for a stage to be flagged",
+    )
+    parser_report.add_argument(
+        "--check", action="store_true", help="Exit with a non-zero status if any regression is found",
+    )
+
+    ns = parser.parse_args(args)
+    if ns.command == "build-all":
+        packages = load_manifest(ns.manifest, ns.prefix)
+        timer = TimeLogger(f"Build all packages from {ns.manifest!r}")
+        with _trace(ns.trace, ns.trace_summary), capture_output(ns.log_dir), timer:
+            build_all(packages, jobs=ns.jobs, workdir=ns.workdir)
+    elif ns.command == "report":
+        history = History(ns.history) if ns.history is not None else get_history()
+        if history is None:
+            parser.error("The build history is disabled; pass its path via --history")
+        regressed = _report(history, ns.window, ns.threshold, ns.min_ratio)
+        if regressed and ns.check:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Functions for sharing the autoconf cache between ``configure`` runs."""
+
+from __future__ import annotations
+
+import os
+import re
+import shutil
+import tempfile
+import contextlib
+from pathlib import Path
+from collections.abc import Iterator
+
+from . import logger
+from ._cache import get_cache_dir, _lock
+from ._build_cache import toolchain_key
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # type: ignore[assignment]
+
+__all__ = ["get_autoconf_cache_file"]
+
+#: The name of the private cache file within the build directory.
+_CACHE_NAME = "config.cache"
+
+_ENTRY_PATTERN = re.compile(r"^(\w+)=(.*)$")
+_VALUE_PATTERN = re.compile(r"^\$\{\w+='?(.*?)'?\}$")
+
+#: Prefixes of the cache variables whose negative results may change once other packages
+#: are installed (*e.g.* a missing header or library), and which are thus never shared.
+_VOLATILE_PREFIXES = ("ac_cv_header_", "ac_cv_lib_", "ac_cv_search_", "ac_cv_func_")
+
+#: Errors logged by ``configure`` if the cache is inconsistent with the current environment.
+_CACHE_ERROR_PATTERN = re.compile(
+    r"changes in the environment can compromise the build"
+    r"|(was set to|was not set in|has changed since) .*the previous run"
+    r"|rm \S*config\.cache"
+    r"|cache variable \S+ contains a newline"
+)
+
+
+def get_autoconf_cache_file() -> None | Path:
+    """Return the path to the shared autoconf cache file of the current toolchain.
+
+    The cache file is keyed by the platform, the identity of the C and C++ compilers and
+    all compiler-related environment variables (see :func:`~dep_builder.toolchain_key`),
+    so it is invalidated whenever the toolchain changes.
+
+    Returns
+    -------
+    None | pathlib.Path
+        The path to the cache file or :data:`None` if caching is disabled.
+
+    """
+    cache_dir = get_cache_dir()
+    if cache_dir is None or fcntl is None:
+        return None
+    return cache_dir / "autoconf" / f"{toolchain_key()}.cache"
+
+
+def _read_cache(path: str | os.PathLike[str]) -> dict[str, str]:
+    """Return all ``name=value`` entries of the passed autoconf cache file."""
+    ret: dict[str, str] = {}
+    with contextlib.suppress(FileNotFoundError), open(path, "r", encoding="utf8", errors="surrogateescape") as f:
+        for line in f:
+            match = _ENTRY_PATTERN.match(line.rstrip("\n"))
+            if match is not None:
+                ret[match[1]] = match[0]
+    return ret
+
+
+def _is_shareable(name: str, line: str) -> bool:
+    """Return whether the passed cache entry can be shared with other packages and runs."""
+    if not name.startswith(_VOLATILE_PREFIXES):
+        return True
+    match = _VALUE_PATTERN.match(line.split("=", 1)[1])
+    return match is None or match[1] != "no"
+
+
+def _is_cache_error(build_path: str | os.PathLike[str]) -> bool:
+    """Check whether the last ``configure`` run in ``build_path`` failed due to an inconsistent cache."""
+    try:
+        with open(os.path.join(build_path, "config.log"), "r", encoding="utf8", errors="replace") as f:
+            return any(_CACHE_ERROR_PATTERN.search(line) is not None for line in f)
+    except FileNotFoundError:
+        return False
+
+
+@contextlib.contextmanager
+def _autoconf_cache(build_path: str | os.PathLike[str]) -> Iterator[None | Path]:
+    """Context manager providing a private copy of the shared autoconf cache within ``build_path``.
+
+    New entries are merged back into the shared cache file if the context manager exits
+    successfully, holding a lock so that concurrent ``configure`` runs do not clobber each other.
+
+    """
+    shared_path = get_autoconf_cache_file()
+    if shared_path is None:
+        yield None
+        return
+
+    os.makedirs(shared_path.parent, exist_ok=True)
+    lock_path = shared_path.with_suffix(".lock")
+    private_path = Path(build_path).absolute() / _CACHE_NAME
+    with _lock(lock_path):
+        if shared_path.is_file():
+            shutil.copyfile(shared_path, private_path)
+    n_entries = len(_read_cache(private_path))
+    logger.info(f"Using the shared autoconf cache {os.fspath(shared_path)!r} ({n_entries} entries)")
+    yield private_path
+
+    with _lock(lock_path):
+        entries = _read_cache(shared_path)
+        entries.update((k, v) for k, v in _read_cache(private_path).items() if _is_shareable(k, v))
+        fd, tmp = tempfile.mkstemp(dir=shared_path.parent)
+        try:
+            with open(fd, "w", encoding="utf8", errors="surrogateescape") as f:
+                f.write("# Autoconf cache shared by all dep_builder configure runs of the same toolchain\n")
+                f.writelines(f"{line}\n" for _, line in sorted(entries.items()))
+            os.replace(tmp, shared_path)
+        finally:
+            if os.path.isfile(tmp):
+                os.remove(tmp)
@@ -0,0 +1,124 @@
+"""Functions for caching the output of autotools bootstrap scripts (*e.g.* ``autogen.sh``)."""
+
+from __future__ import annotations
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+
+from . import logger
+from ._build_cache import get_build_cache, _compiler_identity
+from ._capture import _run
+
+__all__ = ["autogen", "autogen_key"]
+
+#: The autotools executables whose version (*i.e.* the first line of ``--version``) is part of the key.
+AUTOTOOLS = ("autoconf", "automake", "libtoolize", "autopoint", "m4")
+
+#: Directories created by the autotools that are not needed for running ``configure``.
+_IGNORED_DIRS = frozenset({"autom4te.cache"})
+
+
+def autogen_key(source: str, command: str = "bash autogen.sh") -> str:
+    """Return the cache key of the autotools bootstrap output of the passed source tree.
+
+    The key is a SHA-256 digest of the source checksum, the bootstrap command and
+    the versions of all autotools executables (``autoconf``, ``automake``, ``libtoolize``, *etc.*).
+
+    Parameters
+    ----------
+    source : str
+        The SHA-256 digest of the source archive, *e.g.* as returned by :func:`~dep_builder.source_digest`.
+    command : str
+        The bootstrap command.
+
+    Returns
+    -------
+    str
+        The cache key.
+
+    """
+    data = {
+        "source": source,
+        "command": command,
+        "autotools": {name: _compiler_identity(name) for name in AUTOTOOLS},
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def _scan_tree(path: str | os.PathLike[str]) -> dict[str, tuple[int, int]]:
+    """Return the modification time and size of all files and symlinks in ``path``, keyed by their relative path."""
+    ret = {}
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames[:] = [i for i in dirnames if i not in _IGNORED_DIRS]
+        for name in [*filenames, *(i for i in dirnames if os.path.islink(os.path.join(dirpath, i)))]:
+            st = os.lstat(os.path.join(dirpath, name))
+            ret[os.path.relpath(os.path.join(dirpath, name), path)] = (st.st_mtime_ns, st.st_size)
+    return ret
+
+
+def _copy_files(src: str | os.PathLike[str], dst: str | os.PathLike[str], names: list[str]) -> None:
+    """Copy the passed relative paths from ``src`` into ``dst``, preserving symlinks."""
+    for name in names:
+        src_path = os.path.join(src, name)
+        dst_path = os.path.join(dst, name)
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        if os.path.islink(src_path):
+            os.symlink(os.readlink(src_path), dst_path)
+        else:
+            shutil.copy2(src_path, dst_path)
+
+
+def autogen(
+    src_path: str | os.PathLike[str],
+    command: str = "bash autogen.sh",
+    source: None | str = None,
+) -> None:
+    """Run the autotools bootstrap script of the passed source tree, restoring its output from the cache if possible.
+
+    All files created or modified by ``command`` (*e.g.* ``configure`` and the ``Makefile.in``
+    templates) are stored in the default :class:`~dep_builder.BuildCache` under the
+    :func:`~dep_builder.autogen_key` of the source tree. On a cache hit they are extracted
+    straight into ``src_path`` and ``command`` is not executed at all.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        >>> from dep_builder import download_and_unpack, autogen, source_digest
+
+        >>> url = "https://github.com/evaleev/libint/archive/refs/tags/v2.7.2.tar.gz"
+        >>> src_path = download_and_unpack(url)  # doctest: +SKIP
+        >>> autogen(src_path, source=source_digest(url))  # doctest: +SKIP
+
+    Parameters
+    ----------
+    src_path : str | os.PathLike[str]
+        The path to the source directory.
+    command : str
+        The bootstrap command, executed with ``src_path`` as working directory.
+    source : None | str
+        The SHA-256 digest of the source archive.
+        If :data:`None`, the output of ``command`` is not cached.
+
+    """
+    cache = get_build_cache() if source is not None else None
+    if cache is None or source is None:
+        _run(command, "autogen", cwd=src_path)
+        return
+
+    key = autogen_key(source, command)
+    if cache.restore(key, src_path):
+        return
+
+    before = _scan_tree(src_path)
+    _run(command, "autogen", cwd=src_path)
+    after = _scan_tree(src_path)
+    names = sorted(k for k, v in after.items() if before.get(k) != v)
+
+    with tempfile.TemporaryDirectory(dir=cache.directory / "tmp") as staging_dir:
+        _copy_files(src_path, staging_dir, names)
+        logger.info(f"Caching {len(names)} file(s) generated by {command!r}")
+        cache.insert(key, staging_dir)
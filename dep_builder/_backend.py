@@ -0,0 +1,398 @@
+"""Build backends for configuring, building and installing packages."""
+
+from __future__ import annotations
+
+import os
+import abc
+import json
+import stat
+import shlex
+import shutil
+import hashlib
+import operator
+import contextlib
+import subprocess
+from collections.abc import Iterable
+from typing import ClassVar
+
+from packaging.version import Version, InvalidVersion
+
+from . import logger
+from ._cache import sha256sum
+from ._schedule import JOBS_ENV_VAR
+from ._jobserver import parse_makeflags, _implicit_slot
+from ._jobs import get_job_count
+from ._autoconf import _autoconf_cache, _is_cache_error
+from ._build_cache import toolchain_key, _compiler_identity
+from ._compiler_cache import LAUNCHER_ENV_VAR, _log_stats as _log_compiler_cache_stats
+from ._compile_profile import WRAPPER_ENV_VAR, _record_invocations
+from ._capture import _run
+
+__all__ = ["BuildBackend", "AutotoolsBackend", "CMakeBackend", "get_backend"]
+
+#: The name of the file wherein the fingerprint of the ``configure`` inputs is stored.
+_FINGERPRINT_NAME = ".dep_builder_configure"
+
+#: The first Ninja version that can join a (FIFO-based) GNU make jobserver.
+NINJA_JOBSERVER_VERSION = Version("1.13")
+
+
+def _resolve_job_count(cpu_count: None | int, memory_per_job: None | int) -> int:
+    """Return the number of build jobs, determining it via :func:`get_job_count` if ``cpu_count`` is :data:`None`."""
+    if cpu_count is not None:
+        return operator.index(cpu_count)
+    max_jobs = os.environ.get(JOBS_ENV_VAR)
+    return get_job_count(memory_per_job, int(max_jobs) if max_jobs else None)
+
+
+def _fingerprint(**data: object) -> str:
+    """Return a digest of the passed configuration inputs and the toolchain."""
+    data["toolchain"] = toolchain_key()
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def _check_fingerprint(build_path: str | os.PathLike[str], fingerprint: str, marker: str) -> bool:
+    """Return whether ``build_path`` has been configured with the passed fingerprint.
+
+    The stored fingerprint is removed if it does not match, so that an interrupted
+    reconfiguration is never mistaken for a successful one.
+
+    """
+    fingerprint_path = os.path.join(build_path, _FINGERPRINT_NAME)
+    with contextlib.suppress(FileNotFoundError):
+        with open(fingerprint_path, "r") as f:
+            old_fingerprint = f.read().strip()
+        if old_fingerprint == fingerprint and os.path.isfile(os.path.join(build_path, marker)):
+            logger.info(f"Skipping configure: {os.fspath(build_path)!r} is configured with identical inputs")
+            return True
+        logger.info(f"Reconfiguring {os.fspath(build_path)!r}: the configure inputs have changed")
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(fingerprint_path)
+    return False
+
+
+def _write_fingerprint(build_path: str | os.PathLike[str], fingerprint: str) -> None:
+    with open(os.path.join(build_path, _FINGERPRINT_NAME), "w") as f:
+        f.write(f"{fingerprint}\n")
+
+
+class BuildBackend(abc.ABC):
+    """Base class for build backends, responsible for configuring, building and installing a package.
+
+    Subclasses must implement the abstract :meth:`configure` and :meth:`build` methods.
+    All backends determine the number of build jobs in the same manner
+    (see :func:`~dep_builder.get_job_count`) and log the compiler cache statistics of every build.
+    Instances, or the names of the builtin backends, can be passed to
+    :func:`~dep_builder.configure`, :func:`~dep_builder.build` and :func:`~dep_builder.read_config_log`.
+
+    """
+
+    __slots__ = ()
+
+    #: The name of the backend.
+    name: ClassVar[str]
+
+    #: The names of the configuration logs within the build directory, in order of preference.
+    config_logs: ClassVar[tuple[str, ...]] = ()
+
+    def __repr__(self) -> str:
+        """Implement :func:`repr(self) <repr>`."""
+        return f"{type(self).__name__}()"
+
+    @abc.abstractmethod
+    def configure(
+        self,
+        src_path: str | os.PathLike[str],
+        build_path: str | os.PathLike[str] = "build",
+        config_args: Iterable[str] = (),
+        *,
+        cache: bool = True,
+        incremental: bool = False,
+    ) -> None:
+        """Configure the package in ``src_path`` within ``build_path``; see :func:`~dep_builder.configure`."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def build(
+        self,
+        build_path: str | os.PathLike[str],
+        cpu_count: None | int = None,
+        *,
+        memory_per_job: None | int = None,
+        destdir: None | str | os.PathLike[str] = None,
+    ) -> None:
+        """Build and install the package configured in ``build_path``; see :func:`~dep_builder.build`."""
+        raise NotImplementedError
+
+
+class AutotoolsBackend(BuildBackend):
+    """A build backend running ``./configure``, ``make`` and ``make install``."""
+
+    __slots__ = ()
+
+    name = "autotools"
+    config_logs = ("config.log",)
+
+    def configure(
+        self,
+        src_path: str | os.PathLike[str],
+        build_path: str | os.PathLike[str] = "build",
+        config_args: Iterable[str] = (),
+        *,
+        cache: bool = True,
+        incremental: bool = False,
+    ) -> None:
+        """Run the ``configure`` executable from the passed source path; see :func:`~dep_builder.configure`."""
+        config_path = os.path.join(src_path, "configure")
+        os.chmod(config_path, stat.S_IRUSR | stat.S_IXUSR)
+        config_args = list(config_args)
+        if any(i in ("-C", "--config-cache") or i.startswith("--cache-file") for i in config_args):
+            cache = False
+
+        if incremental:
+            fingerprint = _fingerprint(config_args=config_args, configure=sha256sum(config_path))
+            if _check_fingerprint(build_path, fingerprint, "config.status"):
+                return
+
+        os.makedirs(build_path, exist_ok=incremental)
+        configured = False
+        if cache:
+            try:
+                with _autoconf_cache(build_path) as cache_file:
+                    if cache_file is not None:
+                        self._run_configure(config_path, build_path, [f"--cache-file={cache_file}", *config_args])
+                        configured = True
+            except subprocess.CalledProcessError:
+                # Only retry if the failure is due to the cache, rather than e.g. a missing library
+                if not _is_cache_error(build_path):
+                    raise
+                logger.warning("Failed to configure with the shared autoconf cache, retrying without it")
+        if not configured:
+            self._run_configure(config_path, build_path, config_args)
+
+        if incremental:
+            _write_fingerprint(build_path, fingerprint)
+
+    @staticmethod
+    def _run_configure(config_path: str, build_path: str | os.PathLike[str], config_args: list[str]) -> None:
+        cmd = " ".join([config_path, *config_args])
+        logger.info(cmd)
+        _run(cmd, "configure", cwd=build_path)
+
+    def build(
+        self,
+        build_path: str | os.PathLike[str],
+        cpu_count: None | int = None,
+        *,
+        memory_per_job: None | int = None,
+        destdir: None | str | os.PathLike[str] = None,
+    ) -> None:
+        """Build and install a package via GNU make; see :func:`~dep_builder.build`."""
+        cpu_count = _resolve_job_count(cpu_count, memory_per_job)
+        jobserver = parse_makeflags()
+        if jobserver is None:
+            cmd = f"make -j {cpu_count}"
+            pass_fds: tuple[int, ...] = ()
+        else:
+            cmd = "make"
+            pass_fds = jobserver if isinstance(jobserver, tuple) else ()
+            logger.info(f"Joining the jobserver from MAKEFLAGS={os.environ['MAKEFLAGS']!r}")
+
+        install_cmd = "make install"
+        if destdir is not None:
+            install_cmd += f" DESTDIR={shlex.quote(os.path.abspath(destdir))}"
+
+        logger.info(f"Running '{cmd} && {install_cmd}'")
+        with _implicit_slot(pass_fds):
+            with _log_compiler_cache_stats(), _record_invocations():
+                _run(cmd, "make", cwd=build_path, pass_fds=pass_fds)
+            _run(install_cmd, "make-install", cwd=build_path, pass_fds=pass_fds)
+
+
+class CMakeBackend(BuildBackend):
+    """A build backend running ``cmake``, ``cmake --build`` and ``cmake --install``.
+
+    The compiler cache and wrapper, if enabled via :func:`~dep_builder.compiler_cache` and
+    :func:`~dep_builder.compile_profile`, are passed to CMake via
+    ``CMAKE_<LANG>_COMPILER_LAUNCHER`` rather than the ``CC`` and ``CXX`` environment variables.
+    With the Makefile generator ``make`` joins the jobserver passed via ``MAKEFLAGS`` (if any),
+    as does Ninja ≥ 1.13 for FIFO-based jobservers.
+    For convenience, the autotools-style ``--prefix=PREFIX`` argument is translated
+    into ``-DCMAKE_INSTALL_PREFIX=PREFIX``.
+
+    Parameters
+    ----------
+    generator : None | str
+        The CMake generator. If :data:`None`, use ``Ninja`` if available and
+        ``Unix Makefiles`` otherwise.
+
+    """
+
+    __slots__ = ("_generator",)
+
+    name = "cmake"
+    config_logs = ("CMakeFiles/CMakeConfigureLog.yaml", "CMakeFiles/CMakeOutput.log")
+
+    @property
+    def generator(self) -> str:
+        """The CMake generator."""
+        return self._generator
+
+    def __init__(self, generator: None | str = None) -> None:
+        """Initialize the instance."""
+        if generator is None:
+            generator = "Ninja" if shutil.which("ninja") is not None else "Unix Makefiles"
+        self._generator = generator
+
+    def __repr__(self) -> str:
+        """Implement :func:`repr(self) <repr>`."""
+        return f"{type(self).__name__}(generator={self.generator!r})"
+
+    @staticmethod
+    def _launcher_env() -> tuple[dict[str, str], list[str]]:
+        """Return the environment and CMake arguments for using the active compiler wrapper and cache, if any."""
+        env = os.environ.copy()
+        launchers = [i for i in (env.get(WRAPPER_ENV_VAR), env.get(LAUNCHER_ENV_VAR)) if i]
+        if not launchers:
+            return env, []
+
+        # CMake does not support compiler launchers in `CC` and `CXX`
+        for launcher in launchers:
+            for key in ("CC", "CXX"):
+                prefix = f"{launcher} "
+                if env.get(key, "").startswith(prefix):
+                    env[key] = env[key][len(prefix):]
+        launcher_list = shlex.quote(";".join(j for i in launchers for j in shlex.split(i)))
+        args = [f"-DCMAKE_{lang}_COMPILER_LAUNCHER={launcher_list}" for lang in ("C", "CXX")]
+
+        # Only used by CMake >= 3.21
+        wrapper = env.get(WRAPPER_ENV_VAR)
+        if wrapper:
+            wrapper_list = shlex.quote(";".join(shlex.split(wrapper)))
+            args += [f"-DCMAKE_{lang}_LINKER_LAUNCHER={wrapper_list}" for lang in ("C", "CXX")]
+        return env, args
+
+    def configure(
+        self,
+        src_path: str | os.PathLike[str],
+        build_path: str | os.PathLike[str] = "build",
+        config_args: Iterable[str] = (),
+        *,
+        cache: bool = True,
+        incremental: bool = False,
+    ) -> None:
+        """Run ``cmake`` for the passed source path; see :func:`~dep_builder.configure`.
+
+        ``cache`` is ignored, CMake maintaining its own ``CMakeCache.txt`` in the build directory.
+
+        """
+        config_args = [
+            f"-DCMAKE_INSTALL_PREFIX={i[len('--prefix='):]}" if i.startswith("--prefix=") else i
+            for i in config_args
+        ]
+        env, launcher_args = self._launcher_env()
+        if incremental:
+            fingerprint = _fingerprint(config_args=config_args, generator=self.generator, launcher=launcher_args)
+            if _check_fingerprint(build_path, fingerprint, "CMakeCache.txt"):
+                return
+
+        os.makedirs(build_path, exist_ok=incremental)
+        cmd = " ".join([
+            "cmake",
+            "-S", shlex.quote(os.path.abspath(src_path)),
+            "-B", shlex.quote(os.path.abspath(build_path)),
+            "-G", shlex.quote(self.generator),
+            *launcher_args,
+            *config_args,
+        ])
+        logger.info(cmd)
+        _run(cmd, "cmake", env=env)
+
+        if incremental:
+            _write_fingerprint(build_path, fingerprint)
+
+    @staticmethod
+    def _cached_generator(build_path: str | os.PathLike[str]) -> None | str:
+        """Return the generator used for configuring ``build_path``, as recorded in ``CMakeCache.txt``."""
+        with contextlib.suppress(FileNotFoundError):
+            with open(os.path.join(build_path, "CMakeCache.txt"), "r", encoding="utf8") as f:
+                for line in f:
+                    if line.startswith("CMAKE_GENERATOR:"):
+                        return line.split("=", 1)[1].strip()
+        return None
+
+    def _join_jobserver(self, build_path: str | os.PathLike[str]) -> tuple[bool, tuple[int, ...]]:
+        """Return whether the build tool can join the jobserver from ``MAKEFLAGS`` and the file descriptors to pass."""
+        jobserver = parse_makeflags()
+        if jobserver is None:
+            return False, ()
+
+        generator = self._cached_generator(build_path) or self.generator
+        if generator.endswith("Makefiles"):
+            return True, jobserver if isinstance(jobserver, tuple) else ()
+        elif generator == "Ninja" and isinstance(jobserver, str):
+            try:
+                ninja_version = Version(_compiler_identity("ninja"))
+            except InvalidVersion:
+                return False, ()
+            return ninja_version >= NINJA_JOBSERVER_VERSION, ()
+        return False, ()
+
+    def build(
+        self,
+        build_path: str | os.PathLike[str],
+        cpu_count: None | int = None,
+        *,
+        memory_per_job: None | int = None,
+        destdir: None | str | os.PathLike[str] = None,
+    ) -> None:
+        """Build and install a package via ``cmake --build``; see :func:`~dep_builder.build`."""
+        cpu_count = _resolve_job_count(cpu_count, memory_per_job)
+        join, pass_fds = self._join_jobserver(build_path)
+        build_dir = shlex.quote(os.path.abspath(build_path))
+        if join:
+            cmd = f"cmake --build {build_dir}"
+            logger.info(f"Joining the jobserver from MAKEFLAGS={os.environ['MAKEFLAGS']!r}")
+        else:
+            cmd = f"cmake --build {build_dir} --parallel {cpu_count}"
+
+        install_cmd = f"cmake --install {build_dir}"
+        if destdir is not None:
+            install_cmd = f"DESTDIR={shlex.quote(os.path.abspath(destdir))} {install_cmd}"
+
+        logger.info(f"Running '{cmd} && {install_cmd}'")
+        with _implicit_slot(pass_fds):
+            with _log_compiler_cache_stats(), _record_invocations():
+                _run(cmd, "cmake-build", pass_fds=pass_fds)
+            _run(install_cmd, "cmake-install", pass_fds=pass_fds)
+
+
+#: The builtin build backends, keyed by their name.
+_BACKENDS: dict[str, type[BuildBackend]] = {
+    AutotoolsBackend.name: AutotoolsBackend,
+    CMakeBackend.name: CMakeBackend,
+}
+
+
+def get_backend(backend: str | BuildBackend = "autotools") -> BuildBackend:
+    """Return the build backend of the passed name.
+
+    Parameters
+    ----------
+    backend : str | dep_builder.BuildBackend
+        The name of a builtin backend (``"autotools"`` or ``"cmake"``) or a backend instance,
+        which is returned unchanged.
+
+    Returns
+    -------
+    dep_builder.BuildBackend
+        The build backend.
+
+    """
+    if isinstance(backend, BuildBackend):
+        return backend
+    try:
+        cls = _BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown build backend {backend!r}; expected one of {sorted(_BACKENDS)!r}") from None
+    return cls()
@@ -0,0 +1,367 @@
+"""A cache for installed build artifacts, keyed by the package, its sources and the toolchain."""
+
+from __future__ import annotations
+
+import os
+import json
+import shlex
+import atexit
+import hashlib
+import tarfile
+import platform
+import sysconfig
+import tempfile
+import operator
+import threading
+import subprocess
+from pathlib import Path
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+from . import logger
+from ._cache import get_cache_dir, get_source_cache, sha256sum, _evict_lru
+from ._download import _format_size
+from ._extract import extract_tar, _merge_tree
+from ._schedule import DEPENDENCIES_ENV_VAR
+
+__all__ = [
+    "BuildCache", "get_build_cache", "build_key", "toolchain_key", "source_digest", "restore_build", "install_build",
+]
+
+#: The default maximum size (in bytes) of the build cache.
+DEFAULT_MAX_SIZE = 8 * 1024**3
+
+#: Environment variables affecting the compiled output, all of which are part of the build key.
+TOOLCHAIN_ENV_VARS = (
+    "CC", "CXX", "FC", "CFLAGS", "CXXFLAGS", "CPPFLAGS", "FCFLAGS", "LDFLAGS", "LIBS",
+    "MACOSX_DEPLOYMENT_TARGET",
+)
+
+#: The compiler environment variables and their defaults.
+#: The identity of the compilers (*i.e.* the first line of ``--version``) is part of the build key.
+_COMPILERS = {"CC": "cc", "CXX": "c++"}
+
+#: The name of the top-level directory in all snapshots.
+_SNAPSHOT_ROOT = "root"
+
+
+def _compiler_identity(compiler: str) -> str:
+    """Return the first line of the ``--version`` output of the passed compiler."""
+    try:
+        output = subprocess.run(
+            [*shlex.split(compiler), "--version"], capture_output=True, text=True, check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+    return output.strip().split("\n")[0]
+
+
+def _platform_tag() -> str:
+    """Return a tag identifying the platform, including the C library for Linux."""
+    libc, libc_version = platform.libc_ver()
+    return f"{sysconfig.get_platform()}-{libc}{libc_version}"
+
+
+def build_key(
+    name: str,
+    version: str,
+    source: str,
+    config_args: Iterable[str] = (),
+    dependencies: None | Mapping[str, str] = None,
+) -> str:
+    """Return the build cache key of the passed package.
+
+    The key is a SHA-256 digest of the package name and version, the source checksum,
+    the ``configure`` arguments, the keys of all packages it is built against,
+    the platform tag, the identity of the C and C++ compilers
+    and all compiler-related environment variables (``CC``, ``CFLAGS``, ``LDFLAGS``, *etc.*).
+
+    Parameters
+    ----------
+    name : str
+        The name of the package.
+    version : str
+        The version of the package.
+    source : str
+        The SHA-256 digest of the source archive, *e.g.* as returned by :func:`~dep_builder.source_digest`.
+    config_args : Iterable[str]
+        The arguments passed to the ``configure`` executable.
+    dependencies : None | Mapping[str, str]
+        A mapping with the names and keys of all packages this package is built against,
+        so that it is rebuilt whenever any of them changes. If :data:`None`, use those passed
+        by :func:`~dep_builder.build_all` via the ``DEP_BUILDER_DEPENDENCIES`` environment variable
+        (*i.e.* the ``requires`` of the package in the build manifest), if any.
+
+    Returns
+    -------
+    str
+        The build key.
+
+    """
+    if dependencies is None:
+        dependencies = json.loads(os.environ.get(DEPENDENCIES_ENV_VAR) or "{}")
+    data = {
+        "name": name,
+        "version": version,
+        "source": source,
+        "config_args": list(config_args),
+        "dependencies": dict(dependencies),
+        **_toolchain_info(),
+    }
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def _toolchain_info() -> dict[str, Any]:
+    """Return the platform tag, compiler identities and compiler-related environment variables."""
+    environ = {k: os.environ.get(k, "") for k in TOOLCHAIN_ENV_VARS}
+    compilers = {k: _compiler_identity(environ[k] or default) for k, default in _COMPILERS.items()}
+    return {"platform": _platform_tag(), "compilers": compilers, "environ": environ}
+
+
+def toolchain_key() -> str:
+    """Return a SHA-256 digest identifying the platform and compiler toolchain.
+
+    Returns
+    -------
+    str
+        The digest of the platform tag, the identity of the C and C++ compilers
+        and all compiler-related environment variables.
+
+    """
+    return hashlib.sha256(json.dumps(_toolchain_info(), sort_keys=True).encode()).hexdigest()
+
+
+def source_digest(url_or_path: str | os.PathLike[str]) -> str:
+    """Return the SHA-256 digest of the source archive at the passed URL or path.
+
+    URLs are resolved via the default :class:`~dep_builder.SourceCache`, downloading the
+    archive on a cache miss (so it is available for the subsequent
+    :func:`~dep_builder.download_and_unpack` call). If caching is disabled,
+    the URL itself is returned.
+
+    Parameters
+    ----------
+    url_or_path : str | os.PathLike[str]
+        The URL of the archive or the path to a local archive.
+
+    Returns
+    -------
+    str
+        The SHA-256 digest of the archive.
+
+    """
+    if os.path.isfile(url_or_path):
+        return sha256sum(url_or_path)
+
+    url = os.fspath(url_or_path)
+    cache = get_source_cache()
+    if cache is None:
+        return url
+    return cache.fetch(url).name
+
+
+class BuildCache:
+    """A cache of compressed snapshots of installed packages with least-recently-used eviction.
+
+    A snapshot contains all files installed by ``make install DESTDIR=...``, stored under the
+    build key of the package (see :func:`~dep_builder.build_key`). On a cache hit the snapshot is
+    extracted into the root directory, thus skipping ``configure``, ``make`` and ``make install``.
+
+    Parameters
+    ----------
+    directory : str | os.PathLike[str]
+        The cache directory. Will be created if it does not exist yet.
+    max_size : int
+        The maximum total size (in bytes) of all snapshots.
+        The least recently used snapshots are evicted once it is exceeded.
+
+    """
+
+    __slots__ = ("_directory", "_max_size", "_lock", "hits", "misses")
+
+    @property
+    def directory(self) -> Path:
+        """The cache directory."""
+        return self._directory
+
+    @property
+    def max_size(self) -> int:
+        """The maximum total size (in bytes) of all snapshots."""
+        return self._max_size
+
+    def __init__(self, directory: str | os.PathLike[str], max_size: int = DEFAULT_MAX_SIZE) -> None:
+        """Initialize the instance."""
+        self._directory = Path(directory).absolute()
+        self._max_size = operator.index(max_size)
+        self._lock = threading.Lock()
+
+        #: The number of cache hits.
+        self.hits = 0
+        #: The number of cache misses.
+        self.misses = 0
+
+        for name in ("objects", "tmp"):
+            os.makedirs(self._directory / name, exist_ok=True)
+
+    def __repr__(self) -> str:
+        """Implement :func:`repr(self) <repr>`."""
+        cls = type(self)
+        return f"{cls.__name__}(directory={os.fspath(self.directory)!r}, max_size={self.max_size!r})"
+
+    def _object_path(self, key: str) -> Path:
+        return self._directory / "objects" / f"{key}.tar.gz"
+
+    def lookup(self, key: str) -> None | Path:
+        """Return the path to the snapshot of ``key`` or :data:`None` if it is absent.
+
+        Parameters
+        ----------
+        key : str
+            The build key.
+
+        Returns
+        -------
+        None | pathlib.Path
+            The path to the snapshot, if present.
+
+        """
+        path = self._object_path(key)
+        with self._lock:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return path
+
+    def restore(self, key: str, root: str | os.PathLike[str] = os.sep) -> bool:
+        """Extract the snapshot of ``key`` into ``root``, if present.
+
+        Parameters
+        ----------
+        key : str
+            The build key.
+        root : str | os.PathLike[str]
+            The root directory wherein the snapshot is extracted.
+
+        Returns
+        -------
+        bool
+            Whether the snapshot was present and has been restored.
+
+        """
+        path = self.lookup(key)
+        if path is None:
+            logger.info(f"No cached build found for {key!r}")
+            return False
+
+        logger.info(f"Restoring cached build {os.fspath(path)!r} into {os.fspath(root)!r}")
+        extract_tar(path, root, strip_root=True)
+        return True
+
+    def insert(self, key: str, staging_dir: str | os.PathLike[str]) -> Path:
+        """Store a compressed snapshot of ``staging_dir`` under ``key``.
+
+        Parameters
+        ----------
+        key : str
+            The build key.
+        staging_dir : str | os.PathLike[str]
+            The ``DESTDIR`` wherein the package has been installed.
+
+        Returns
+        -------
+        pathlib.Path
+            The path to the snapshot.
+
+        """
+        ret = self._object_path(key)
+        fd, tmp = tempfile.mkstemp(dir=self._directory / "tmp")
+        try:
+            with open(fd, "wb") as f, tarfile.open(fileobj=f, mode="w:gz", compresslevel=6) as tar:
+                tar.add(staging_dir, arcname=_SNAPSHOT_ROOT)
+            os.replace(tmp, ret)
+        finally:
+            if os.path.isfile(tmp):
+                os.remove(tmp)
+
+        logger.info(f"Stored build snapshot {os.fspath(ret)!r} ({_format_size(os.stat(ret).st_size)})")
+        _evict_lru(self._directory / "objects", self._max_size, ret, "build cache")
+        return ret
+
+    def log_summary(self) -> None:
+        """Log the number of cache hits and misses."""
+        logger.info(f"Build cache: {self.hits} hit(s), {self.misses} miss(es)")
+
+
+_BUILD_CACHE: None | BuildCache = None
+_BUILD_CACHE_LOCK = threading.Lock()
+
+
+def get_build_cache() -> None | BuildCache:
+    """Return the default :class:`BuildCache`.
+
+    It is located in the ``builds`` subdirectory of the source cache's parent directory
+    (see :func:`~dep_builder.get_source_cache`) and its size is set via the
+    ``DEP_BUILDER_BUILD_CACHE_SIZE`` environment variable, defaulting to 8 GiB.
+    Setting ``DEP_BUILDER_CACHE_DIR`` to an empty string disables the cache.
+
+    Returns
+    -------
+    None | dep_builder.BuildCache
+        The default build cache or :data:`None` if caching is disabled.
+
+    """
+    global _BUILD_CACHE
+    with _BUILD_CACHE_LOCK:
+        if _BUILD_CACHE is not None:
+            return _BUILD_CACHE
+
+        directory = get_cache_dir()
+        if directory is None:
+            return None
+        max_size = int(os.environ.get("DEP_BUILDER_BUILD_CACHE_SIZE", DEFAULT_MAX_SIZE))
+        _BUILD_CACHE = cache = BuildCache(directory / "builds", max_size)
+        atexit.register(lambda: cache.log_summary() if cache.hits or cache.misses else None)
+        return cache
+
+
+def restore_build(key: str, root: str | os.PathLike[str] = os.sep) -> bool:
+    """Restore the cached build of ``key`` from the default :class:`BuildCache`, if present.
+
+    Parameters
+    ----------
+    key : str
+        The build key.
+    root : str | os.PathLike[str]
+        The root directory wherein the snapshot is extracted.
+
+    Returns
+    -------
+    bool
+        Whether the build has been restored. Always :data:`False` if caching is disabled.
+
+    """
+    cache = get_build_cache()
+    return cache is not None and cache.restore(key, root)
+
+
+def install_build(key: str, staging_dir: str | os.PathLike[str], root: str | os.PathLike[str] = os.sep) -> None:
+    """Install the staged build in ``staging_dir`` into ``root``, storing it in the default :class:`BuildCache`.
+
+    Parameters
+    ----------
+    key : str
+        The build key.
+    staging_dir : str | os.PathLike[str]
+        The ``DESTDIR`` wherein the package has been installed.
+    root : str | os.PathLike[str]
+        The root directory wherein the staged files are installed.
+
+    """
+    cache = get_build_cache()
+    if cache is not None:
+        cache.insert(key, staging_dir)
+    logger.info(f"Installing staged build {os.fspath(staging_dir)!r} into {os.fspath(root)!r}")
+    _merge_tree(staging_dir, root, move=False)
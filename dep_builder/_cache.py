@@ -0,0 +1,384 @@
+"""A content-addressed cache for downloaded source archives."""
+
+from __future__ import annotations
+
+import os
+import atexit
+import hashlib
+import threading
+import contextlib
+import tempfile
+import operator
+from pathlib import Path
+from typing import BinaryIO
+from collections.abc import Iterator
+
+import requests
+
+from . import logger
+from ._download import download, CHUNK_SIZE, _format_size
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # type: ignore[assignment]
+
+__all__ = ["SourceCache", "get_source_cache", "sha256sum"]
+
+#: The default maximum size (in bytes) of the source cache.
+DEFAULT_MAX_SIZE = 4 * 1024**3
+
+
+def sha256sum(path: str | os.PathLike[str], chunk_size: int = CHUNK_SIZE) -> str:
+    """Return the hexadecimal SHA-256 digest of the passed file.
+
+    Parameters
+    ----------
+    path : str | os.PathLike[str]
+        The path to the to-be hashed file.
+    chunk_size : int
+        The size (in bytes) of the chunks wherein the file is read.
+
+    Returns
+    -------
+    str
+        The SHA-256 digest of the file.
+
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@contextlib.contextmanager
+def _lock(path: str | os.PathLike[str]) -> Iterator[None]:
+    """Context manager for holding an exclusive lock on ``path``, shared between processes if supported."""
+    if fcntl is None:
+        yield
+        return
+
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _check_sha256(path: str | os.PathLike[str], sha256: str | None) -> str:
+    """Compute the SHA-256 digest of ``path`` and, optionally, compare it against ``sha256``."""
+    digest = sha256sum(path)
+    if sha256 is not None and digest != sha256.lower():
+        raise ValueError(
+            f"SHA-256 mismatch for {os.fspath(path)!r}: expected {sha256!r}, observed {digest!r}"
+        )
+    return digest
+
+
+class SourceCache:
+    """A content-addressed cache for source archives with least-recently-used eviction.
+
+    Archives are stored under their SHA-256 digest and looked up by either their
+    expected digest or, if unavailable, the URL they were originally downloaded from.
+    The modification time of a cached archive doubles as its last-used time.
+
+    Parameters
+    ----------
+    directory : str | os.PathLike[str]
+        The cache directory. Will be created if it does not exist yet.
+    max_size : int
+        The maximum total size (in bytes) of all cached archives.
+        The least recently used archives are evicted once it is exceeded.
+
+    """
+
+    __slots__ = ("_directory", "_max_size", "_lock", "_counted", "hits", "misses", "bytes_saved")
+
+    @property
+    def directory(self) -> Path:
+        """The cache directory."""
+        return self._directory
+
+    @property
+    def max_size(self) -> int:
+        """The maximum total size (in bytes) of all cached archives."""
+        return self._max_size
+
+    def __init__(self, directory: str | os.PathLike[str], max_size: int = DEFAULT_MAX_SIZE) -> None:
+        """Initialize the instance."""
+        self._directory = Path(directory).absolute()
+        self._max_size = operator.index(max_size)
+        self._lock = threading.Lock()
+        self._counted: set[str] = set()
+
+        #: The number of cache hits. Every URL is only counted once, *i.e.* upon its first lookup.
+        self.hits = 0
+        #: The number of cache misses. Every URL is only counted once, *i.e.* upon its first lookup.
+        self.misses = 0
+        #: The total number of bytes that did not have to be downloaded due to cache hits.
+        self.bytes_saved = 0
+
+        for name in ("objects", "urls", "tmp"):
+            os.makedirs(self._directory / name, exist_ok=True)
+
+    def __repr__(self) -> str:
+        """Implement :func:`repr(self) <repr>`."""
+        cls = type(self)
+        return f"{cls.__name__}(directory={os.fspath(self.directory)!r}, max_size={self.max_size!r})"
+
+    def _object_path(self, digest: str) -> Path:
+        return self._directory / "objects" / digest
+
+    def _url_path(self, url: str) -> Path:
+        return self._directory / "urls" / hashlib.sha256(url.encode()).hexdigest()
+
+    def lookup(self, url: str, sha256: str | None = None) -> Path | None:
+        """Return the path to the cached archive of ``url`` or :data:`None` if it is absent.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the archive.
+        sha256 : None | str
+            The expected SHA-256 digest of the archive.
+            If provided, the archive is looked up by its digest rather than its URL.
+
+        Returns
+        -------
+        None | pathlib.Path
+            The path to the cached archive, if present.
+
+        """
+        path = self._find(url, sha256)
+        self._count(url, path)
+        return path
+
+    def _find(self, url: str, sha256: str | None = None) -> Path | None:
+        """Return the path to the cached archive of ``url``, if present, without updating the statistics."""
+        if sha256 is None:
+            try:
+                sha256 = self._url_path(url).read_text().strip()
+            except FileNotFoundError:
+                return None
+        path = self._object_path(sha256.lower())
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def _count(self, url: str, path: Path | None) -> None:
+        """Register a cache hit for ``path`` or, if :data:`None`, a cache miss, unless ``url`` has been counted before.
+
+        Archives are commonly looked up more than once, *e.g.* by :func:`~dep_builder.source_digest`
+        and a subsequent :func:`~dep_builder.download_and_unpack`, only the first of which
+        determines whether the archive had to be downloaded.
+
+        """
+        with self._lock:
+            if url in self._counted:
+                return
+            self._counted.add(url)
+            if path is None:
+                self.misses += 1
+                return
+            self.hits += 1
+            with contextlib.suppress(FileNotFoundError):
+                self.bytes_saved += os.stat(path).st_size
+
+    def insert(self, url: str, path: str | os.PathLike[str], sha256: str | None = None) -> Path:
+        """Move the archive at ``path`` into the cache, verifying its checksum if possible.
+
+        Parameters
+        ----------
+        url : str
+            The URL the archive was downloaded from.
+        path : str | os.PathLike[str]
+            The path to the archive. Must reside on the same filesystem as the cache.
+        sha256 : None | str
+            The expected SHA-256 digest of the archive.
+
+        Returns
+        -------
+        pathlib.Path
+            The path to the cached archive.
+
+        """
+        digest = _check_sha256(path, sha256)
+        ret = self._object_path(digest)
+        os.replace(path, ret)
+
+        url_path = self._url_path(url)
+        with tempfile.NamedTemporaryFile("w", dir=self._directory / "tmp", delete=False) as f:
+            f.write(digest)
+        os.replace(f.name, url_path)
+        self.evict(keep=ret)
+        return ret
+
+    @contextlib.contextmanager
+    def writer(self, url: str, sha256: str | None = None) -> Iterator[BinaryIO]:
+        """Context manager for writing a newly downloaded archive directly into the cache.
+
+        The archive is only added to the cache if the context manager exits successfully.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the archive.
+        sha256 : None | str
+            The expected SHA-256 digest of the archive.
+
+        """
+        fd, tmp = tempfile.mkstemp(dir=self._directory / "tmp")
+        try:
+            with open(fd, "wb") as f:
+                yield f
+            self.insert(url, tmp, sha256)
+        finally:
+            if os.path.isfile(tmp):
+                os.remove(tmp)
+
+    def fetch(
+        self,
+        url: str,
+        sha256: str | None = None,
+        *,
+        chunk_size: int = CHUNK_SIZE,
+        segments: int = 1,
+        session: None | requests.Session = None,
+    ) -> Path:
+        """Return the path to the cached archive of ``url``, downloading it on a cache miss.
+
+        Interrupted downloads are kept in the cache directory and resumed by the next call.
+        Concurrent fetches of the same URL, possibly by different processes, are serialized via a lock file.
+
+        Parameters
+        ----------
+        url : str
+            The URL of the archive.
+        sha256 : None | str
+            The expected SHA-256 digest of the archive.
+        chunk_size : int
+            The size (in bytes) of the chunks wherein the archive is streamed to disk.
+        segments : int
+            The number of byte ranges that are downloaded in parallel.
+        session : None | requests.Session
+            The session used for performing all HTTP requests.
+
+        Returns
+        -------
+        pathlib.Path
+            The path to the cached archive.
+
+        """
+        path = self._find(url, sha256)
+        if path is None:
+            name = self._url_path(url).name
+            with _lock(self._directory / "tmp" / f"{name}.lock"):
+                # Another process may have fetched the archive while waiting for the lock
+                path = self._find(url, sha256)
+                if path is None:
+                    self._count(url, None)
+                    logger.info(f"Download {url!r}")
+                    tmp = self._directory / "tmp" / f"{name}.part"
+                    download(url, tmp, chunk_size=chunk_size, segments=segments, resume=True, session=session)
+                    try:
+                        return self.insert(url, tmp, sha256)
+                    finally:
+                        if os.path.isfile(tmp):
+                            os.remove(tmp)
+
+        self._count(url, path)
+        logger.info(f"Using cached archive {os.fspath(path)!r}")
+        return path
+
+    def evict(self, keep: None | str | os.PathLike[str] = None) -> None:
+        """Remove the least recently used archives until the cache is within its size limit.
+
+        Parameters
+        ----------
+        keep : None | str | os.PathLike[str]
+            The path to an archive that should never be evicted.
+
+        """
+        _evict_lru(self._directory / "objects", self._max_size, keep, "source cache")
+
+    def log_summary(self) -> None:
+        """Log the number of cache hits, misses and the amount of saved bytes."""
+        logger.info(
+            f"Source cache: {self.hits} hit(s), {self.misses} miss(es), "
+            f"{_format_size(self.bytes_saved)} saved"
+        )
+
+
+def _evict_lru(
+    directory: str | os.PathLike[str],
+    max_size: int,
+    keep: None | str | os.PathLike[str] = None,
+    name: str = "cache",
+) -> None:
+    """Remove the least recently used files from ``directory`` until their total size is at most ``max_size``."""
+    entries = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            with contextlib.suppress(FileNotFoundError):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    keep_path = os.fspath(keep) if keep is not None else None
+    for _, size, path in sorted(entries):
+        if total <= max_size:
+            break
+        elif path == keep_path:
+            continue
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+        total -= size
+        logger.info(f"Evicted {path!r} ({_format_size(size)}) from the {name}")
+
+
+_SOURCE_CACHE: None | SourceCache = None
+_SOURCE_CACHE_LOCK = threading.Lock()
+
+
+def get_source_cache() -> None | SourceCache:
+    """Return the default :class:`SourceCache`.
+
+    Its location and size are set via the ``DEP_BUILDER_CACHE_DIR`` and
+    ``DEP_BUILDER_SOURCE_CACHE_SIZE`` environment variables, defaulting to
+    ``$XDG_CACHE_HOME/dep_builder`` and 4 GiB, respectively.
+    Setting ``DEP_BUILDER_CACHE_DIR`` to an empty string disables the cache.
+    A summary of the cache statistics is logged when the interpreter exits.
+
+    Returns
+    -------
+    None | dep_builder.SourceCache
+        The default source cache or :data:`None` if caching is disabled.
+
+    """
+    global _SOURCE_CACHE
+    with _SOURCE_CACHE_LOCK:
+        if _SOURCE_CACHE is not None:
+            return _SOURCE_CACHE
+
+        directory = get_cache_dir()
+        if directory is None:
+            return None
+        max_size = int(os.environ.get("DEP_BUILDER_SOURCE_CACHE_SIZE", DEFAULT_MAX_SIZE))
+        _SOURCE_CACHE = cache = SourceCache(directory / "sources", max_size)
+        atexit.register(lambda: cache.log_summary() if cache.hits or cache.misses else None)
+        return cache
+
+
+def get_cache_dir() -> None | Path:
+    """Return the root directory of all :mod:`dep_builder` caches or :data:`None` if caching is disabled."""
+    directory = os.environ.get("DEP_BUILDER_CACHE_DIR")
+    if directory is None:
+        xdg_cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        return Path(xdg_cache) / "dep_builder"
+    elif not directory:
+        return None
+    return Path(directory)
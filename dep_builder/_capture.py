@@ -0,0 +1,221 @@
+"""Functions for capturing the output of build subprocesses into compressed log files."""
+
+from __future__ import annotations
+
+import os
+import re
+import gzip
+import time
+import threading
+import contextlib
+import subprocess
+import collections
+from pathlib import Path
+from collections.abc import Iterator, Mapping
+from typing import IO
+
+from . import logger
+from ._download import CHUNK_SIZE, _format_size
+from ._jobserver import _has_pipe_jobserver, _strip_jobserver
+from ._environ import _patched_environ
+
+__all__ = ["run_captured", "capture_output", "CAPTURE_ENV_VAR"]
+
+#: The environment variable with the directory wherein :func:`~dep_builder.configure` and
+#: :func:`~dep_builder.build` write the compressed output of their subprocesses.
+CAPTURE_ENV_VAR = "DEP_BUILDER_LOG_DIR"
+
+#: The default number of trailing output lines that are logged if a subprocess fails.
+DEFAULT_TAIL = 200
+
+#: The default interval (in seconds) between two progress summaries.
+DEFAULT_INTERVAL = 30.0
+
+_WARNING_PATTERN = re.compile(rb"\bwarning\b", re.IGNORECASE)
+_ERROR_PATTERN = re.compile(rb"\berror\b", re.IGNORECASE)
+
+
+class _OutputReader(threading.Thread):
+    """Thread draining the output of a subprocess into a compressed log file and a ring buffer of its last lines."""
+
+    def __init__(self, stream: IO[bytes], log_file: gzip.GzipFile, tail: int) -> None:
+        super().__init__(name="dep_builder_output_reader", daemon=True)
+        self.stream = stream
+        self.log_file = log_file
+        self.lines: collections.deque[bytes] = collections.deque(maxlen=tail)
+        self.n_lines = 0
+        self.n_bytes = 0
+        self.n_warnings = 0
+        self.n_errors = 0
+        self.error: None | BaseException = None
+
+    def run(self) -> None:
+        try:
+            for line in iter(self.stream.readline, b""):
+                self.log_file.write(line)
+                self.lines.append(line)
+                self.n_lines += 1
+                self.n_bytes += len(line)
+                if _WARNING_PATTERN.search(line) is not None:
+                    self.n_warnings += 1
+                if _ERROR_PATTERN.search(line) is not None:
+                    self.n_errors += 1
+        except BaseException as ex:
+            # Keep draining the pipe, as the child process would otherwise block once it is full
+            self.error = ex
+            with contextlib.suppress(BaseException):
+                while self.stream.read(CHUNK_SIZE):
+                    pass
+
+    def summary(self) -> str:
+        return (
+            f"{self.n_lines} line(s) ({_format_size(self.n_bytes)}), "
+            f"{self.n_warnings} warning(s), {self.n_errors} error(s)"
+        )
+
+
+def run_captured(
+    cmd: str,
+    log_path: str | os.PathLike[str],
+    *,
+    cwd: None | str | os.PathLike[str] = None,
+    env: None | Mapping[str, str] = None,
+    pass_fds: tuple[int, ...] = (),
+    tail: int = DEFAULT_TAIL,
+    interval: float = DEFAULT_INTERVAL,
+) -> None:
+    """Run the passed shell command, writing its combined stdout and stderr to a gzip-compressed log file.
+
+    The output is read on a background thread, while the calling thread periodically logs
+    a summary (the number of lines, warnings and errors so far, plus the last line).
+    If the command fails, its last ``tail`` lines are logged before raising.
+
+    Parameters
+    ----------
+    cmd : str
+        The shell command.
+    log_path : str | os.PathLike[str]
+        The path to the compressed log file, *e.g.* ``make.log.gz``.
+    cwd : None | str | os.PathLike[str]
+        The working directory of the command.
+    env : None | Mapping[str, str]
+        The environment variables of the command. If :data:`None`, inherit those of the current process.
+    pass_fds : tuple[int, ...]
+        File descriptors to keep open in the child process, *e.g.* those of a jobserver.
+    tail : int
+        The number of trailing lines that are kept in memory and logged upon failure.
+    interval : float
+        The interval (in seconds) between two progress summaries.
+
+    Raises
+    ------
+    subprocess.CalledProcessError
+        Raised if the command exits with a non-zero status.
+    Exception
+        Any exception raised while reading or writing the output (*e.g.* a full disk),
+        re-raised once the command has finished.
+
+    """
+    log_path = Path(log_path).absolute()
+    os.makedirs(log_path.parent, exist_ok=True)
+    logger.info(f"Writing the output of {cmd!r} to {os.fspath(log_path)!r}")
+
+    start = time.perf_counter()
+    with gzip.open(log_path, "wb", compresslevel=1) as log_file, subprocess.Popen(
+        cmd, shell=True, cwd=cwd, env=env, pass_fds=pass_fds,
+        stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+    ) as proc:
+        assert proc.stdout is not None
+        reader = _OutputReader(proc.stdout, log_file, tail)
+        reader.start()
+        while True:
+            try:
+                proc.wait(timeout=interval)
+                break
+            except subprocess.TimeoutExpired:
+                last = reader.lines[-1].decode(errors="replace").rstrip() if reader.lines else ""
+                logger.info(f"[{time.perf_counter() - start:.0f}s] {reader.summary()}; last line: {last!r}")
+        reader.join()
+
+    if reader.error is not None:
+        logger.error(f"Failed to capture the output of {cmd!r} into {os.fspath(log_path)!r}")
+        raise reader.error
+    if proc.returncode != 0:
+        logger.error(f"{cmd!r} failed with exit status {proc.returncode}: {reader.summary()}")
+        logger.error(f"Last {len(reader.lines)} line(s) of {os.fspath(log_path)!r}:")
+        for line in reader.lines:
+            logger.error(line.decode(errors="replace").rstrip())
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+    logger.info(f"Finished {cmd!r} in {time.perf_counter() - start:.2f}s: {reader.summary()}")
+
+
+def _log_path(log_dir: str | os.PathLike[str], stage: str) -> Path:
+    """Return a not-yet existing path for the log file of ``stage`` within ``log_dir``."""
+    ret = Path(log_dir) / f"{stage}.log.gz"
+    i = 1
+    while ret.exists():
+        i += 1
+        ret = Path(log_dir) / f"{stage}-{i}.log.gz"
+    return ret
+
+
+def _run(
+    cmd: str,
+    stage: str,
+    *,
+    cwd: None | str | os.PathLike[str] = None,
+    env: None | Mapping[str, str] = None,
+    pass_fds: tuple[int, ...] = (),
+) -> None:
+    """Run the passed shell command, capturing its output if :func:`capture_output` is active.
+
+    Unless its file descriptors are passed via ``pass_fds``, a pipe-based jobserver is removed from
+    ``MAKEFLAGS``, as the ``make`` processes started by *e.g.* ``configure`` could not join it.
+
+    """
+    if not pass_fds and _has_pipe_jobserver(os.environ if env is None else env):
+        env = _strip_jobserver(os.environ if env is None else env)
+    log_dir = os.environ.get(CAPTURE_ENV_VAR)
+    if not log_dir:
+        subprocess.run(cmd, shell=True, cwd=cwd, env=env, check=True, pass_fds=pass_fds)
+    else:
+        run_captured(cmd, _log_path(log_dir, stage), cwd=cwd, env=env, pass_fds=pass_fds)
+
+
+@contextlib.contextmanager
+def capture_output(log_dir: None | str | os.PathLike[str]) -> Iterator[None | Path]:
+    """Context manager for capturing the output of all :func:`~dep_builder.configure` and :func:`~dep_builder.build` steps.
+
+    Rather than being inherited, the output of every ``configure``, ``make``, ``cmake``, *etc.*
+    invocation is written to a gzip-compressed log file named after the step (*e.g.* ``make.log.gz``)
+    within ``log_dir``, while only a throttled summary is logged (see :func:`~dep_builder.run_captured`).
+    Setting the ``DEP_BUILDER_LOG_DIR`` environment variable has the same effect.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        >>> from dep_builder import capture_output, configure, build
+
+        >>> with capture_output("logs"):  # doctest: +SKIP
+        ...     configure("src", "build")
+        ...     build("build")
+
+    Parameters
+    ----------
+    log_dir : None | str | os.PathLike[str]
+        The directory wherein all log files are written. If :data:`None`, the context manager does nothing.
+
+    Yields
+    ------
+    None | pathlib.Path
+        The absolute path to the log directory, or :data:`None` if capturing is disabled.
+
+    """
+    if log_dir is None:
+        yield None
+        return
+
+    log_dir = Path(log_dir).absolute()
+    with _patched_environ(**{CAPTURE_ENV_VAR: os.fspath(log_dir)}):
+        yield log_dir
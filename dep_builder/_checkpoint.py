@@ -0,0 +1,162 @@
+"""Functions for checkpointing and resuming the stages of installer pipelines."""
+
+from __future__ import annotations
+
+import os
+import json
+import hashlib
+import tempfile
+import contextlib
+from pathlib import Path
+from collections.abc import Callable, Mapping
+from typing import Any, TypeVar
+
+from . import logger
+
+__all__ = ["Checkpoint"]
+
+_T = TypeVar("_T")
+
+
+def _encode(value: object) -> object:
+    """Convert the output of a stage into a JSON-serializable object."""
+    if isinstance(value, os.PathLike):
+        return {"path": os.fspath(value)}
+    elif value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    raise TypeError(f"Cannot checkpoint stage outputs of type {type(value).__name__!r}")
+
+
+def _decode(value: Any) -> Any:
+    """Inverse of :func:`_encode`."""
+    if isinstance(value, dict):
+        return Path(value["path"])
+    return value
+
+
+class Checkpoint:
+    """A record of all completed stages of an installer pipeline, allowing it to resume after a failure.
+
+    The outputs of every completed stage, and all paths passed to or returned by it, are stored
+    in a JSON state file. When resuming, stages that completed in a previous run (with identical
+    pipeline inputs and with all their paths still present) are skipped and their stored outputs
+    are returned instead. Once a stage has to be rerun, all subsequent stages are rerun as well.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        >>> from dep_builder import Checkpoint, download_and_unpack, configure, build
+
+        >>> checkpoint = Checkpoint(".install_libint.json", {"version": "2.7.2"}, resume=True)  # doctest: +SKIP
+        >>> src_path = checkpoint.run("download", download_and_unpack, url)  # doctest: +SKIP
+        >>> checkpoint.run("configure", configure, src_path, "build")  # doctest: +SKIP
+        >>> checkpoint.run("build", build, "build")  # doctest: +SKIP
+        >>> checkpoint.clear()  # doctest: +SKIP
+
+    Parameters
+    ----------
+    path : str | os.PathLike[str]
+        The path to the state file.
+    inputs : Mapping[str, Any]
+        The JSON-serializable inputs of the pipeline, *e.g.* the package version and ``configure``
+        arguments. The state file is discarded if they differ from those of the previous run.
+    resume : bool
+        Whether to resume from the state file of a previous run.
+        If :data:`False`, any existing state file is discarded.
+
+    """
+
+    __slots__ = ("_path", "_key", "_stages", "_valid")
+
+    @property
+    def path(self) -> Path:
+        """The path to the state file."""
+        return self._path
+
+    @property
+    def stages(self) -> list[str]:
+        """The names of all completed stages."""
+        return list(self._stages)
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        inputs: Mapping[str, Any],
+        resume: bool = False,
+    ) -> None:
+        """Initialize the instance."""
+        self._path = Path(path).absolute()
+        self._key = hashlib.sha256(json.dumps(dict(inputs), sort_keys=True).encode()).hexdigest()
+        self._stages: dict[str, dict[str, Any]] = {}
+        self._valid = resume
+
+        if not resume:
+            return
+        try:
+            with open(self._path, "r", encoding="utf8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            logger.info(f"No checkpoint found at {os.fspath(self._path)!r}, starting from scratch")
+            return
+        if state.get("key") != self._key:
+            logger.info("Discarding checkpoint: the pipeline inputs have changed")
+            return
+        self._stages = state["stages"]
+        logger.info(f"Resuming from checkpoint {os.fspath(self._path)!r} (completed stages: {self.stages!r})")
+
+    def __repr__(self) -> str:
+        """Implement :func:`repr(self) <repr>`."""
+        return f"{type(self).__name__}(path={os.fspath(self.path)!r}, stages={self.stages!r})"
+
+    def run(self, name: str, func: Callable[..., _T], *args: Any, **kwargs: Any) -> _T:
+        """Run ``func(*args, **kwargs)`` as the stage ``name``, unless it completed in a previous run.
+
+        Parameters
+        ----------
+        name : str
+            The unique name of the stage.
+        func : Callable[..., T]
+            The function to-be called. Its return value must be :data:`None`, a boolean,
+            number, string or path.
+        *args/**kwargs : Any
+            Arguments for ``func``.
+
+        Returns
+        -------
+        T
+            The return value of ``func`` or its stored value if the stage was skipped.
+
+        """
+        record = self._stages.get(name)
+        if self._valid and record is not None and all(os.path.exists(i) for i in record["paths"]):
+            logger.info(f"Skipping stage {name!r}: completed in a previous run")
+            ret: _T = _decode(record["output"])
+            return ret
+
+        # All subsequent stages depend on this one and must thus be rerun as well
+        self._valid = False
+        self._stages.pop(name, None)
+        ret = func(*args, **kwargs)
+        paths = [os.fspath(i) for i in (*args, *kwargs.values(), ret) if isinstance(i, os.PathLike)]
+        self._stages[name] = {"output": _encode(ret), "paths": [os.path.abspath(i) for i in paths]}
+        self._save()
+        return ret
+
+    def _save(self) -> None:
+        """Atomically write the state file."""
+        os.makedirs(self._path.parent, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self._path.parent, prefix=f".{self._path.name}.")
+        try:
+            with open(fd, "w", encoding="utf8") as f:
+                json.dump({"key": self._key, "stages": self._stages}, f, indent=4)
+            os.replace(tmp, self._path)
+        finally:
+            if os.path.isfile(tmp):
+                os.remove(tmp)
+
+    def clear(self) -> None:
+        """Remove the state file, *e.g.* once the pipeline has completed successfully."""
+        self._stages.clear()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._path)
@@ -0,0 +1,198 @@
+"""Functions for removing directory trees in the background."""
+
+from __future__ import annotations
+
+import os
+import time
+import atexit
+import shutil
+import tempfile
+import operator
+import threading
+import concurrent.futures
+
+from . import logger
+
+__all__ = ["Cleaner", "get_cleaner", "remove_tree"]
+
+
+class Cleaner:
+    """A service for deleting directory trees off the critical path.
+
+    Trees are immediately renamed into a private trash directory (located in the same parent
+    directory, so the rename is an atomic metadata-only operation) after which they are
+    deleted on a pool of background threads. Their original paths are thus available again
+    right away, while the expensive removal of the individual files happens concurrently
+    with whatever comes next.
+
+    Parameters
+    ----------
+    max_workers : int
+        The maximum number of trees that are deleted concurrently.
+
+    """
+
+    __slots__ = (
+        "_max_workers", "_executor", "_futures", "_trash_dirs", "_lock", "_closed",
+        "n_trees", "critical_time", "background_time",
+    )
+
+    @property
+    def max_workers(self) -> int:
+        """The maximum number of trees that are deleted concurrently."""
+        return self._max_workers
+
+    def __init__(self, max_workers: int = 2) -> None:
+        """Initialize the instance."""
+        self._max_workers = operator.index(max_workers)
+        if self._max_workers <= 0:
+            raise ValueError(f"`max_workers` must be larger than 0, got {max_workers}")
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers, thread_name_prefix="cleanup")
+        self._futures: list[concurrent.futures.Future[None]] = []
+        self._trash_dirs: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+        #: The number of trees scheduled for removal.
+        self.n_trees = 0
+        #: The time (in seconds) spent on the calling thread, *i.e.* renaming trees and waiting.
+        self.critical_time = 0.0
+        #: The time (in seconds) spent on deleting trees in the background.
+        self.background_time = 0.0
+
+    def __repr__(self) -> str:
+        """Implement :func:`repr(self) <repr>`."""
+        return f"{type(self).__name__}(max_workers={self.max_workers!r})"
+
+    def _get_trash_dir(self, parent: str) -> str:
+        """Return the trash directory within ``parent``, creating it if necessary."""
+        trash_dir = self._trash_dirs.get(parent)
+        if trash_dir is None:
+            trash_dir = tempfile.mkdtemp(prefix=".dep_builder_trash-", dir=parent)
+            self._trash_dirs[parent] = trash_dir
+        return trash_dir
+
+    def remove(self, path: str | os.PathLike[str]) -> None:
+        """Schedule the removal of the directory tree at ``path``.
+
+        Non-existent paths are silently ignored. Trees that cannot be moved into the
+        trash directory (*e.g.* due to a read-only parent) are deleted synchronously.
+
+        Parameters
+        ----------
+        path : str | os.PathLike[str]
+            The path to the to-be removed directory.
+
+        """
+        start = time.perf_counter()
+        path = os.path.abspath(path)
+        if not os.path.lexists(path):
+            return
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Cannot schedule removals after the cleaner has been closed")
+            try:
+                trash_path = os.path.join(self._get_trash_dir(os.path.dirname(path)), str(self.n_trees))
+                os.rename(path, trash_path)
+            except OSError as ex:
+                logger.debug(f"Failed to move {path!r} to the trash: {ex}")
+                moved = False
+            else:
+                self._futures.append(self._executor.submit(self._rmtree, trash_path))
+                moved = True
+            self.n_trees += 1
+
+        if not moved:
+            # Delete the tree in place if it cannot be moved (e.g. due to a read-only parent),
+            # doing so synchronously as the path must be available for reuse upon returning
+            try:
+                shutil.rmtree(path)
+            except OSError as ex:
+                logger.warning(f"Failed to remove {path!r}: {ex}")
+        with self._lock:
+            self.critical_time += time.perf_counter() - start
+
+    def _rmtree(self, path: str) -> None:
+        start = time.perf_counter()
+        try:
+            shutil.rmtree(path)
+        except OSError as ex:
+            logger.warning(f"Failed to remove {path!r}: {ex}")
+        duration = time.perf_counter() - start
+        with self._lock:
+            self.background_time += duration
+
+    def wait(self) -> None:
+        """Block until all scheduled trees have been deleted."""
+        start = time.perf_counter()
+        with self._lock:
+            futures, self._futures = self._futures, []
+        concurrent.futures.wait(futures)
+        with self._lock:
+            self.critical_time += time.perf_counter() - start
+
+    def close(self) -> None:
+        """Delete all scheduled trees and the trash directories, blocking until finished."""
+        self.wait()
+        with self._lock:
+            self._closed = True
+            trash_dirs, self._trash_dirs = list(self._trash_dirs.values()), {}
+        self._executor.shutdown(wait=True)
+        for trash_dir in trash_dirs:
+            shutil.rmtree(trash_dir, ignore_errors=True)
+
+    def log_summary(self) -> None:
+        """Log the number of removed trees and the time saved on the critical path."""
+        saved = max(0.0, self.background_time - self.critical_time)
+        logger.info(
+            f"Removed {self.n_trees} tree(s) in the background in {self.background_time:.1f} s, "
+            f"taking {saved:.1f} s off the critical path"
+        )
+
+
+_CLEANER: None | Cleaner = None
+_CLEANER_LOCK = threading.Lock()
+
+
+def _close_cleaner(cleaner: Cleaner) -> None:
+    cleaner.close()
+    if cleaner.n_trees:
+        cleaner.log_summary()
+
+
+def get_cleaner() -> Cleaner:
+    """Return the default :class:`Cleaner`.
+
+    All of its scheduled trees are guaranteed to be deleted before the interpreter exits,
+    after which a summary is logged.
+
+    Returns
+    -------
+    dep_builder.Cleaner
+        The default cleaner.
+
+    """
+    global _CLEANER
+    with _CLEANER_LOCK:
+        if _CLEANER is None:
+            _CLEANER = cleaner = Cleaner()
+            atexit.register(_close_cleaner, cleaner)
+        return _CLEANER
+
+
+def remove_tree(path: None | str | os.PathLike[str]) -> None:
+    """Remove the directory tree at ``path`` in the background with the default :class:`Cleaner`.
+
+    The path becomes available for reuse as soon as this function returns.
+
+    Parameters
+    ----------
+    path : None | str | os.PathLike[str]
+        The path to the to-be removed directory.
+        :data:`None` and non-existent paths are silently ignored.
+
+    """
+    if path is not None:
+        get_cleaner().remove(path)
@@ -0,0 +1,166 @@
+"""Functions for profiling the individual compiler and linker invocations of a build."""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import shlex
+import tempfile
+import contextlib
+from pathlib import Path
+from collections.abc import Iterator
+from typing import Any
+
+from . import logger
+from ._download import _format_size
+from ._compile_wrapper import LOG_ENV_VAR
+from ._build_cache import _COMPILERS
+from ._environ import _patched_environ
+
+__all__ = ["compile_profile", "WRAPPER_ENV_VAR"]
+
+#: The environment variable containing the wrapper command while :func:`compile_profile` is active.
+WRAPPER_ENV_VAR = "DEP_BUILDER_COMPILE_WRAPPER"
+
+#: The environment variable containing the path to the log file while :func:`compile_profile` is active.
+_PROFILE_ENV_VAR = "DEP_BUILDER_COMPILE_PROFILE"
+
+
+def _wrapper_command() -> str:
+    """Return the shell command for running the compiler wrapper script."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "_compile_wrapper.py")
+    return f"{shlex.quote(sys.executable)} {shlex.quote(script)}"
+
+
+def _load(log_path: str | os.PathLike[str]) -> list[dict[str, Any]]:
+    """Return all invocations from the passed log file."""
+    ret = []
+    with contextlib.suppress(FileNotFoundError), open(log_path, "r", encoding="utf8") as f:
+        for line in f:
+            with contextlib.suppress(ValueError):
+                ret.append(json.loads(line))
+    return ret
+
+
+def _report(invocations: list[dict[str, Any]], root: str | os.PathLike[str]) -> dict[str, Any]:
+    """Aggregate the passed invocations into a report, ranked by their duration."""
+    root = os.path.abspath(root)
+    ranked = sorted(invocations, key=lambda i: i["duration"], reverse=True)
+    for i in ranked:
+        i["cpu_time"] = i["user_time"] + i["system_time"]
+        target = i["sources"][0] if len(i["sources"]) == 1 else i["output"]
+        i["target"] = os.path.relpath(target, root) if target is not None else None
+
+    kinds: dict[str, dict[str, Any]] = {}
+    directories: dict[str, dict[str, Any]] = {}
+    for i in ranked:
+        for key, groups in [(i["kind"], kinds), (os.path.dirname(i["target"] or ""), directories)]:
+            group = groups.setdefault(key, {"invocations": 0, "duration": 0.0, "cpu_time": 0.0, "max_rss": 0})
+            group["invocations"] += 1
+            group["duration"] += i["duration"]
+            group["cpu_time"] += i["cpu_time"]
+            group["max_rss"] = max(group["max_rss"], i["max_rss"])
+
+    start = min((i["start"] for i in ranked), default=0.0)
+    end = max((i["start"] + i["duration"] for i in ranked), default=0.0)
+    return {
+        "elapsed": end - start,
+        "invocations": len(ranked),
+        "duration": sum(i["duration"] for i in ranked),
+        "cpu_time": sum(i["cpu_time"] for i in ranked),
+        "max_rss": max((i["max_rss"] for i in ranked), default=0),
+        "by_kind": dict(sorted(kinds.items(), key=lambda kv: kv[1]["duration"], reverse=True)),
+        "by_directory": dict(sorted(directories.items(), key=lambda kv: kv[1]["duration"], reverse=True)),
+        "ranked": ranked,
+    }
+
+
+def _log_report(report: dict[str, Any], n: int = 10) -> None:
+    """Log a summary of the passed report, including its ``n`` most expensive invocations."""
+    logger.info(
+        f"Profiled {report['invocations']} compiler invocation(s): {report['duration']:.2f}s in total, "
+        f"{report['cpu_time']:.2f}s CPU time, {report['elapsed']:.2f}s elapsed"
+    )
+    for i in report["ranked"][:n]:
+        logger.info(
+            f"{i['duration']:8.2f}s {i['cpu_time']:8.2f}s CPU {_format_size(i['max_rss']):>10}  "
+            f"{i['kind']:<7} {i['target']}"
+        )
+
+
+@contextlib.contextmanager
+def compile_profile(
+    report_path: None | str | os.PathLike[str],
+    base_dir: str | os.PathLike[str] = ".",
+) -> Iterator[None | Path]:
+    """Context manager for recording the duration and resource usage of every compiler and linker invocation.
+
+    Prefixes the ``CC`` and ``CXX`` environment variables with a lightweight wrapper for
+    the duration of the context manager, so it must wrap both :func:`~dep_builder.configure`
+    and :func:`~dep_builder.build`, and it must be entered *within* :func:`~dep_builder.compiler_cache`.
+    Only invocations during :func:`~dep_builder.build` are recorded, each with its start time,
+    duration, user and system CPU time and peak RSS. Upon exiting, they are aggregated
+    into a JSON report ranked by duration, and the most expensive invocations are logged.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        >>> import os
+        >>> from dep_builder import compiler_cache, compile_profile, configure, build
+
+        >>> with compiler_cache(os.getcwd()), compile_profile("compile_report.json"):  # doctest: +SKIP
+        ...     configure("src", "build")
+        ...     build("build")
+
+    Parameters
+    ----------
+    report_path : None | str | os.PathLike[str]
+        The path to the JSON report. If :data:`None`, the context manager does nothing.
+    base_dir : str | os.PathLike[str]
+        The directory relative to which all source and output files are reported.
+
+    Yields
+    ------
+    None | pathlib.Path
+        The absolute path to the report, or :data:`None` if profiling is disabled.
+
+    """
+    if report_path is None:
+        yield None
+        return
+
+    report_path = Path(report_path).absolute()
+    wrapper = _wrapper_command()
+    env = {WRAPPER_ENV_VAR: wrapper}
+    for key, default in _COMPILERS.items():
+        env[key] = f"{wrapper} {os.environ.get(key) or default}"
+
+    fd, log_path = tempfile.mkstemp(prefix="dep_builder_compile-", suffix=".jsonl")
+    os.close(fd)
+    env[_PROFILE_ENV_VAR] = log_path
+    logger.info(f"Profiling all compiler invocations into {os.fspath(report_path)!r}")
+
+    try:
+        with _patched_environ(**env):
+            yield report_path
+    finally:
+        report = _report(_load(log_path), base_dir)
+        os.remove(log_path)
+        os.makedirs(report_path.parent, exist_ok=True)
+        with open(report_path, "w", encoding="utf8") as f:
+            json.dump(report, f, indent=1)
+        _log_report(report)
+
+
+@contextlib.contextmanager
+def _record_invocations() -> Iterator[None]:
+    """Context manager for recording all compiler invocations within its scope, if :func:`compile_profile` is active."""
+    log_path = os.environ.get(_PROFILE_ENV_VAR)
+    if log_path is None:
+        yield
+        return
+
+    with _patched_environ(**{LOG_ENV_VAR: log_path}):
+        yield
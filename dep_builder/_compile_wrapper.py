@@ -0,0 +1,97 @@
+"""A compiler wrapper recording the duration and resource usage of every invocation.
+
+Executed as a standalone script (see :func:`dep_builder.compile_profile`), so it only uses the standard library.
+
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import subprocess
+
+try:
+    import resource
+except ImportError:
+    resource = None  # type: ignore[assignment]
+
+__all__ = ["LOG_ENV_VAR", "SOURCE_SUFFIXES", "main"]
+
+#: The environment variable with the path to the log file; invocations are not recorded if it is unset.
+LOG_ENV_VAR = "DEP_BUILDER_COMPILE_LOG"
+
+#: The file extensions of all recognized source files.
+SOURCE_SUFFIXES = frozenset({
+    ".c", ".cc", ".cp", ".cpp", ".cxx", ".c++", ".C", ".CPP",
+    ".f", ".for", ".f90", ".f95", ".f03", ".F", ".F90", ".s", ".S",
+})
+
+#: Compiler launchers, which are skipped when determining the name of the compiler.
+_LAUNCHERS = frozenset({"ccache", "sccache"})
+
+
+def _parse_args(args: list[str]) -> tuple[str, list[str], None | str]:
+    """Return the kind of invocation, the source files and the output file of the passed compiler arguments."""
+    sources = [i for i in args if not i.startswith("-") and os.path.splitext(i)[1] in SOURCE_SUFFIXES]
+    output = None
+    for i, arg in enumerate(args):
+        if arg == "-o" and i + 1 < len(args):
+            output = args[i + 1]
+        elif arg.startswith("-o") and len(arg) > 2:
+            output = arg[2:]
+
+    if "-E" in args:
+        kind = "preprocess"
+    elif "-c" in args or "-S" in args:
+        kind = "compile"
+    else:
+        kind = "link"
+    return kind, sources, output
+
+
+def main(argv: list[str]) -> int:
+    """Run the compiler command ``argv`` and append its timings to the log file, returning its exit status."""
+    if not argv:
+        print(f"usage: {sys.executable} {__file__} COMPILER [ARGS...]", file=sys.stderr)
+        return 2
+
+    log_path = os.environ.get(LOG_ENV_VAR)
+    if not log_path or resource is None:
+        os.execvp(argv[0], argv)
+
+    start = time.time()
+    start_perf = time.perf_counter()
+    returncode = subprocess.call(argv)
+    duration = time.perf_counter() - start_perf
+
+    # The compiler is the only child process of this wrapper
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    kind, sources, output = _parse_args(argv[1:])
+    record = {
+        "tool": os.path.basename(argv[1] if len(argv) > 1 and os.path.basename(argv[0]) in _LAUNCHERS else argv[0]),
+        "kind": kind,
+        "sources": [os.path.abspath(i) for i in sources],
+        "output": os.path.abspath(output) if output is not None else None,
+        "cwd": os.getcwd(),
+        "start": start,
+        "duration": duration,
+        "user_time": usage.ru_utime,
+        "system_time": usage.ru_stime,
+        # `ru_maxrss` is expressed in KiB on Linux and in bytes on macOS
+        "max_rss": usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024,
+        "returncode": returncode,
+    }
+
+    # A single `O_APPEND` write, so concurrent invocations do not interleave
+    fd = os.open(log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, (json.dumps(record) + "\n").encode())
+    finally:
+        os.close(fd)
+    return returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
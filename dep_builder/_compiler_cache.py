@@ -0,0 +1,182 @@
+"""Functions for compiling packages with a compiler cache (``ccache`` or ``sccache``)."""
+
+from __future__ import annotations
+
+import os
+import re
+import json
+import shutil
+import contextlib
+import subprocess
+from collections.abc import Iterator
+
+from . import logger
+from ._cache import get_cache_dir
+from ._build_cache import _COMPILERS
+from ._environ import _patched_environ
+
+__all__ = ["compiler_cache", "find_compiler_launcher", "LAUNCHER_ENV_VAR"]
+
+#: The environment variable containing the compiler launcher while :func:`compiler_cache` is active.
+LAUNCHER_ENV_VAR = "DEP_BUILDER_COMPILER_LAUNCHER"
+
+#: The supported compiler caches, in order of preference.
+_LAUNCHERS = ("ccache", "sccache")
+
+
+def find_compiler_launcher() -> None | str:
+    """Return the path to the compiler cache executable, if any.
+
+    The ``DEP_BUILDER_COMPILER_CACHE`` environment variable can be used for selecting
+    a specific executable or, when set to an empty string or ``none``, disabling the compiler cache.
+    Otherwise, ``ccache`` or ``sccache`` is used, whichever is available first.
+
+    Returns
+    -------
+    None | str
+        The path to the compiler cache executable or :data:`None` if none is available.
+
+    """
+    name = os.environ.get("DEP_BUILDER_COMPILER_CACHE")
+    if name is not None:
+        if name.lower() in ("", "none"):
+            return None
+        ret = shutil.which(name)
+        if ret is None:
+            logger.warning(f"Compiler cache {name!r} specified by DEP_BUILDER_COMPILER_CACHE not found")
+        return ret
+
+    for name in _LAUNCHERS:
+        ret = shutil.which(name)
+        if ret is not None:
+            return ret
+    return None
+
+
+def _cache_env(launcher: str, base_dir: str) -> dict[str, str]:
+    """Return the environment variables for configuring the compiler cache."""
+    env = {LAUNCHER_ENV_VAR: launcher}
+    for key, default in _COMPILERS.items():
+        compiler = os.environ.get(key) or default
+        if os.path.basename(compiler.split()[0]) not in _LAUNCHERS:
+            env[key] = f"{launcher} {compiler}"
+
+    name = os.path.basename(launcher)
+    cache_dir = get_cache_dir()
+    if name.startswith("sccache"):
+        # Only honored by sccache versions supporting base directories
+        env["SCCACHE_BASEDIRS"] = base_dir
+        if cache_dir is not None and "SCCACHE_DIR" not in os.environ:
+            env["SCCACHE_DIR"] = os.fspath(cache_dir / "sccache")
+    else:
+        # Rewrite absolute paths relative to `base_dir` and ignore the working directory,
+        # so the cache can be shared between builds in different locations
+        env["CCACHE_BASEDIR"] = base_dir
+        env["CCACHE_NOHASHDIR"] = "1"
+        if cache_dir is not None and "CCACHE_DIR" not in os.environ:
+            env["CCACHE_DIR"] = os.fspath(cache_dir / "ccache")
+    return env
+
+
+@contextlib.contextmanager
+def compiler_cache(
+    base_dir: str | os.PathLike[str] = ".",
+    launcher: None | str = None,
+) -> Iterator[None | str]:
+    """Context manager for compiling all packages with a compiler cache.
+
+    Prefixes the ``CC`` and ``CXX`` environment variables with the compiler cache
+    executable for the duration of the context manager, so that both
+    :func:`~dep_builder.configure` and :func:`~dep_builder.build` pick it up.
+    Absolute paths within ``base_dir`` are remapped so the cache hit rate does not depend
+    on the location of the source and build directories. The cache is stored in the
+    ``ccache``/``sccache`` subdirectory of the :mod:`dep_builder` cache directory
+    unless ``CCACHE_DIR``/``SCCACHE_DIR`` are set.
+    :func:`~dep_builder.build` logs the cache statistics of every build.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        >>> import os
+        >>> from dep_builder import compiler_cache, configure, build
+
+        >>> with compiler_cache(os.getcwd()):  # doctest: +SKIP
+        ...     configure("src", "build")
+        ...     build("build")
+
+    Parameters
+    ----------
+    base_dir : str | os.PathLike[str]
+        The directory containing all source and build directories.
+    launcher : None | str
+        The compiler cache executable.
+        If :data:`None`, determine it via :func:`~dep_builder.find_compiler_launcher`.
+
+    Yields
+    ------
+    None | str
+        The compiler cache executable or :data:`None` if no compiler cache is available.
+
+    """
+    if launcher is None:
+        launcher = find_compiler_launcher()
+    if launcher is None:
+        logger.info("No compiler cache available")
+        yield None
+        return
+
+    env = _cache_env(launcher, os.path.abspath(base_dir))
+    logger.info(f"Using compiler cache {launcher!r}")
+    with _patched_environ(**env):
+        yield launcher
+
+
+def _get_stats(launcher: str) -> None | tuple[int, int]:
+    """Return the total number of cache hits and misses of the passed compiler cache."""
+    name = os.path.basename(launcher)
+    try:
+        if name.startswith("sccache"):
+            output = subprocess.run(
+                [launcher, "--show-stats", "--stats-format=json"], capture_output=True, text=True, check=True,
+            ).stdout
+            stats = json.loads(output)["stats"]
+            hits = sum(stats["cache_hits"]["counts"].values())
+            misses = sum(stats["cache_misses"]["counts"].values())
+            return hits, misses
+
+        output = subprocess.run([launcher, "--print-stats"], capture_output=True, text=True, check=True).stdout
+        counters = dict(line.split("\t", 1) for line in output.splitlines() if "\t" in line)
+        hits = int(counters["direct_cache_hit"]) + int(counters["preprocessed_cache_hit"])
+        return hits, int(counters["cache_miss"])
+    except (OSError, subprocess.CalledProcessError, ValueError, KeyError, TypeError):
+        pass
+
+    # Fall back to the human-readable statistics of ccache < 4
+    try:
+        output = subprocess.run([launcher, "-s"], capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    hit_counts = re.findall(r"^cache hit \((?:direct|preprocessed)\)\s+(\d+)", output, re.MULTILINE)
+    miss_counts = re.findall(r"^cache miss\s+(\d+)", output, re.MULTILINE)
+    if not hit_counts or not miss_counts:
+        return None
+    return sum(int(i) for i in hit_counts), int(miss_counts[0])
+
+
+@contextlib.contextmanager
+def _log_stats() -> Iterator[None]:
+    """Context manager for logging the compiler cache hits and misses within its scope."""
+    launcher = os.environ.get(LAUNCHER_ENV_VAR)
+    before = _get_stats(launcher) if launcher else None
+    yield
+    if launcher is None or before is None:
+        return
+
+    after = _get_stats(launcher)
+    if after is None:
+        return
+    hits, misses = (j - i for i, j in zip(before, after))
+    total = hits + misses
+    rate = f" ({100 * hits / total:.1f}% hit rate)" if total else ""
+    logger.info(f"Compiler cache {os.path.basename(launcher)!r}: {hits} hit(s), {misses} miss(es){rate}")
@@ -2,18 +2,20 @@
 
 from __future__ import annotations
 
-import operator
-import tarfile
-import stat
+import contextlib
 import os
-import subprocess
+import shutil
+import tempfile
 from collections.abc import Iterable
 from pathlib import Path
 
-import requests
 from packaging.version import Version
 
 from . import logger
+from ._download import download, CHUNK_SIZE, _open_url, _ResponseStream
+from ._cache import SourceCache, get_source_cache, _check_sha256
+from ._extract import extract_tar, _merge_tree
+from ._backend import BuildBackend, get_backend
 
 __all__ = [
     "download_and_unpack",
@@ -25,41 +27,6 @@ __all__ = [
 ]
 
 
-def _has_common_prefix(
-    directory: str | os.PathLike[str],
-    target: str | os.PathLike[str],
-) -> bool:
-    """Check if two paths have the same common prefix."""
-    abs_directory = os.path.abspath(directory)
-    abs_target = os.path.abspath(target)
-    prefix = os.path.commonprefix([abs_directory, abs_target])
-    return prefix == abs_directory
-
-
-def _safe_extract_all(
-    tar: tarfile.TarFile,
-    path: str | os.PathLike[str] = ".",
-    members: Iterable[tarfile.TarInfo] | None = None,
-    *,
-    numeric_owner: bool = False,
-) -> None:
-    """A :meth:`tarfile.TarFile.extractall` variant that's safe against path traversal attacks.
-
-    See Also
-    --------
-    CVE-2001-1267
-        Directory traversal vulnerability in GNU tar 1.13.19 and earlier allows local users to
-        overwrite arbitrary files during archive extraction via a tar file whose filenames
-        contain a ``..`` (dot dot).
-
-    """
-    for member in tar.getmembers():
-        member_path = os.path.join(path, member.name)
-        if not _has_common_prefix(path, member_path):
-            raise tarfile.TarError("Attempted path traversal in tar file")
-    tar.extractall(path, members, numeric_owner=numeric_owner)
-
-
 def parse_version(version: str) -> Version:
     """Check that a PEP 440-compliant version is provided.
 
@@ -83,9 +50,21 @@ def download_and_unpack(
     url: str,
     archive_path: str | os.PathLike[str] = "tmp.tar.gz",
     delete_archive: bool = True,
+    *,
+    chunk_size: int = CHUNK_SIZE,
+    stream: bool = False,
+    sha256: None | str = None,
+    segments: int = 1,
+    members: None | Iterable[str] = None,
+    dest: None | str | os.PathLike[str] = None,
 ) -> Path:
     """Download and unpack the archive from the provided URL.
 
+    Archives are transparently retrieved from and stored in the default
+    :class:`~dep_builder.SourceCache` (see :func:`~dep_builder.get_source_cache`),
+    no download taking place on a cache hit. ``archive_path`` and ``delete_archive``
+    are ignored if caching is enabled.
+
     Parameters
     ----------
     url : str
@@ -94,72 +73,176 @@ def download_and_unpack(
         The (absolute) path to the to-be downloaded archive.
     delete_archive : bool
         Whether the archive should be deleted after the download is complete.
+    chunk_size : int
+        The size (in bytes) of the chunks wherein the archive is streamed to disk.
+    stream : bool
+        If :data:`True`, pipe the HTTP response directly into a streaming tar reader,
+        thus extracting the archive while it is being downloaded.
+        No intermediate archive is written to disk in this case,
+        ``archive_path`` and ``delete_archive`` being ignored.
+    sha256 : None | str
+        The expected SHA-256 digest of the archive.
+        A :exc:`ValueError` is raised if the digest of the download does not match.
+        With ``stream=True`` nothing is extracted into place before the digest has been verified.
+    segments : int
+        The number of byte ranges of the archive that are downloaded in parallel.
+        Ignored if ``stream=True``.
+    members : None | Iterable[str]
+        If not :data:`None`, only extract the archive members located in (or matching) any of
+        the passed paths or glob patterns, relative to the archive's top-level directory.
+        See :func:`~dep_builder.unpack`.
+    dest : None | str | os.PathLike[str]
+        If not :data:`None`, extract the content of the archive's top-level directory
+        directly into ``dest``. See :func:`~dep_builder.unpack`.
 
     Returns
     -------
     pathlib.Path
-        The absolute path to the downloaded and extracted archive.
+        The absolute path to the downloaded and extracted archive, or to ``dest`` if specified.
 
     """
-    archive_path = os.fsdecode(archive_path)
+    cache = get_source_cache()
+    if stream:
+        cached_path = cache.lookup(url, sha256) if cache is not None else None
+        if cached_path is None:
+            return _stream_and_unpack(url, cache, sha256, members=members, dest=dest)
+        logger.info(f"Using cached archive {os.fspath(cached_path)!r}")
+        return unpack(cached_path, members=members, dest=dest)
+    elif cache is not None:
+        archive = cache.fetch(url, sha256, chunk_size=chunk_size, segments=segments)
+        return unpack(archive, members=members, dest=dest)
+
     logger.info(f"Download {url!r}")
+    archive_path = os.fsdecode(archive_path)
     try:
-        with open(archive_path, "wb") as f1, requests.get(url, allow_redirects=True) as r:
-            r.raise_for_status()
-            f1.write(r.content)
-
-        with tarfile.open(archive_path, "r") as f2:
-            root = {i.split(os.sep)[0 if not i.startswith(".") else 1] for i in f2.getnames()}
-            if len(root) != 1:
-                raise ValueError(
-                    f"Expected a single top-directory in {archive_path!r}, observed {len(root)}"
-                )
-            output_dir = root.pop()
-            logger.info(f"Unpack archive {archive_path!r} to {output_dir!r}")
-            _safe_extract_all(f2)
+        download(url, archive_path, chunk_size=chunk_size, segments=segments)
+        return unpack(archive_path, sha256=sha256, members=members, dest=dest)
     finally:
         if delete_archive and os.path.isfile(archive_path):
             os.remove(archive_path)
 
-    return Path(os.getcwd()) / output_dir
+
+def _stream_and_unpack(
+    url: str,
+    cache: None | SourceCache = None,
+    sha256: None | str = None,
+    *,
+    members: None | Iterable[str] = None,
+    dest: None | str | os.PathLike[str] = None,
+) -> Path:
+    """Download and simultaneously unpack the archive from the provided URL.
+
+    If ``sha256`` is specified, the archive is extracted into a staging directory
+    that is only moved into place once the digest of the full download has been verified.
+
+    """
+    logger.info(f"Download and unpack {url!r}")
+    with contextlib.ExitStack() as stack:
+        sink = stack.enter_context(cache.writer(url, sha256)) if cache is not None else None
+        r = stack.enter_context(_open_url(url, sink))
+        if sha256 is None:
+            return _extract(r, members, dest)
+
+        parent = dest if dest is not None else os.getcwd()
+        os.makedirs(parent, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".dep_builder_unpack-", dir=parent)
+        try:
+            output_dir = extract_tar(r, staging, members=members, strip_root=dest is not None)
+            # Include trailing data not consumed by the tar reader (e.g. padding) in the digest
+            while r.read(CHUNK_SIZE):
+                pass
+            digest = r.hexdigest()
+            if digest != sha256.lower():
+                raise ValueError(f"SHA-256 mismatch for {url!r}: expected {sha256!r}, observed {digest!r}")
+
+            if dest is None:
+                _merge_tree(os.path.join(staging, output_dir), os.path.join(parent, output_dir), move=True)
+                logger.info(f"Unpacked archive to {output_dir!r}")
+                return Path(parent) / output_dir
+            _merge_tree(staging, dest, move=True)
+            logger.info(f"Unpacked archive to {os.fsdecode(dest)!r}")
+            return Path(dest).absolute()
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+def _extract(
+    archive: str | _ResponseStream,
+    members: None | Iterable[str] = None,
+    dest: None | str | os.PathLike[str] = None,
+) -> Path:
+    """Extract the archive into either the current working directory or ``dest``."""
+    if dest is None:
+        output_dir = extract_tar(archive, members=members)
+        logger.info(f"Unpacked archive to {output_dir!r}")
+        return Path(os.getcwd()) / output_dir
+
+    os.makedirs(dest, exist_ok=True)
+    extract_tar(archive, dest, members=members, strip_root=True)
+    logger.info(f"Unpacked archive to {os.fsdecode(dest)!r}")
+    return Path(dest).absolute()
 
 
 def unpack(
     archive_path: str | os.PathLike[str],
+    *,
+    sha256: None | str = None,
+    members: None | Iterable[str] = None,
+    dest: None | str | os.PathLike[str] = None,
 ) -> Path:
     """Unpack the archive from the provided path.
 
+    Examples
+    --------
+    Only extract Boost's headers, directly into the ``include`` directory of the prefix:
+
+    .. code-block:: python
+
+        >>> unpack("boost_1_83_0.tar.gz", members=["boost"], dest="/usr/local/include")  # doctest: +SKIP
+        PosixPath('/usr/local/include')
+
     Parameters
     ----------
     archive_path : str | os.PathLike[str]
         The (absolute) path to the to-be downloaded archive.
+    sha256 : None | str
+        The expected SHA-256 digest of the archive.
+        A :exc:`ValueError` is raised if the digest of the archive does not match.
+    members : None | Iterable[str]
+        If not :data:`None`, only extract the archive members located in (or matching) any of
+        the passed paths or glob patterns. Paths are relative to the archive's top-level
+        directory, *e.g.* ``["include/highfive"]`` or ``["Eigen", "*.md"]``.
+        All other members are skipped without ever being written to disk.
+    dest : None | str | os.PathLike[str]
+        If not :data:`None`, strip the archive's top-level directory and extract its content
+        directly into ``dest``, rather than into the current working directory.
 
     Returns
     -------
     pathlib.Path
-        The absolute path to the extracted archive.
+        The absolute path to the extracted archive, or to ``dest`` if specified.
 
     """
     archive_path = os.fsdecode(archive_path)
-    with tarfile.open(archive_path, "r") as f:
-        root = {i.split(os.sep)[0 if not i.startswith(".") else 1] for i in f.getnames()}
-        if len(root) != 1:
-            raise ValueError(
-                f"Expected a single top-directory in {archive_path!r}, observed {len(root)}"
-            )
-        output_dir = root.pop()
-        logger.info(f"Unpack archive {archive_path!r} to {output_dir!r}")
-        _safe_extract_all(f)
-
-    return Path(os.getcwd()) / output_dir
+    if sha256 is not None:
+        _check_sha256(archive_path, sha256)
+    logger.info(f"Unpack archive {archive_path!r}")
+    return _extract(archive_path, members, dest)
 
 
 def configure(
     src_path: str | os.PathLike[str],
     build_path: str | os.PathLike[str] = "build",
     config_args: Iterable[str] = (),
+    *,
+    cache: bool = True,
+    incremental: bool = False,
+    backend: str | BuildBackend = "autotools",
 ) -> None:
-    """Run the ``configure`` executable from the passed source path.
+    """Configure the package in the passed source path, by default via its ``configure`` executable.
+
+    Within :func:`~dep_builder.capture_output`, the output of ``configure`` is written to a compressed
+    log file rather than being inherited.
 
     Parameters
     ----------
@@ -169,32 +252,46 @@ def configure(
         The path to the to-be created build directory.
     config_args : Iterable[str]
         Arguments for the ``configure`` executable in ``src_path``.
+    cache : bool
+        Whether to use the autoconf cache shared between all packages and runs with the same
+        toolchain (see :func:`~dep_builder.get_autoconf_cache_file`). Ignored if caching is disabled
+        or if ``config_args`` already specify a cache file. If ``configure`` fails because it
+        is inconsistent with the shared cache (*e.g.* due to a changed environment variable,
+        as reported in ``config.log``), it is rerun without it; other failures are raised immediately.
+    incremental : bool
+        Whether to reuse an existing build directory. ``configure`` is skipped altogether if
+        the ``configure`` script, its arguments and the toolchain (see :func:`~dep_builder.toolchain_key`)
+        are identical to those of the previous run, as recorded in a fingerprint next to
+        ``config.status``, leaving it up to ``make`` to determine what needs to be rebuilt.
+    backend : str | dep_builder.BuildBackend
+        The build backend (see :func:`~dep_builder.get_backend`), *e.g.* ``"autotools"`` or ``"cmake"``.
 
     """
-    config_path = os.path.join(src_path, "configure")
-    os.chmod(config_path, stat.S_IRUSR | stat.S_IXUSR)
-
-    cmd = " ".join([config_path, *config_args])
-    logger.info(cmd)
-
-    os.mkdir(build_path)
-    subprocess.run(cmd, shell=True, cwd=build_path, check=True)
+    get_backend(backend).configure(src_path, build_path, config_args, cache=cache, incremental=incremental)
 
 
 def read_config_log(
     build_path: str | os.PathLike[str] = "build",
-    log_name: str | os.PathLike[str] = "config.log",
+    log_name: None | str | os.PathLike[str] = None,
+    *,
+    backend: str | BuildBackend = "autotools",
 ) -> None:
-    """Write the ``./configure`` output to the logger.
+    """Write the ``./configure`` (or ``cmake``) output to the logger.
 
     Parameters
     ----------
     build_path : str | os.PathLike[str]
         The path to the build directory.
-    log_name : str | os.PathLike[str]
+    log_name : None | str | os.PathLike[str]
         The name of the logfile inside ``build_path``.
+        If :data:`None`, use the first existing configuration log of ``backend``.
+    backend : str | dep_builder.BuildBackend
+        The build backend used for configuring the package.
 
     """
+    if log_name is None:
+        log_names = get_backend(backend).config_logs
+        log_name = next((i for i in log_names if os.path.isfile(os.path.join(build_path, i))), log_names[0])
     log_file = os.path.join(build_path, log_name)
     if not os.path.isfile(log_file):
         logger.debug(f"No such file: {log_file!r}")
@@ -205,8 +302,24 @@ def read_config_log(
             logger.debug(i.strip())
 
 
-def build(build_path: str | os.PathLike[str], cpu_count: int | None = None) -> None:
-    """Build and install a package via GNU make.
+def build(
+    build_path: str | os.PathLike[str],
+    cpu_count: int | None = None,
+    *,
+    memory_per_job: int | None = None,
+    destdir: None | str | os.PathLike[str] = None,
+    backend: str | BuildBackend = "autotools",
+) -> None:
+    """Build and install a package, by default via GNU make.
+
+    If a GNU make jobserver is passed via the ``MAKEFLAGS`` environment variable
+    (*e.g.* by :func:`~dep_builder.build_all` or a parent ``make`` process),
+    ``make`` joins it rather than starting its own jobs, thus sharing
+    the available CPU cores with all other concurrent builds.
+    The hits and misses of the compiler cache, if enabled via :func:`~dep_builder.compiler_cache`,
+    are logged after the build.
+    Within :func:`~dep_builder.capture_output`, the output of ``make`` is written to a compressed
+    log file rather than being inherited.
 
     Parameters
     ----------
@@ -214,14 +327,17 @@ def build(build_path: str | os.PathLike[str], cpu_count: int | None = None) -> N
         The path to the build directory.
     cpu_count : int | None
         The number of CPU cores to use for the build process.
-        Using :data:`None` defaults to the output of :func:`os.cpu_count`.
+        Using :data:`None` determines the number of jobs via :func:`~dep_builder.get_job_count`,
+        bounded by the ``DEP_BUILDER_JOBS`` environment variable (as set by :func:`~dep_builder.build_all`).
+        Ignored when joining a jobserver.
+    memory_per_job : int | None
+        An estimate of the peak memory usage (in bytes) of a single build job.
+        Only relevant if ``cpu_count`` is :data:`None`.
+    destdir : None | str | os.PathLike[str]
+        If not :data:`None`, stage the installation in ``destdir`` via ``make install DESTDIR=...``
+        rather than installing it directly, *e.g.* for storing it in the :class:`~dep_builder.BuildCache`.
+    backend : str | dep_builder.BuildBackend
+        The build backend used for configuring the package (see :func:`~dep_builder.get_backend`).
 
     """
-    if cpu_count is None:
-        cpu_count = os.cpu_count()
-    else:
-        cpu_count = operator.index(cpu_count)
-
-    logger.info(f"Running 'make -j {cpu_count} && make install'")
-    subprocess.run(f"make -j {cpu_count}", shell=True, cwd=build_path, check=True)
-    subprocess.run("make install", shell=True, cwd=build_path, check=True)
+    get_backend(backend).build(build_path, cpu_count, memory_per_job=memory_per_job, destdir=destdir)
@@ -0,0 +1,231 @@
+"""Functions for decompressing archives, preferably with multi-threaded external tools."""
+
+from __future__ import annotations
+
+import os
+import io
+import bz2
+import gzip
+import lzma
+import shutil
+import importlib
+import threading
+import contextlib
+import subprocess
+from typing import TYPE_CHECKING, Any
+from collections.abc import Iterator, Callable
+
+from . import logger
+
+if TYPE_CHECKING:
+    from typing_extensions import Protocol
+
+    class _SupportsRead(Protocol):
+        def read(self, __size: int) -> bytes: ...
+
+__all__ = ["open_decompressed", "detect_format", "MAGIC_NUMBERS", "EXTERNAL_DECOMPRESSORS"]
+
+#: The size (in bytes) of the chunks that are piped into external decompressors.
+_CHUNK_SIZE = 1024**2
+
+#: Magic numbers of the supported compression formats.
+MAGIC_NUMBERS: dict[bytes, str] = {
+    b"\x1f\x8b": "gzip",
+    b"BZh": "bzip2",
+    b"\xfd7zXZ\x00": "xz",
+    b"\x28\xb5\x2f\xfd": "zstd",
+}
+
+#: External decompressors of all compression formats, in order of preference.
+#: The compressed data is passed via stdin and the decompressed data is read from stdout.
+#: Ignored on Windows.
+EXTERNAL_DECOMPRESSORS: dict[str, tuple[tuple[str, ...], ...]] = {
+    "gzip": (("pigz", "-dc"),),
+    "bzip2": (("lbzip2", "-dc"), ("pbzip2", "-dc")),
+    "xz": (("xz", "-dc", "-T0"),),
+    "zstd": (("zstd", "-dc", "-T0"),),
+}
+
+
+def _open_zstd(fileobj: _SupportsRead) -> _SupportsRead:
+    """Open a zstd-compressed stream with either :mod:`compression.zstd` or :mod:`zstandard`."""
+    try:
+        zstd = importlib.import_module("compression.zstd")
+    except ImportError:
+        pass
+    else:
+        ret: _SupportsRead = zstd.ZstdFile(fileobj, mode="rb")
+        return ret
+
+    try:
+        zstandard = importlib.import_module("zstandard")
+    except ImportError:
+        raise ValueError(
+            "Decompressing zstd archives requires either the 'zstd' executable "
+            "or the 'zstandard' Python package"
+        ) from None
+    ret = zstandard.ZstdDecompressor().stream_reader(fileobj, read_across_frames=True)
+    return ret
+
+
+#: Python-based decompressors of all compression formats.
+_STDLIB_DECOMPRESSORS: dict[str, Callable[[Any], _SupportsRead]] = {
+    "gzip": lambda f: gzip.GzipFile(fileobj=f, mode="rb"),
+    "bzip2": lambda f: bz2.BZ2File(f, mode="rb"),
+    "xz": lambda f: lzma.LZMAFile(f, mode="rb"),
+    "zstd": _open_zstd,
+}
+
+
+def detect_format(prefix: bytes) -> None | str:
+    """Return the compression format based on the passed leading bytes of a file.
+
+    Parameters
+    ----------
+    prefix : bytes
+        The first (at least 6) bytes of the file.
+
+    Returns
+    -------
+    None | str
+        The name of the compression format or :data:`None` if the data is not compressed.
+
+    """
+    for magic, name in MAGIC_NUMBERS.items():
+        if prefix.startswith(magic):
+            return name
+    return None
+
+
+class _PrefixedReader:
+    """A file-like object that returns ``prefix`` before the content of ``fileobj``."""
+
+    __slots__ = ("_prefix", "_fileobj")
+
+    def __init__(self, prefix: bytes, fileobj: _SupportsRead) -> None:
+        self._prefix = prefix
+        self._fileobj = fileobj
+
+    def read(self, size: int = -1) -> bytes:
+        """Read and return up to ``size`` bytes."""
+        if not self._prefix:
+            return self._fileobj.read(size)
+        elif 0 <= size <= len(self._prefix):
+            ret, self._prefix = self._prefix[:size], self._prefix[size:]
+            return ret
+        ret, self._prefix = self._prefix, b""
+        return ret + self._fileobj.read(size - len(ret) if size >= 0 else size)
+
+
+def _find_external(fmt: str) -> None | list[str]:
+    """Return the command of the first available external decompressor for ``fmt``."""
+    if os.name == "nt":
+        # Decompressors are only known to work via pipes on POSIX systems
+        return None
+    for cmd in EXTERNAL_DECOMPRESSORS.get(fmt, ()):
+        executable = shutil.which(cmd[0])
+        if executable is not None:
+            return [executable, *cmd[1:]]
+    return None
+
+
+def _pump(src: _SupportsRead, dst: io.BufferedWriter, errors: list[BaseException]) -> None:
+    """Copy all data from ``src`` to ``dst``, storing any raised exceptions in ``errors``."""
+    try:
+        with dst:
+            for chunk in iter(lambda: src.read(_CHUNK_SIZE), b""):
+                dst.write(chunk)
+    except BrokenPipeError:
+        pass
+    except BaseException as ex:
+        errors.append(ex)
+
+
+def _get_fileno(fileobj: _SupportsRead, prefix: bytes) -> None | int:
+    """Return the file descriptor of ``fileobj`` positioned right before ``prefix``, if possible."""
+    try:
+        fileno: int = fileobj.fileno()  # type: ignore[attr-defined]
+        if not fileobj.seekable():  # type: ignore[attr-defined]
+            return None
+        # Bypass the buffer of `fileobj` and reposition the underlying file descriptor directly
+        offset: int = fileobj.tell() - len(prefix)  # type: ignore[attr-defined]
+        os.lseek(fileno, offset, os.SEEK_SET)
+    except (AttributeError, OSError):
+        return None
+    return fileno
+
+
+@contextlib.contextmanager
+def _open_external(cmd: list[str], fileobj: _SupportsRead, prefix: bytes) -> Iterator[_SupportsRead]:
+    """Decompress ``fileobj``, whose first bytes ``prefix`` have already been read, by running ``cmd``."""
+    logger.info(f"Decompressing with {' '.join(cmd)!r}")
+    errors: list[BaseException] = []
+    thread: None | threading.Thread = None
+
+    # Pass real files directly to the subprocess; pipe everything else via a helper thread
+    fileno = _get_fileno(fileobj, prefix)
+    if fileno is not None:
+        proc = subprocess.Popen(cmd, stdin=fileno, stdout=subprocess.PIPE)
+    else:
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        assert proc.stdin is not None
+        args = (_PrefixedReader(prefix, fileobj), proc.stdin, errors)
+        thread = threading.Thread(target=_pump, args=args, daemon=True)
+        thread.start()
+
+    assert proc.stdout is not None
+    try:
+        yield proc.stdout
+        # Consume any trailing data (e.g. tar padding) so the decompressor can exit cleanly
+        while proc.stdout.read(_CHUNK_SIZE):
+            pass
+    except BaseException:
+        proc.kill()
+        raise
+    finally:
+        proc.stdout.close()
+        proc.wait()
+        if thread is not None:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+    elif proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+
+
+@contextlib.contextmanager
+def open_decompressed(
+    fileobj: _SupportsRead,
+    *,
+    external: bool = True,
+) -> Iterator[_SupportsRead]:
+    """Context manager for sequentially reading the decompressed content of ``fileobj``.
+
+    The compression format (gzip, bzip2, xz or zstd) is detected based on its magic number.
+    If available, multi-threaded external decompressors (``pigz``, ``lbzip2``/``pbzip2``,
+    ``xz -T0`` and ``zstd -T0``) are used, falling back to the Python standard library otherwise.
+    Uncompressed data is passed through as is.
+
+    Parameters
+    ----------
+    fileobj : file-like object
+        The compressed binary stream.
+    external : bool
+        Whether to use external decompressors if available.
+
+    """
+    prefix = fileobj.read(6)
+    fmt = detect_format(prefix)
+    if fmt is None:
+        yield _PrefixedReader(prefix, fileobj)
+        return
+
+    cmd = _find_external(fmt) if external else None
+    if cmd is None:
+        logger.debug(f"Decompressing {fmt} stream with the Python standard library")
+        yield _STDLIB_DECOMPRESSORS[fmt](_PrefixedReader(prefix, fileobj))
+        return
+
+    with _open_external(cmd, fileobj, prefix) as f:
+        yield f
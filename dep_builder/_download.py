@@ -0,0 +1,319 @@
+"""Functions for streaming files from the web to disk."""
+
+from __future__ import annotations
+
+import os
+import time
+import hashlib
+import operator
+import threading
+import contextlib
+import concurrent.futures
+from typing import BinaryIO
+from collections.abc import Iterator
+
+import requests
+
+from . import logger
+
+__all__ = ["download", "CHUNK_SIZE"]
+
+#: The default size (in bytes) of the chunks read from the HTTP response.
+CHUNK_SIZE = 1024**2
+
+#: The minimum interval (in seconds) between two download progress reports.
+REPORT_INTERVAL = 5.0
+
+#: The connect and read timeouts (in seconds) of all HTTP requests.
+TIMEOUT = (30.0, 60.0)
+
+#: Exceptions upon which an interrupted download is resumed.
+_RETRY_EXCEPTIONS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+def _format_size(n_bytes: float) -> str:
+    """Format the passed number of bytes as a human-readable string."""
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(n_bytes) < 1024 or unit == "GiB":
+            break
+        n_bytes /= 1024
+    return f"{n_bytes:.1f} {unit}"
+
+
+class _ProgressReporter:
+    """Helper class for periodically logging the transfer rate of a download."""
+
+    __slots__ = ("url", "total", "n_bytes", "_initial", "_start", "_last_report", "_lock")
+
+    def __init__(self, url: str, total: int | None = None, n_bytes: int = 0) -> None:
+        self.url = url
+        self.total = total
+        self.n_bytes = self._initial = n_bytes
+        self._start = self._last_report = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        """The mean transfer rate in bytes per second."""
+        duration = time.monotonic() - self._start
+        return max(0, self.n_bytes - self._initial) / duration if duration > 0 else 0.0
+
+    def update(self, n_bytes: int) -> None:
+        """Register ``n_bytes`` newly received bytes and log the progress if appropriate."""
+        with self._lock:
+            self.n_bytes += n_bytes
+            now = time.monotonic()
+            if now - self._last_report < REPORT_INTERVAL:
+                return
+            self._last_report = now
+        self.report()
+
+    def report(self) -> None:
+        """Log the current download progress."""
+        progress = _format_size(self.n_bytes)
+        if self.total:
+            progress += f" / {_format_size(self.total)} ({100 * self.n_bytes / self.total:.0f}%)"
+        name = self.url.rstrip("/").rpartition("/")[2]
+        logger.info(f"Downloaded {progress} of {name!r} at {_format_size(self.rate)}/s")
+
+
+class _ResponseStream:
+    """A minimal read-only file-like object for sequentially reading a streamed HTTP response.
+
+    All read data is additionally written to ``sink``, if provided, and hashed.
+
+    """
+
+    __slots__ = ("_response", "_progress", "_sink", "_hash")
+
+    def __init__(
+        self,
+        response: requests.Response,
+        progress: _ProgressReporter,
+        sink: None | BinaryIO = None,
+    ) -> None:
+        self._response = response
+        self._progress = progress
+        self._sink = sink
+        self._hash = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        """Read and return up to ``size`` bytes from the response."""
+        data: bytes = self._response.raw.read(None if size < 0 else size, decode_content=True)
+        self._progress.update(len(data))
+        self._hash.update(data)
+        if self._sink is not None:
+            self._sink.write(data)
+        return data
+
+    def hexdigest(self) -> str:
+        """Return the SHA-256 digest of all data read so far."""
+        return self._hash.hexdigest()
+
+
+@contextlib.contextmanager
+def _open_url(
+    url: str,
+    sink: None | BinaryIO = None,
+    session: None | requests.Session = None,
+) -> Iterator[_ResponseStream]:
+    """Context manager for reading the content of the provided URL as a file-like stream."""
+    with (session or requests).get(url, allow_redirects=True, stream=True, timeout=TIMEOUT) as r:
+        r.raise_for_status()
+        total = r.headers.get("Content-Length")
+        progress = _ProgressReporter(url, int(total) if total is not None else None)
+        stream = _ResponseStream(r, progress, sink)
+        yield stream
+        # Make sure trailing data not consumed by the reader (e.g. tar padding) also ends up in `sink`
+        while stream.read(CHUNK_SIZE):
+            pass
+    progress.report()
+
+
+def _content_size(response: requests.Response) -> None | int:
+    """Return the full size of the resource requested by ``response``, if known."""
+    content_range = response.headers.get("Content-Range")
+    if content_range is not None and not content_range.endswith("/*"):
+        return int(content_range.rpartition("/")[2])
+    elif response.status_code == 200 and "Content-Length" in response.headers:
+        return int(response.headers["Content-Length"])
+    return None
+
+
+def _fetch_range(
+    url: str,
+    f: BinaryIO,
+    progress: _ProgressReporter,
+    start: int = 0,
+    stop: None | int = None,
+    *,
+    chunk_size: int = CHUNK_SIZE,
+    retries: int = 0,
+    session: None | requests.Session = None,
+) -> None:
+    """Write the bytes ``[start, stop)`` of ``url`` to the same offset in ``f``.
+
+    Interrupted transfers are resumed up to ``retries`` times via HTTP ``Range`` requests.
+
+    """
+    get = (session or requests).get
+    offset = start
+    for attempt in range(retries + 1):
+        headers = {"Accept-Encoding": "identity"}
+        if offset != 0 or stop is not None:
+            headers["Range"] = f"bytes={offset}-{'' if stop is None else stop - 1}"
+
+        try:
+            with get(url, headers=headers, allow_redirects=True, stream=True, timeout=TIMEOUT) as r:
+                if r.status_code == 416 and stop is None and offset == _content_size(r):
+                    # The partial download is, in fact, already complete
+                    return
+                r.raise_for_status()
+                if progress.total is None and stop is None:
+                    progress.total = _content_size(r)
+                if "Range" in headers and r.status_code != 206:
+                    if stop is not None:
+                        raise ValueError(f"Server does not support HTTP range requests: {url!r}")
+                    logger.warning("Server does not support HTTP range requests; restarting the download")
+                    progress.update(-offset)
+                    offset = 0
+                f.seek(offset)
+                if stop is None:
+                    f.truncate()
+                for chunk in r.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                    offset += len(chunk)
+                    progress.update(len(chunk))
+        except _RETRY_EXCEPTIONS as ex:
+            if attempt == retries:
+                raise
+            logger.warning(f"Download interrupted ({type(ex).__name__}); resuming at byte {offset}")
+            time.sleep(min(2**attempt, 30))
+            continue
+
+        if stop is None or offset >= stop:
+            return
+        elif attempt == retries:
+            raise requests.exceptions.ChunkedEncodingError(
+                f"Incomplete download: expected {stop - start} bytes, received {offset - start}"
+            )
+        logger.warning(f"Download ended prematurely; resuming at byte {offset}")
+
+
+def _probe(url: str, session: None | requests.Session = None) -> tuple[None | int, bool]:
+    """Return the size of the content of ``url`` and whether it supports HTTP range requests."""
+    headers = {"Accept-Encoding": "identity"}
+    with (session or requests).head(url, headers=headers, allow_redirects=True, timeout=TIMEOUT) as r:
+        r.raise_for_status()
+        size = r.headers.get("Content-Length")
+        accepts_ranges = r.headers.get("Accept-Ranges", "none").lower() == "bytes"
+    return (int(size) if size is not None else None), accepts_ranges
+
+
+def _download_segmented(
+    url: str,
+    path: str | os.PathLike[str],
+    size: int,
+    segments: int,
+    *,
+    chunk_size: int = CHUNK_SIZE,
+    retries: int = 0,
+    session: None | requests.Session = None,
+) -> _ProgressReporter:
+    """Download ``url`` in ``segments`` parallel byte ranges."""
+    with open(path, "wb") as f:
+        f.truncate(size)
+
+    progress = _ProgressReporter(url, size)
+    step = -(-size // segments)
+
+    def fetch(start: int) -> None:
+        with open(path, "r+b") as f:
+            stop = min(start + step, size)
+            _fetch_range(
+                url, f, progress, start, stop, chunk_size=chunk_size, retries=retries, session=session,
+            )
+
+    logger.info(f"Downloading in {segments} segments of {_format_size(step)}")
+    with concurrent.futures.ThreadPoolExecutor(segments, thread_name_prefix="download") as executor:
+        for future in [executor.submit(fetch, i) for i in range(0, size, step)]:
+            future.result()
+    return progress
+
+
+def download(
+    url: str,
+    path: str | os.PathLike[str],
+    *,
+    chunk_size: int = CHUNK_SIZE,
+    resume: bool = False,
+    retries: int = 5,
+    segments: int = 1,
+    session: None | requests.Session = None,
+) -> int:
+    """Stream the content of the provided URL to disk in chunks of ``chunk_size`` bytes.
+
+    As opposed to :attr:`requests.Response.content` the response is never fully loaded
+    into memory, the peak memory usage thus being independent of the size of the download.
+    Dropped connections are resumed where they left off via HTTP ``Range`` requests,
+    if supported by the server.
+
+    Parameters
+    ----------
+    url : str
+        The URL of the to-be downloaded file.
+    path : str | os.PathLike[str]
+        The path of the to-be created output file.
+    chunk_size : int
+        The size (in bytes) of the chunks that are read from the response and written to disk.
+    resume : bool
+        Whether to treat an already existing file at ``path`` as a partial download
+        and only fetch its remainder.
+    retries : int
+        The maximum number of times an interrupted download is resumed.
+    segments : int
+        The number of byte ranges that are downloaded in parallel.
+        Falls back to a single sequential download if the server does not
+        advertise support for range requests. Ignores ``resume``.
+    session : None | requests.Session
+        The session used for performing all HTTP requests, allowing connections to be reused.
+        If :data:`None`, use a new connection for every request.
+
+    Returns
+    -------
+    int
+        The number of downloaded bytes.
+
+    """
+    chunk_size = operator.index(chunk_size)
+    retries = operator.index(retries)
+    segments = operator.index(segments)
+    if chunk_size <= 0:
+        raise ValueError(f"`chunk_size` must be larger than 0, got {chunk_size}")
+    elif retries < 0:
+        raise ValueError(f"`retries` must be larger than or equal to 0, got {retries}")
+    elif segments <= 0:
+        raise ValueError(f"`segments` must be larger than 0, got {segments}")
+
+    if segments > 1:
+        size, accepts_ranges = _probe(url, session)
+        if size is not None and accepts_ranges and size >= segments * chunk_size:
+            progress = _download_segmented(
+                url, path, size, segments, chunk_size=chunk_size, retries=retries, session=session,
+            )
+            progress.report()
+            return progress.n_bytes
+        logger.info("Segmented download unavailable; falling back to a sequential download")
+
+    start = os.path.getsize(path) if resume and os.path.isfile(path) else 0
+    if start:
+        logger.info(f"Resuming partial download at byte {start}")
+    with open(path, "r+b" if start else "wb") as f:
+        progress = _ProgressReporter(url, n_bytes=start)
+        _fetch_range(url, f, progress, start, chunk_size=chunk_size, retries=retries, session=session)
+    progress.report()
+    return progress.n_bytes
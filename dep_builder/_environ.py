@@ -0,0 +1,24 @@
+"""Functions for temporarily modifying the environment variables of the current process."""
+
+from __future__ import annotations
+
+import os
+import contextlib
+from collections.abc import Iterator
+
+__all__: list[str] = []
+
+
+@contextlib.contextmanager
+def _patched_environ(**variables: str) -> Iterator[None]:
+    """Context manager for setting the passed environment variables, restoring their old values upon exiting."""
+    old_values = {k: os.environ.get(k) for k in variables}
+    os.environ.update(variables)
+    try:
+        yield
+    finally:
+        for k, v in old_values.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
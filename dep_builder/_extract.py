@@ -0,0 +1,311 @@
+"""Functions for validating and extracting tar archives in a single sequential pass."""
+
+from __future__ import annotations
+
+import os
+import shutil
+import fnmatch
+import tarfile
+import operator
+import contextlib
+import collections
+import concurrent.futures
+from typing import TYPE_CHECKING, ClassVar
+from collections.abc import Iterable, Collection
+
+from ._decompress import open_decompressed
+
+if TYPE_CHECKING:
+    from typing_extensions import Protocol, Self
+
+    class _SupportsRead(Protocol):
+        def read(self, __size: int) -> bytes: ...
+
+__all__ = ["extract_tar", "DEFAULT_WORKERS"]
+
+#: The default number of threads used for writing extracted files to disk.
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def _has_common_prefix(
+    directory: str | os.PathLike[str],
+    target: str | os.PathLike[str],
+) -> bool:
+    """Check if two paths have the same common prefix."""
+    abs_directory = os.path.abspath(directory)
+    abs_target = os.path.abspath(target)
+    prefix = os.path.commonprefix([abs_directory, abs_target])
+    return prefix == abs_directory
+
+
+def _split_root(name: str) -> tuple[str, str]:
+    """Split the passed tar member name into its top-level directory and the remainder."""
+    parts = name.split(os.sep)
+    if name.startswith("."):
+        parts = parts[1:]
+    return parts[0], os.sep.join(parts[1:])
+
+
+def _match(name: str, patterns: Collection[str]) -> bool:
+    """Check if ``name`` is, or is located in, any of the passed paths or glob patterns."""
+    for pattern in patterns:
+        if name == pattern or name.startswith(pattern + os.sep) or fnmatch.fnmatchcase(name, pattern):
+            return True
+    return False
+
+
+def _check_member(member: tarfile.TarInfo, path: str | os.PathLike[str]) -> None:
+    """Check that ``member`` is safe to extract into ``path``.
+
+    See Also
+    --------
+    CVE-2001-1267
+        Directory traversal vulnerability in GNU tar 1.13.19 and earlier allows local users to
+        overwrite arbitrary files during archive extraction via a tar file whose filenames
+        contain a ``..`` (dot dot).
+
+    """
+    member_path = os.path.join(path, member.name)
+    if not _has_common_prefix(path, member_path):
+        raise tarfile.TarError("Attempted path traversal in tar file")
+
+
+def _merge_tree(src: str | os.PathLike[str], dst: str | os.PathLike[str], *, move: bool) -> None:
+    """Move or copy the content of directory ``src`` into ``dst``, replacing existing files but merging existing directories.
+
+    Symlinks are preserved rather than followed.
+
+    """
+    os.makedirs(dst, exist_ok=True)
+    with os.scandir(src) as entries:
+        for entry in entries:
+            target = os.path.join(dst, entry.name)
+            target_is_dir = os.path.isdir(target) and not os.path.islink(target)
+            if entry.is_dir(follow_symlinks=False) and (target_is_dir or not move):
+                _merge_tree(entry.path, target, move=move)
+                continue
+
+            if target_is_dir:
+                shutil.rmtree(target)
+            elif not move and os.path.lexists(target):
+                os.remove(target)
+
+            if move:
+                os.replace(entry.path, target)
+            elif entry.is_symlink():
+                os.symlink(os.readlink(entry.path), target)
+            else:
+                shutil.copy2(entry.path, target)
+
+
+class _FileWriter:
+    """Helper class for writing regular tar members to disk on a pool of worker threads.
+
+    Decompression remains sequential: the data of small regular files is read on the calling
+    thread, after which the file creation, writing and setting of its attributes is handed
+    over to the thread pool. The number of in-flight files is bounded to limit memory usage.
+
+    """
+
+    __slots__ = ("_tar", "_numeric_owner", "_executor", "_pending", "_max_pending", "_dirs", "_targets")
+
+    #: Regular files larger than this (in bytes) are extracted on the calling thread.
+    MAX_SIZE: ClassVar[int] = 4 * 1024**2
+
+    def __init__(self, tar: tarfile.TarFile, workers: int, numeric_owner: bool = False) -> None:
+        self._tar = tar
+        self._numeric_owner = numeric_owner
+        self._executor = (
+            concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix="extract") if workers > 1 else None
+        )
+        self._pending: collections.deque[tuple[str, concurrent.futures.Future[None]]] = collections.deque()
+        self._max_pending = 16 * workers
+        self._dirs: set[str] = set()
+        self._targets: set[str] = set()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, *args: object) -> None:
+        try:
+            if exc_type is None:
+                self.drain()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+
+    def drain(self, n: int = 0) -> None:
+        """Wait until at most ``n`` files are still pending, re-raising any exceptions."""
+        while len(self._pending) > n:
+            target_path, future = self._pending.popleft()
+            self._targets.discard(target_path)
+            future.result()
+
+    def wait(self, target_path: str) -> None:
+        """Wait until no file is pending for the passed path anymore, *e.g.* before replacing it."""
+        if target_path in self._targets:
+            self.drain()
+
+    def makedirs(self, dir_path: str) -> None:
+        """Create the passed directory on the calling thread, if it does not exist yet."""
+        if dir_path not in self._dirs:
+            os.makedirs(dir_path, exist_ok=True)
+            self._dirs.add(dir_path)
+
+    def submit(self, member: tarfile.TarInfo, path: str | os.PathLike[str]) -> bool:
+        """Submit the passed regular file for extraction.
+
+        Returns :data:`False` if ``member`` is not suitable for extraction on a worker thread
+        or if no worker threads are available.
+
+        """
+        if self._executor is None or not member.isreg() or member.size > self.MAX_SIZE:
+            return False
+
+        fileobj = self._tar.extractfile(member)
+        assert fileobj is not None
+        data = fileobj.read()
+        target_path = os.path.join(path, member.name)
+        self.makedirs(os.path.dirname(target_path) or ".")
+
+        self.drain(self._max_pending)
+        self._pending.append((target_path, self._executor.submit(self._write, member, target_path, data)))
+        self._targets.add(target_path)
+        return True
+
+    def _write(self, member: tarfile.TarInfo, target_path: str, data: bytes) -> None:
+        with open(target_path, "wb") as f:
+            f.write(data)
+        self._tar.chown(member, target_path, numeric_owner=self._numeric_owner)
+        self._tar.chmod(member, target_path)
+        self._tar.utime(member, target_path)
+
+
+def extract_tar(
+    archive: str | os.PathLike[str] | _SupportsRead,
+    path: str | os.PathLike[str] = ".",
+    *,
+    numeric_owner: bool = False,
+    workers: None | int = None,
+    members: None | Iterable[str] = None,
+    strip_root: bool = False,
+) -> str:
+    """Validate and extract a (compressed) tar archive in a single sequential pass.
+
+    As opposed to :meth:`tarfile.TarFile.extractall` the archive is read as a stream,
+    decompressing it only once, and members are discarded once they have been extracted,
+    so the full member list is never held in memory.
+    Every member is checked for path traversal attacks before it is extracted.
+    The attributes (permissions, owner and modification time) of directories that
+    already exist are left untouched.
+
+    Parameters
+    ----------
+    archive : str | os.PathLike[str] | file-like object
+        The path to the archive or a file-like object that can be read sequentially.
+    path : str | os.PathLike[str]
+        The directory wherein the archive will be extracted.
+    numeric_owner : bool
+        If :data:`True`, only the numbers for user/group names are used and not the names.
+    workers : None | int
+        The number of threads used for writing regular files to disk.
+        Decompression always happens sequentially on the calling thread.
+        If :data:`None`, use :data:`DEFAULT_WORKERS` threads.
+    members : None | Iterable[str]
+        If not :data:`None`, only extract the members located in (or matching) any of the
+        passed paths or glob patterns. Paths are relative to the archive's top-level directory,
+        *e.g.* ``["include/highfive"]``. Non-matching members are skipped without being written.
+    strip_root : bool
+        Whether to strip the top-level directory from all member names,
+        thus extracting its content directly into ``path``.
+
+    Returns
+    -------
+    str
+        The name of the archive's one and only top-level directory.
+
+    """
+    workers = DEFAULT_WORKERS if workers is None else operator.index(workers)
+    if workers <= 0:
+        raise ValueError(f"`workers` must be larger than 0, got {workers}")
+
+    with contextlib.ExitStack() as stack:
+        if isinstance(archive, (str, os.PathLike)):
+            archive = stack.enter_context(open(archive, "rb"))
+        fileobj = stack.enter_context(open_decompressed(archive))
+        tar = stack.enter_context(tarfile.open(fileobj=fileobj, mode="r|"))  # type: ignore[call-overload]
+        writer = stack.enter_context(_FileWriter(tar, workers, numeric_owner))
+        patterns = None if members is None else {i.strip(os.sep) for i in members}
+        root = _extract_members(tar, writer, path, numeric_owner, patterns, strip_root)
+
+    if len(root) != 1:
+        raise ValueError(f"Expected a single top-directory in the archive, observed {len(root)}")
+    return root.pop()
+
+
+def _extract_members(
+    tar: tarfile.TarFile,
+    writer: _FileWriter,
+    path: str | os.PathLike[str],
+    numeric_owner: bool = False,
+    patterns: None | Collection[str] = None,
+    strip_root: bool = False,
+) -> set[str]:
+    """Extract all members of the stream-mode ``tar``, returning their top-level directories."""
+    root: set[str] = set()
+    directories: list[tarfile.TarInfo] = []
+    for member in iter(tar.next, None):
+        root_dir, name = _split_root(member.name)
+        root.add(root_dir)
+        if len(root) != 1:
+            raise ValueError(f"Expected a single top-directory in the archive, observed {len(root)}")
+        elif patterns is not None and not _match(name, patterns):
+            del tar.members[:]  # type: ignore[attr-defined]
+            continue
+        elif strip_root:
+            if not name:
+                continue
+            member.name = name
+            if member.islnk():
+                member.linkname = _split_root(member.linkname)[1]
+
+        _check_member(member, path)
+
+        if member.isdir():
+            # For directories, delay setting attributes until later,
+            # since permissions can interfere with extraction and
+            # extracting contents can reset mtime.
+            # The attributes of pre-existing directories are left untouched.
+            dir_path = os.path.join(path, member.name)
+            if not os.path.isdir(dir_path):
+                directories.append(member)
+            writer.makedirs(dir_path)
+            del tar.members[:]  # type: ignore[attr-defined]
+            continue
+
+        # Replace existing (possibly read-only) files, e.g. when extracting into an existing source tree
+        # A path may occur multiple times in an archive, in which case the last member wins
+        target_path = os.path.join(path, member.name)
+        writer.wait(target_path)
+        if os.path.lexists(target_path) and not os.path.isdir(target_path):
+            os.remove(target_path)
+        if not writer.submit(member, path):
+            # Links may refer to files that are still pending
+            if member.islnk() or member.issym():
+                writer.drain()
+            tar.extract(member, path, set_attrs=True, numeric_owner=numeric_owner)
+
+        # Members are not needed anymore once extracted
+        del tar.members[:]  # type: ignore[attr-defined]
+
+    writer.drain()
+    directories.sort(key=lambda i: i.name, reverse=True)
+    for member in directories:
+        dir_path = os.path.join(path, member.name)
+        try:
+            tar.chown(member, dir_path, numeric_owner=numeric_owner)
+            tar.utime(member, dir_path)
+            tar.chmod(member, dir_path)
+        except tarfile.ExtractError:
+            pass
+    return root
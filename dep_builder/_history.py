@@ -0,0 +1,247 @@
+"""Functions for storing the stage timings of all builds and detecting performance regressions."""
+
+from __future__ import annotations
+
+import os
+import json
+import math
+import time
+import hashlib
+import contextlib
+import statistics
+from pathlib import Path
+from collections.abc import Iterable, Iterator
+from typing import NamedTuple, Any
+
+from . import logger
+from ._cache import get_cache_dir
+from ._build_cache import _platform_tag
+from ._trace import get_tracer
+
+__all__ = ["History", "Comparison", "get_history", "record_history"]
+
+#: The metrics compared by :meth:`History.compare`.
+#: The peak RSS is recorded but not compared, as it is a high-water mark of all child processes
+#: terminated so far rather than a property of the individual stages.
+METRICS = ("wall_time", "cpu_time")
+
+
+class Comparison(NamedTuple):
+    """The comparison of a single metric of a single stage between the latest run and its baseline."""
+
+    #: The name of the package.
+    package: str
+    #: The version of the package in the latest run.
+    version: str
+    #: The name of the stage.
+    stage: str
+    #: The name of the metric, *e.g.* ``"wall_time"`` or ``"cpu_time"`` (both in seconds).
+    metric: str
+    #: The value of the latest run.
+    value: float
+    #: The mean value of the baseline runs.
+    mean: float
+    #: The standard deviation of the baseline runs.
+    stdev: float
+    #: The number of baseline runs.
+    n_baseline: int
+    #: Whether the latest value is a significant regression with respect to the baseline.
+    regression: bool
+
+    @property
+    def ratio(self) -> float:
+        """The latest value divided by the baseline mean."""
+        return self.value / self.mean if self.mean else math.inf
+
+
+def _run_key(package: str, platform: str, config_args: Iterable[str]) -> str:
+    """Return the key of all comparable runs, *i.e.* irrespective of the package version."""
+    data = {"package": package, "platform": platform, "config_args": list(config_args)}
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def _metrics(stage: dict[str, Any]) -> dict[str, float]:
+    """Return all :data:`METRICS` of the passed stage record."""
+    ret = {"wall_time": stage["wall_time"]}
+    if stage.get("user_time") is not None and stage.get("system_time") is not None:
+        ret["cpu_time"] = stage["user_time"] + stage["system_time"]
+    return ret
+
+
+class History:
+    """An append-only JSON Lines store with the stage timings and resource usage of all builds.
+
+    Every line describes a single run of a package, containing its name, version, platform,
+    ``configure`` arguments and the wall time (plus, if profiled, the CPU time, peak RSS and I/O)
+    of all its :class:`~dep_builder.TimeLogger` stages.
+
+    Parameters
+    ----------
+    path : str | os.PathLike[str]
+        The path to the history file. Will be created if it does not exist yet.
+
+    """
+
+    __slots__ = ("_path",)
+
+    @property
+    def path(self) -> Path:
+        """The path to the history file."""
+        return self._path
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        """Initialize the instance."""
+        self._path = Path(path).absolute()
+
+    def __repr__(self) -> str:
+        """Implement :func:`repr(self) <repr>`."""
+        return f"{type(self).__name__}(path={os.fspath(self.path)!r})"
+
+    def append(self, entry: dict[str, Any]) -> None:
+        """Append the passed JSON-serializable run to the history file."""
+        os.makedirs(self._path.parent, exist_ok=True)
+        line = json.dumps(entry, sort_keys=True) + "\n"
+        # Write the line in a single call, so concurrent builds do not interleave
+        with open(self._path, "a", encoding="utf8") as f:
+            f.write(line)
+
+    def entries(self) -> Iterator[dict[str, Any]]:
+        """Iterate over all runs in the history file, in order of insertion, skipping corrupt lines."""
+        with contextlib.suppress(FileNotFoundError), open(self._path, "r", encoding="utf8") as f:
+            for i, line in enumerate(f, start=1):
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    logger.warning(f"Skipping corrupt line {i} of {os.fspath(self._path)!r}")
+
+    def compare(self, window: int = 10, threshold: float = 3.0, min_ratio: float = 1.1) -> list[Comparison]:
+        """Compare the latest successful run of every package against its rolling baseline.
+
+        The baseline consists of the preceding ``window`` successful runs of the same package
+        with the same platform and ``configure`` arguments (but possibly a different version).
+        A metric of a stage is flagged as a regression if it exceeds the baseline mean by more than
+        ``threshold`` standard deviations, as well as by a factor of ``min_ratio`` so that
+        insignificant fluctuations of very stable stages are ignored.
+        At least two baseline runs are required.
+
+        Parameters
+        ----------
+        window : int
+            The maximum number of baseline runs.
+        threshold : float
+            The minimum number of standard deviations.
+        min_ratio : float
+            The minimum ratio between the latest value and the baseline mean.
+
+        Returns
+        -------
+        list[dep_builder.Comparison]
+            The comparisons of all metrics of all stages, including those that are not regressions.
+
+        """
+        runs: dict[str, list[dict[str, Any]]] = {}
+        for entry in self.entries():
+            if entry.get("success"):
+                runs.setdefault(entry["key"], []).append(entry)
+
+        ret = []
+        for entries in runs.values():
+            latest, baseline = entries[-1], entries[-window - 1:-1]
+            for stage, data in latest["stages"].items():
+                for metric, value in _metrics(data).items():
+                    samples = []
+                    for run in baseline:
+                        run_metrics = _metrics(run["stages"][stage]) if stage in run["stages"] else {}
+                        if metric in run_metrics:
+                            samples.append(run_metrics[metric])
+                    if len(samples) < 2:
+                        continue
+                    mean = statistics.mean(samples)
+                    stdev = statistics.stdev(samples)
+                    regression = value > mean + threshold * stdev and value > min_ratio * mean
+                    ret.append(Comparison(
+                        latest["package"], latest["version"], stage, metric, value, mean, stdev, len(samples), regression,
+                    ))
+        return ret
+
+
+def get_history() -> None | History:
+    """Return the default :class:`History`.
+
+    It is located at ``history.jsonl`` within the :mod:`dep_builder` cache directory unless the
+    ``DEP_BUILDER_HISTORY`` environment variable specifies another path. Setting either
+    ``DEP_BUILDER_HISTORY`` or ``DEP_BUILDER_CACHE_DIR`` to an empty string disables the history.
+
+    Returns
+    -------
+    None | dep_builder.History
+        The default history or :data:`None` if it is disabled.
+
+    """
+    path = os.environ.get("DEP_BUILDER_HISTORY")
+    if path is not None:
+        return History(path) if path else None
+    cache_dir = get_cache_dir()
+    return History(cache_dir / "history.jsonl") if cache_dir is not None else None
+
+
+@contextlib.contextmanager
+def record_history(package: str, version: str, config_args: Iterable[str] = ()) -> Iterator[None]:
+    """Context manager for appending the timings of all stages within its scope to the default :class:`History`.
+
+    Every :class:`~dep_builder.TimeLogger` block of the current process is recorded as a stage.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        >>> from dep_builder import record_history, TimeLogger, configure, build
+
+        >>> with record_history("gmp", "6.2.1", ["--enable-cxx"]):  # doctest: +SKIP
+        ...     TimeLogger("Configure GMP", profile=True)(configure)("gmp-6.2.1", config_args=["--enable-cxx"])
+        ...     TimeLogger("Build GMP", profile=True)(build)("build")
+
+    Parameters
+    ----------
+    package : str
+        The name of the package.
+    version : str
+        The version of the package.
+    config_args : Iterable[str]
+        The ``configure`` arguments, which are part of the key of comparable runs.
+
+    """
+    history = get_history()
+    if history is None:
+        yield
+        return
+
+    config_args = list(config_args)
+    start = time.time()
+    success = False
+    try:
+        yield
+        success = True
+    finally:
+        pid = os.getpid()
+        stages: dict[str, dict[str, Any]] = {}
+        for span in get_tracer().spans:
+            if span.pid != pid or span.start < start:
+                continue
+            stage = stages.setdefault(span.name, {"wall_time": 0.0})
+            stage["wall_time"] += span.duration
+            for k, v in span.args.items():
+                if isinstance(v, (int, float)):
+                    stage[k] = max(stage.get(k, v), v) if k == "max_rss" else stage.get(k, 0) + v
+
+        platform = _platform_tag()
+        history.append({
+            "key": _run_key(package, platform, config_args),
+            "time": start,
+            "package": package,
+            "version": version,
+            "platform": platform,
+            "config_args": config_args,
+            "success": success,
+            "stages": stages,
+        })
@@ -0,0 +1,141 @@
+"""Functions for determining the number of parallel build jobs based on the available resources."""
+
+from __future__ import annotations
+
+import os
+import math
+import operator
+from pathlib import Path
+
+from . import logger
+from ._download import _format_size
+
+__all__ = ["get_job_count", "DEFAULT_MEMORY_PER_JOB"]
+
+#: The default estimate of the peak memory usage (in bytes) of a single build job.
+DEFAULT_MEMORY_PER_JOB = 512 * 1024**2
+
+_CGROUP_ROOT = Path("/sys/fs/cgroup")
+_PROC_ROOT = Path("/proc")
+
+
+def _read(path: Path) -> None | str:
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return None
+
+
+def _cgroup_v2_dirs() -> list[Path]:
+    """Return the cgroup v2 directory of the current process and all its ancestors."""
+    content = _read(_PROC_ROOT / "self" / "cgroup")
+    if content is None:
+        return []
+    for line in content.splitlines():
+        if line.startswith("0::"):
+            directory = _CGROUP_ROOT / line[3:].lstrip("/")
+            return [directory, *(i for i in directory.parents if _CGROUP_ROOT in (i, *i.parents))]
+    return []
+
+
+def _affinity_count() -> int:
+    """Return the number of CPUs the current process is allowed to run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _cgroup_cpu_limit() -> None | float:
+    """Return the (fractional) number of CPUs set by the cgroup v2 or v1 CPU quota, if any."""
+    limits = []
+    for directory in _cgroup_v2_dirs():
+        content = _read(directory / "cpu.max")
+        if content is not None and not content.startswith("max"):
+            quota, period = content.split()[:2]
+            limits.append(int(quota) / int(period))
+
+    for directory in (_CGROUP_ROOT / "cpu,cpuacct", _CGROUP_ROOT / "cpu"):
+        quota_str = _read(directory / "cpu.cfs_quota_us")
+        period_str = _read(directory / "cpu.cfs_period_us")
+        if quota_str is not None and period_str is not None and int(quota_str) > 0:
+            limits.append(int(quota_str) / int(period_str))
+            break
+    return min(limits, default=None)
+
+
+def _available_memory() -> None | int:
+    """Return the available memory (in bytes), taking cgroup v2 and v1 memory limits into account."""
+    candidates = []
+    meminfo = _read(_PROC_ROOT / "meminfo")
+    if meminfo is not None:
+        for line in meminfo.splitlines():
+            if line.startswith("MemAvailable:"):
+                candidates.append(int(line.split()[1]) * 1024)
+                break
+    else:
+        try:
+            candidates.append(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_AVPHYS_PAGES"))
+        except (AttributeError, ValueError, OSError):
+            pass
+
+    for directory in _cgroup_v2_dirs():
+        limit = _read(directory / "memory.max")
+        usage = _read(directory / "memory.current")
+        if limit is not None and usage is not None and limit != "max":
+            candidates.append(int(limit) - int(usage))
+
+    limit = _read(_CGROUP_ROOT / "memory" / "memory.limit_in_bytes")
+    usage = _read(_CGROUP_ROOT / "memory" / "memory.usage_in_bytes")
+    # cgroup v1 reports an absurdly large limit if the memory is unrestricted
+    if limit is not None and usage is not None and int(limit) < 2**60:
+        candidates.append(int(limit) - int(usage))
+    return max(0, min(candidates)) if candidates else None
+
+
+def get_job_count(memory_per_job: None | int = None, max_jobs: None | int = None) -> int:
+    """Return the number of parallel build jobs based on the available CPUs and memory.
+
+    The job count is the smallest of the number of CPUs in the affinity mask of the
+    current process, the cgroup (v1 or v2) CPU quota, and the available memory divided by
+    ``memory_per_job`` (taking cgroup memory limits into account). The chosen value and
+    the reasoning behind it are logged.
+
+    Parameters
+    ----------
+    memory_per_job : None | int
+        An estimate of the peak memory usage (in bytes) of a single build job.
+        If :data:`None`, defaults to 512 MiB.
+    max_jobs : None | int
+        An optional upper bound on the number of jobs.
+
+    Returns
+    -------
+    int
+        The number of jobs, always at least 1.
+
+    """
+    memory_per_job = DEFAULT_MEMORY_PER_JOB if memory_per_job is None else operator.index(memory_per_job)
+    if memory_per_job <= 0:
+        raise ValueError(f"`memory_per_job` must be larger than 0, got {memory_per_job}")
+
+    affinity = _affinity_count()
+    limits = {f"{affinity} CPU(s) in the affinity mask": affinity}
+
+    cpu_limit = _cgroup_cpu_limit()
+    if cpu_limit is not None:
+        limits[f"a cgroup CPU quota of {cpu_limit:.2f}"] = max(1, math.ceil(cpu_limit))
+
+    memory = _available_memory()
+    if memory is not None:
+        reason = f"{_format_size(memory)} of available memory at {_format_size(memory_per_job)} per job"
+        limits[reason] = max(1, memory // memory_per_job)
+
+    if max_jobs is not None:
+        max_jobs = operator.index(max_jobs)
+        limits[f"an upper bound of {max_jobs}"] = max(1, max_jobs)
+
+    ret = min(limits.values())
+    reasons = ", ".join(f"{reason} (≤ {n})" for reason, n in limits.items())
+    logger.info(f"Using {ret} job(s) based on {reasons}")
+    return ret
@@ -0,0 +1,231 @@
+"""Functions for creating and joining GNU make jobservers."""
+
+from __future__ import annotations
+
+import os
+import re
+import shlex
+import operator
+import functools
+import contextlib
+import subprocess
+from collections.abc import Iterator, Mapping
+from typing import TYPE_CHECKING
+
+from packaging.version import Version
+
+from . import logger
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+__all__ = ["JobServer", "get_make_version", "parse_makeflags"]
+
+#: The first GNU make version that accepts ``--jobserver-auth`` rather than ``--jobserver-fds``.
+JOBSERVER_AUTH_VERSION = Version("4.2")
+
+_JOBSERVER_PATTERN = re.compile(r"--jobserver-(?:auth|fds)=(\S+)")
+
+#: The environment variable set by :meth:`JobServer.env`, marking that the implicit job slot
+#: of every joining ``make`` process must be paid for with a token (see :func:`_implicit_slot`).
+_SLOT_ENV_VAR = "DEP_BUILDER_JOBSERVER_SLOT"
+
+
+@functools.lru_cache(maxsize=None)
+def get_make_version(make: str = "make") -> None | Version:
+    """Return the version of the passed GNU make executable or :data:`None` if it cannot be determined."""
+    try:
+        output = subprocess.run([make, "--version"], capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    match = re.match(r"GNU Make (\d+(?:\.\d+)*)", output)
+    return Version(match[1]) if match is not None else None
+
+
+def parse_makeflags(env: Mapping[str, str] = os.environ) -> None | tuple[int, ...] | str:
+    """Return the jobserver passed via the ``MAKEFLAGS`` environment variable, if any.
+
+    Parameters
+    ----------
+    env : Mapping[str, str]
+        The environment variables.
+
+    Returns
+    -------
+    None | tuple[int, ...] | str
+        The usable read and write file descriptors of a pipe-based jobserver,
+        the path to the named pipe of a FIFO-based jobserver,
+        or :data:`None` if there is no (usable) jobserver.
+
+    """
+    match = _JOBSERVER_PATTERN.search(env.get("MAKEFLAGS", ""))
+    if match is None:
+        return None
+
+    auth = match[1]
+    if auth.startswith("fifo:"):
+        path = auth[len("fifo:"):]
+        return path if os.path.exists(path) else None
+
+    try:
+        fds = tuple(int(i) for i in auth.split(","))
+        for fd in fds:
+            os.fstat(fd)
+    except (ValueError, OSError):
+        logger.warning(f"Ignoring the unusable jobserver {auth!r} passed via MAKEFLAGS")
+        return None
+    return fds
+
+
+def _has_pipe_jobserver(env: Mapping[str, str]) -> bool:
+    """Check whether ``MAKEFLAGS`` refers to a pipe-based jobserver, which requires passing its file descriptors."""
+    match = _JOBSERVER_PATTERN.search(env.get("MAKEFLAGS", ""))
+    return match is not None and not match[1].startswith("fifo:")
+
+
+def _strip_jobserver(env: Mapping[str, str]) -> dict[str, str]:
+    """Return a copy of the passed environment variables without the jobserver and job count in ``MAKEFLAGS``."""
+    ret = dict(env)
+    flags = _JOBSERVER_PATTERN.sub("", ret.pop("MAKEFLAGS", ""))
+    flags = " ".join(i for i in shlex.split(flags) if not i.startswith("-j"))
+    if flags:
+        ret["MAKEFLAGS"] = flags
+    ret.pop(_SLOT_ENV_VAR, None)
+    return ret
+
+
+@contextlib.contextmanager
+def _implicit_slot(fds: tuple[int, ...], env: Mapping[str, str] = os.environ) -> Iterator[None]:
+    """Context manager holding a token of the pipe-based jobserver ``fds`` for the implicit slot of a ``make`` process.
+
+    Only applies to jobservers created by :class:`JobServer`; the implicit slot of a ``make``
+    process started by a parent ``make`` is already accounted for by its parent.
+
+    """
+    if env.get(_SLOT_ENV_VAR) != "1" or len(fds) != 2:
+        yield
+        return
+
+    r, w = fds
+    token = os.read(r, 1)
+    try:
+        yield
+    finally:
+        os.write(w, token)
+
+
+class JobServer:
+    """A pipe-based GNU make jobserver that can be shared by multiple concurrent ``make`` invocations.
+
+    Every ``make`` process joining the jobserver holds one implicit job slot and
+    draws all additional slots from a shared token pool. :func:`~dep_builder.build` pays for
+    the implicit slot by holding one token for the duration of the build, so the combined
+    parallelism of all concurrent builds never exceeds ``jobs``. Plain ``make`` invocations
+    (as in the example below) do not, each thus adding one job on top of ``jobs``.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        >>> import subprocess
+        >>> from dep_builder import JobServer
+
+        >>> with JobServer(8) as jobserver:  # doctest: +SKIP
+        ...     env = jobserver.env()
+        ...     proc1 = subprocess.Popen(["make"], cwd="build1", env=env, pass_fds=jobserver.fds)
+        ...     proc2 = subprocess.Popen(["make"], cwd="build2", env=env, pass_fds=jobserver.fds)
+        ...     proc1.wait(), proc2.wait()
+
+    Parameters
+    ----------
+    jobs : int
+        The total number of job slots.
+
+    """
+
+    __slots__ = ("_jobs", "_fds")
+
+    @property
+    def jobs(self) -> int:
+        """The total number of job slots."""
+        return self._jobs
+
+    @property
+    def fds(self) -> tuple[int, int]:
+        """The read and write file descriptors of the token pipe."""
+        if self._fds is None:
+            raise ValueError("The jobserver has been closed")
+        return self._fds
+
+    def __init__(self, jobs: int) -> None:
+        """Initialize the instance."""
+        self._jobs = operator.index(jobs)
+        if self._jobs <= 0:
+            raise ValueError(f"`jobs` must be larger than 0, got {jobs}")
+
+        self._fds: None | tuple[int, int] = os.pipe()
+        # The creator of the jobserver does not run any jobs itself, so all slots are available as tokens
+        os.write(self._fds[1], b"+" * self._jobs)
+
+    def __enter__(self) -> Self:
+        """Enter the context manager."""
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Exit the context manager."""
+        self.close()
+
+    def __repr__(self) -> str:
+        """Implement :func:`repr(self) <repr>`."""
+        return f"{type(self).__name__}(jobs={self.jobs!r})"
+
+    def close(self) -> None:
+        """Close the token pipe."""
+        if self._fds is not None:
+            for fd in self._fds:
+                os.close(fd)
+            self._fds = None
+
+    def makeflags(self, make_version: None | Version = None) -> str:
+        """Return the ``MAKEFLAGS`` for joining the jobserver.
+
+        Parameters
+        ----------
+        make_version : None | packaging.version.Version
+            The GNU make version. If :data:`None`, use the version of ``make`` on the ``PATH``.
+
+        Returns
+        -------
+        str
+            The ``MAKEFLAGS`` environment variable.
+
+        """
+        if make_version is None:
+            make_version = get_make_version()
+        r, w = self.fds
+        if make_version is not None and make_version < JOBSERVER_AUTH_VERSION:
+            # Older make versions disable the jobserver if an explicit job count is passed
+            return f"-j --jobserver-fds={r},{w}"
+        return f"-j{self.jobs} --jobserver-auth={r},{w}"
+
+    def env(self, env: None | Mapping[str, str] = None) -> dict[str, str]:
+        """Return a copy of the passed environment variables with ``MAKEFLAGS`` pointing to the jobserver.
+
+        Note that the file descriptors in :attr:`fds` must additionally be passed to all child processes,
+        *e.g.* via the ``pass_fds`` parameter of :class:`subprocess.Popen`.
+
+        Parameters
+        ----------
+        env : None | Mapping[str, str]
+            The environment variables. If :data:`None`, use :data:`os.environ`.
+
+        Returns
+        -------
+        dict[str, str]
+            The updated environment variables.
+
+        """
+        ret = _strip_jobserver(os.environ if env is None else env)
+        ret["MAKEFLAGS"] = f"{self.makeflags()} {ret.get('MAKEFLAGS', '')}".strip()
+        ret[_SLOT_ENV_VAR] = "1"
+        return ret
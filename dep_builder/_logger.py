@@ -3,13 +3,22 @@
 from __future__ import annotations
 
 import logging
+import functools
 import contextlib
 import sys
 import time
 import types
-from typing import TYPE_CHECKING, ClassVar, TypeVar, Generic, Any
+import threading
+from typing import TYPE_CHECKING, ClassVar, TypeVar, Generic, NamedTuple, Any
 from collections.abc import Iterable, Callable
 
+try:
+    import resource
+except ImportError:
+    resource = None  # type: ignore[assignment]
+
+from ._trace import get_tracer
+
 if TYPE_CHECKING:
     from typing_extensions import Protocol, Self
 
@@ -23,7 +32,7 @@ if TYPE_CHECKING:
 
 _LoggerType = TypeVar("_LoggerType", bound="_LoggingProtocol")
 
-__all__ = ["logger", "stdout_handler", "TimeLogger", "BaseTimeLogger"]
+__all__ = ["logger", "stdout_handler", "TimeLogger", "BaseTimeLogger", "TimeRecord"]
 
 #: The default logger.
 logger = logging.getLogger(__package__)
@@ -38,10 +47,107 @@ stdout_handler.setFormatter(logging.Formatter(
 logger.addHandler(stdout_handler)
 
 
+class TimeRecord(NamedTuple):
+    """The duration and (optionally) resource usage of a single :class:`BaseTimeLogger` block.
+
+    All resource usage fields pertain to the (terminated and waited-for) child processes
+    spawned within the block, with the exception of :attr:`max_rss`, and are :data:`None`
+    if profiling was disabled or if they are unavailable on the current platform.
+    Note that they include the child processes of all threads.
+
+    """
+
+    #: The group-message of the block.
+    message: None | str
+    #: Whether the block exited without raising an exception.
+    success: bool
+    #: The wall-clock time (in seconds).
+    wall_time: float
+    #: The user CPU time (in seconds).
+    user_time: None | float = None
+    #: The system CPU time (in seconds).
+    system_time: None | float = None
+    #: The peak resident set size (in bytes) of the largest child process terminated so far.
+    #: Note that this is a high-water mark, which may thus predate the block.
+    max_rss: None | int = None
+    #: The number of bytes read from the storage layer.
+    read_bytes: None | int = None
+    #: The number of bytes written to the storage layer.
+    write_bytes: None | int = None
+
+    @property
+    def cpu_utilization(self) -> None | float:
+        """The CPU time divided by the wall-clock time, *e.g.* ``4.0`` for four fully utilized cores."""
+        if self.user_time is None or self.system_time is None or not self.wall_time:
+            return None
+        return (self.user_time + self.system_time) / self.wall_time
+
+
+class _Usage(NamedTuple):
+    user_time: float
+    system_time: float
+    max_rss: int
+    read_bytes: None | int
+    write_bytes: None | int
+
+
+class _Frame(NamedTuple):
+    start: float
+    usage: None | _Usage
+    depth: int
+    depth_cm: contextlib.AbstractContextManager[int]
+    group: bool
+
+
+def _get_usage() -> None | _Usage:
+    """Return the resource usage of all terminated child processes, if available."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # `ru_maxrss` is expressed in KiB on Linux and in bytes on macOS
+    max_rss = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+    # On Linux, the I/O of all waited-for children is accumulated into that of the parent
+    read_bytes: None | int = None
+    write_bytes: None | int = None
+    try:
+        with open("/proc/self/io", "r") as f:
+            io = dict(line.split(":", 1) for line in f if ":" in line)
+        read_bytes = int(io["read_bytes"])
+        write_bytes = int(io["write_bytes"])
+    except (OSError, KeyError, ValueError):
+        read_bytes = usage.ru_inblock * 512
+        write_bytes = usage.ru_oublock * 512
+    return _Usage(usage.ru_utime, usage.ru_stime, max_rss, read_bytes, write_bytes)
+
+
+def _format_record(record: TimeRecord) -> str:
+    """Format the resource usage of the passed record as a human-readable string."""
+    from ._download import _format_size
+
+    if record.user_time is None or record.system_time is None:
+        return ""
+    ret = [f"user {record.user_time:.2f}s", f"sys {record.system_time:.2f}s"]
+    if record.cpu_utilization is not None:
+        ret.append(f"{100 * record.cpu_utilization:.0f}% CPU")
+    if record.max_rss is not None:
+        # A lifetime high-water mark rather than the peak of the block's own child processes
+        ret.append(f"peak child RSS so far {_format_size(record.max_rss)}")
+    if record.read_bytes is not None and record.write_bytes is not None:
+        ret.append(f"I/O {_format_size(record.read_bytes)} read, {_format_size(record.write_bytes)} written")
+    return f" ({', '.join(ret)})"
+
+
 class BaseTimeLogger(contextlib.ContextDecorator, Generic[_LoggerType]):
-    """A re-usable, non-reentrant and non-thread-safe context decorator for logging github-style \
+    """A re-usable, reentrant and thread-safe context decorator for logging github-style \
     ``:group:`` blocks before/after function calls.
 
+    Nested blocks are logged as indented lines within the outermost group.
+    As github-style groups cannot be interleaved, only the main thread opens groups;
+    the blocks of all other threads are logged as (indented) lines.
+    Every block is recorded as a span in the default :class:`~dep_builder.Tracer`
+    (see :func:`~dep_builder.get_tracer`), allowing the whole run to be exported as a Chrome trace.
+
     Examples
     --------
     .. code-block:: python
@@ -71,14 +177,21 @@ class BaseTimeLogger(contextlib.ContextDecorator, Generic[_LoggerType]):
         The to-be wrapped :class:`~logging.Logger`.
     message : None | str
         The group-message to-be displayed upon entering the context manager.
+    profile : bool
+        Whether to record the CPU time, peak memory usage and I/O of all child processes
+        spawned within the block, next to its duration.
+        See :attr:`record` for the available fields.
 
     """
 
-    __slots__ = ("_message", "_start", "_logger", "_hash")
+    __slots__ = ("_message", "_local", "_logger", "_hash", "_profile", "_record")
 
     GREEN: ClassVar[str] = "\033[32m"
     RED: ClassVar[str] = "\033[31m"
 
+    #: A lock shared by all instances, serializing the output of concurrent blocks and the updating of :attr:`record`.
+    _LOCK: ClassVar[threading.RLock] = threading.RLock()
+
     @property
     def message(self) -> None | str:
         """The group-message to-be displayed upon entering the context manager."""
@@ -89,23 +202,47 @@ class BaseTimeLogger(contextlib.ContextDecorator, Generic[_LoggerType]):
         """The wrapped :class:`~logging.Logger`."""
         return self._logger
 
-    def __init__(self, logger: _LoggerType, message: None | str = None) -> None:
+    @property
+    def profile(self) -> bool:
+        """Whether to record the resource usage of all child processes spawned within the block."""
+        return self._profile
+
+    @property
+    def record(self) -> None | TimeRecord:
+        """The duration and resource usage of the last completed block or :data:`None` if there is none."""
+        with self._LOCK:
+            return self._record
+
+    def __init__(self, logger: _LoggerType, message: None | str = None, *, profile: bool = False) -> None:
         """Initialize the instance."""
         self._logger = logger
         self._message = message
-        self._start: float | None = None
+        self._profile = profile
+        self._local = threading.local()
+        self._record: None | TimeRecord = None
 
     def __enter__(self) -> None:
         """Enter the context manager."""
-        if self._start is not None:
-            raise ValueError(f"{type(self).__name__} cannot be used in a reentrant manner")
-        self._start = time.time()
-
-        self.flush()
-        if self.message is not None:
-            self.write(f"::group::{self.message}")
-        else:
-            self.write("::group::")
+        tracer = get_tracer()
+        depth_cm = tracer.open()
+        depth = depth_cm.__enter__()
+        usage = _get_usage() if self.profile else None
+        try:
+            stack: list[_Frame] = self._local.stack
+        except AttributeError:
+            stack = self._local.stack = []
+        # Github-style groups can neither be nested nor interleaved
+        group = not depth and threading.current_thread() is threading.main_thread()
+        stack.append(_Frame(time.perf_counter(), usage, depth, depth_cm, group))
+
+        with self._LOCK:
+            self.flush()
+            if not group:
+                self.write(f"{'  ' * depth}▸ {self.message or ''}")
+            elif self.message is not None:
+                self.write(f"::group::{self.message}")
+            else:
+                self.write("::group::")
 
     def __exit__(
         self,
@@ -114,27 +251,48 @@ class BaseTimeLogger(contextlib.ContextDecorator, Generic[_LoggerType]):
         exc_traceback: types.TracebackType | None
     ) -> None:
         """Exit the context manager."""
-        assert self._start is not None
-        duration = time.time() - self._start
-        self._start = None
-
-        self.flush()
-        self.write("\n::endgroup::")
-        if exc_type is None:
-            self.write(f"{self.GREEN}✓ {duration:.2f}s".rjust(78))
-        else:
-            self.write(f"{self.RED}✕ {duration:.2f}s".rjust(78))
+        frame: _Frame = self._local.stack.pop()
+        duration = time.perf_counter() - frame.start
+        frame.depth_cm.__exit__(None, None, None)
+
+        record = TimeRecord(self.message, exc_type is None, duration)
+        usage = _get_usage() if frame.usage is not None else None
+        if frame.usage is not None and usage is not None:
+            old = frame.usage
+            record = record._replace(
+                user_time=usage.user_time - old.user_time,
+                system_time=usage.system_time - old.system_time,
+                max_rss=usage.max_rss,
+                read_bytes=None if usage.read_bytes is None else usage.read_bytes - (old.read_bytes or 0),
+                write_bytes=None if usage.write_bytes is None else usage.write_bytes - (old.write_bytes or 0),
+            )
+        with self._LOCK:
+            self._record = record
+        args = {k: v for k, v in record._asdict().items() if k not in ("message", "success", "wall_time")}
+        get_tracer().add(
+            self.message or "", frame.start, duration, depth=frame.depth, success=record.success,
+            args={k: v for k, v in args.items() if v is not None},
+        )
+
+        status = f"{self.GREEN}✓" if exc_type is None else f"{self.RED}✕"
+        with self._LOCK:
+            self.flush()
+            if not frame.group:
+                self.write(f"{'  ' * frame.depth}{status} {duration:.2f}s {self.message or ''}{_format_record(record)}")
+            else:
+                self.write("\n::endgroup::")
+                self.write(f"{status} {duration:.2f}s".rjust(78) + _format_record(record))
 
     def __repr__(self) -> str:
         """Implement :func:`repr(self) <repr>`."""
         cls = type(self)
-        return f"{cls.__name__}(logger={self.logger!r}, message={self.message!r})"
+        return f"{cls.__name__}(logger={self.logger!r}, message={self.message!r}, profile={self.profile!r})"
 
     def __eq__(self, other: object) -> bool:
         """Implement :meth:`self == other <object.__eq__>`."""
         if not isinstance(other, BaseTimeLogger):
             return NotImplemented
-        return self.logger == other.logger and self.message == other.message
+        return self.logger == other.logger and self.message == other.message and self.profile == other.profile
 
     def __copy__(self) -> Self:
         """Implement :func:`copy.copy(self) <copy.copy>`."""
@@ -150,13 +308,13 @@ class BaseTimeLogger(contextlib.ContextDecorator, Generic[_LoggerType]):
             return self._hash
         except AttributeError:
             pass
-        self._hash: int = hash(self.logger) ^ hash(self.message)
+        self._hash: int = hash(self.logger) ^ hash(self.message) ^ hash(self.profile)
         return self._hash
 
     def __reduce__(self) -> tuple[Callable[..., Self], tuple[Any, ...]]:
         """Helper for :mod:`pickle`."""
         cls = type(self)
-        return cls, (self.logger, self.message)
+        return functools.partial(cls, profile=self.profile), (self.logger, self.message)
 
     def flush(self) -> None:
         """Flush all logging handlers."""
@@ -192,6 +350,9 @@ class TimeLogger(BaseTimeLogger[logging.Logger]):
     ----------
     message : None | str
         The group-message to-be displayed upon entering the context manager.
+    profile : bool
+        Whether to record the CPU time, peak memory usage and I/O of all child processes
+        spawned within the block, next to its duration.
 
     See Also
     --------
@@ -201,16 +362,16 @@ class TimeLogger(BaseTimeLogger[logging.Logger]):
 
     __slots__ = ()
 
-    def __init__(self, message: None | str = None) -> None:
+    def __init__(self, message: None | str = None, *, profile: bool = False) -> None:
         """Initialize the instance."""
-        super().__init__(logger, message)
+        super().__init__(logger, message, profile=profile)
 
     def __repr__(self) -> str:
         """Implement :func:`repr(self) <repr>`."""
         cls = type(self)
-        return f"{cls.__name__}(message={self.message!r})"
+        return f"{cls.__name__}(message={self.message!r}, profile={self.profile!r})"
 
     def __reduce__(self) -> tuple[Callable[..., Self], tuple[Any, ...]]:
         """Helper for :mod:`pickle`."""
         cls = type(self)
-        return cls, (self.message,)
+        return functools.partial(cls, profile=self.profile), (self.message,)
@@ -0,0 +1,63 @@
+"""Functions for concurrently downloading source archives ahead of time."""
+
+from __future__ import annotations
+
+import operator
+import concurrent.futures
+from pathlib import Path
+from collections.abc import Iterable
+
+import requests
+
+from . import logger
+from ._cache import SourceCache, get_source_cache
+
+__all__ = ["prefetch"]
+
+
+def prefetch(
+    urls: Iterable[str],
+    max_workers: int = 4,
+    *,
+    cache: None | SourceCache = None,
+) -> dict[str, Path]:
+    """Concurrently download the archives of all passed URLs into the source cache.
+
+    All downloads share a single pooled :class:`requests.Session`, so connections (and TLS
+    sessions) to the same host are reused. Archives that are already cached are not downloaded
+    again, and subsequent calls to :func:`~dep_builder.download_and_unpack` will consume the
+    prefetched archives.
+
+    Parameters
+    ----------
+    urls : Iterable[str]
+        The URLs of the to-be downloaded archives.
+    max_workers : int
+        The maximum number of concurrent downloads.
+    cache : None | dep_builder.SourceCache
+        The source cache wherein the archives are stored.
+        If :data:`None`, use the default cache as returned by :func:`~dep_builder.get_source_cache`.
+
+    Returns
+    -------
+    dict[str, pathlib.Path]
+        A dictionary mapping all URLs to the paths of their cached archives.
+
+    """
+    max_workers = operator.index(max_workers)
+    if max_workers <= 0:
+        raise ValueError(f"`max_workers` must be larger than 0, got {max_workers}")
+    if cache is None:
+        cache = get_source_cache()
+        if cache is None:
+            raise ValueError("Prefetching requires the source cache to be enabled")
+
+    url_list = list(dict.fromkeys(urls))
+    logger.info(f"Prefetching {len(url_list)} archive(s) with up to {max_workers} concurrent download(s)")
+    with requests.Session() as session:
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        with concurrent.futures.ThreadPoolExecutor(max_workers, thread_name_prefix="prefetch") as executor:
+            futures = {url: executor.submit(cache.fetch, url, session=session) for url in url_list}
+            return {url: future.result() for url, future in futures.items()}
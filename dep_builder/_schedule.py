@@ -0,0 +1,317 @@
+"""Functions for building multiple packages concurrently based on their dependency graph."""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import hashlib
+import operator
+import threading
+import subprocess
+import concurrent.futures
+from pathlib import Path
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+from . import logger
+from ._cleanup import remove_tree
+from ._jobserver import JobServer
+from ._jobs import get_job_count
+from ._trace import get_tracer
+from ._capture import CAPTURE_ENV_VAR
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
+__all__ = ["Package", "load_manifest", "build_all", "JOBS_ENV_VAR", "DEPENDENCIES_ENV_VAR"]
+
+#: The environment variable used for passing the number of make jobs to :func:`dep_builder.build`.
+JOBS_ENV_VAR = "DEP_BUILDER_JOBS"
+
+#: The environment variable used for passing the keys of all dependencies to :func:`dep_builder.build_key`,
+#: encoded as a JSON object mapping package names to keys.
+DEPENDENCIES_ENV_VAR = "DEP_BUILDER_DEPENDENCIES"
+
+
+class Package:
+    """A package in the build manifest.
+
+    Parameters
+    ----------
+    name : str
+        The name of the package.
+    commands : Iterable[Iterable[str]]
+        The commands for installing the package, executed sequentially.
+    requires : Iterable[str]
+        The names of all packages that must be installed before this one.
+    compile : bool
+        Whether the package is compiled, thus claiming a share of the CPU budget.
+
+    """
+
+    __slots__ = ("_name", "_commands", "_requires", "_compile")
+
+    @property
+    def name(self) -> str:
+        """The name of the package."""
+        return self._name
+
+    @property
+    def commands(self) -> tuple[tuple[str, ...], ...]:
+        """The commands for installing the package, executed sequentially."""
+        return self._commands
+
+    @property
+    def requires(self) -> frozenset[str]:
+        """The names of all packages that must be installed before this one."""
+        return self._requires
+
+    @property
+    def compile(self) -> bool:
+        """Whether the package is compiled, thus claiming a share of the CPU budget."""
+        return self._compile
+
+    def __init__(
+        self,
+        name: str,
+        commands: Iterable[Iterable[str]],
+        requires: Iterable[str] = (),
+        compile: bool = False,
+    ) -> None:
+        """Initialize the instance."""
+        self._name = name
+        self._commands = tuple(tuple(cmd) for cmd in commands)
+        self._requires = frozenset(requires)
+        self._compile = bool(compile)
+
+    def __repr__(self) -> str:
+        """Implement :func:`repr(self) <repr>`."""
+        cls = type(self)
+        return (
+            f"{cls.__name__}(name={self.name!r}, commands={self.commands!r}, "
+            f"requires={sorted(self.requires)!r}, compile={self.compile!r})"
+        )
+
+
+def _format(value: str, **kwargs: str) -> str:
+    return os.path.expandvars(value.format(**kwargs))
+
+
+def load_manifest(path: str | os.PathLike[str], prefix: str | os.PathLike[str] = "/usr/local") -> dict[str, Package]:
+    """Load all packages from the passed TOML build manifest.
+
+    Examples
+    --------
+    .. code-block:: toml
+
+        [packages.gmp]
+        version = "$GMP_VERSION"
+        compile = true
+        commands = [
+            ["{python}", "{root}/install_gmp.py", "{version}", "--prefix={prefix}"],
+        ]
+
+        [packages.libint]
+        version = "2.7.2"
+        requires = ["gmp"]
+        compile = true
+        commands = [
+            ["{python}", "{root}/install_libint.py", "{version}", "--prefix={prefix}"],
+        ]
+
+    Parameters
+    ----------
+    path : str | os.PathLike[str]
+        The path to the manifest. Every package is specified in a ``[packages.<name>]`` table
+        with the ``commands``, ``version``, ``requires`` and ``compile`` keys.
+        The ``{python}``, ``{root}`` (the manifest's directory), ``{prefix}``, ``{name}`` and
+        ``{version}`` placeholders in all commands are substituted, after which environment
+        variables are expanded.
+    prefix : str | os.PathLike[str]
+        The installation prefix.
+
+    Returns
+    -------
+    dict[str, dep_builder.Package]
+        A dictionary mapping package names to packages.
+
+    """
+    path = Path(path).absolute()
+    with open(path, "rb") as f:
+        manifest: dict[str, Any] = tomllib.load(f)
+
+    ret: dict[str, Package] = {}
+    for name, table in manifest.get("packages", {}).items():
+        kwargs = {"python": sys.executable, "root": os.fspath(path.parent), "prefix": os.fspath(prefix), "name": name}
+        kwargs["version"] = _format(str(table.get("version", "")), **kwargs)
+        ret[name] = Package(
+            name,
+            commands=[[_format(i, **kwargs) for i in cmd] for cmd in table.get("commands", [])],
+            requires=table.get("requires", []),
+            compile=table.get("compile", False),
+        )
+    _check_graph(ret)
+    return ret
+
+
+def _check_graph(packages: Mapping[str, Package]) -> None:
+    """Check that all dependencies exist and that the dependency graph is acyclic."""
+    for pkg in packages.values():
+        missing = pkg.requires - packages.keys()
+        if missing:
+            raise ValueError(f"Package {pkg.name!r} requires unknown package(s): {sorted(missing)!r}")
+
+    done: set[str] = set()
+    pending = dict(packages)
+    while pending:
+        ready = [name for name, pkg in pending.items() if pkg.requires <= done]
+        if not ready:
+            raise ValueError(f"Dependency cycle between the following packages: {sorted(pending)!r}")
+        done.update(ready)
+        for name in ready:
+            del pending[name]
+
+
+def _package_keys(packages: Mapping[str, Package]) -> dict[str, str]:
+    """Return a SHA-256 digest of every package, its commands and (recursively) the keys of its dependencies."""
+    ret: dict[str, str] = {}
+
+    def get_key(name: str) -> str:
+        if name not in ret:
+            pkg = packages[name]
+            data = {
+                "name": name,
+                "commands": pkg.commands,
+                "requires": {i: get_key(i) for i in pkg.requires},
+            }
+            ret[name] = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+        return ret[name]
+
+    for name in packages:
+        get_key(name)
+    return ret
+
+
+class _OutputWriter:
+    """Helper class for writing the line-prefixed output of multiple subprocesses to stdout."""
+
+    __slots__ = ("_lock",)
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+
+    def write(self, name: str, line: str) -> None:
+        """Write a single line of output of package ``name`` to stdout."""
+        with self._lock:
+            sys.stdout.write(f"[{name}] {line}")
+            sys.stdout.flush()
+
+
+def _run_package(
+    pkg: Package,
+    workdir: Path,
+    jobs: int,
+    writer: _OutputWriter,
+    jobserver: JobServer,
+    dependencies: Mapping[str, str],
+) -> None:
+    """Run all commands of ``pkg`` within its private working directory."""
+    cwd = workdir / pkg.name
+    os.makedirs(cwd, exist_ok=True)
+    env = jobserver.env()
+    env[JOBS_ENV_VAR] = str(jobs)
+    env[DEPENDENCIES_ENV_VAR] = json.dumps(dict(dependencies), sort_keys=True)
+    env.setdefault("PYTHONUNBUFFERED", "1")
+    if env.get(CAPTURE_ENV_VAR):
+        # Give every package its own log directory
+        env[CAPTURE_ENV_VAR] = os.path.join(env[CAPTURE_ENV_VAR], pkg.name)
+    with get_tracer().span(f"Install {pkg.name}", jobs=jobs):
+        for cmd in pkg.commands:
+            writer.write(pkg.name, f"Running {' '.join(cmd)!r} with {jobs} job(s)\n")
+            with subprocess.Popen(
+                cmd, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors="replace",
+                pass_fds=jobserver.fds,
+            ) as proc:
+                assert proc.stdout is not None
+                for line in proc.stdout:
+                    writer.write(pkg.name, line)
+            if proc.returncode != 0:
+                raise subprocess.CalledProcessError(proc.returncode, cmd)
+    remove_tree(cwd)
+
+
+def build_all(
+    packages: Mapping[str, Package],
+    *,
+    jobs: None | int = None,
+    workdir: str | os.PathLike[str] = ".",
+) -> None:
+    """Install all passed packages, running the packages that do not depend on each other concurrently.
+
+    A package is started as soon as all of its dependencies have been installed,
+    so that the total wall time approaches the critical path of the dependency graph.
+    All packages share a single GNU make jobserver (see :class:`~dep_builder.JobServer`)
+    with ``jobs`` slots, which is joined by :func:`~dep_builder.build`, so that concurrent
+    ``make`` invocations draw from the same token pool rather than oversubscribing the machine.
+    For build tools that cannot join the jobserver, the CPU budget is additionally split evenly
+    between all concurrently running packages that are compiled, the number of jobs being passed
+    via the ``DEP_BUILDER_JOBS`` environment variable. The keys of the packages required by
+    a package (*i.e.* digests of their commands and, recursively, their dependencies) are passed
+    via the ``DEP_BUILDER_DEPENDENCIES`` environment variable, so that they become part of its
+    :func:`~dep_builder.build_key`.
+
+    Parameters
+    ----------
+    packages : Mapping[str, dep_builder.Package]
+        A mapping with all to-be installed packages, *e.g.* as returned by :func:`~dep_builder.load_manifest`.
+    jobs : None | int
+        The total CPU budget. If :data:`None`, defaults to the output of :func:`~dep_builder.get_job_count`.
+    workdir : str | os.PathLike[str]
+        The directory wherein every package gets its own working directory.
+
+    """
+    jobs = get_job_count() if jobs is None else operator.index(jobs)
+    if jobs <= 0:
+        raise ValueError(f"`jobs` must be larger than 0, got {jobs}")
+    _check_graph(packages)
+    keys = _package_keys(packages)
+
+    workdir = Path(workdir).absolute()
+    writer = _OutputWriter()
+    done: set[str] = set()
+    pending = dict(packages)
+    running: dict[concurrent.futures.Future[None], Package] = {}
+    failed: list[BaseException] = []
+
+    max_workers = max(1, len(packages))
+    with JobServer(jobs) as jobserver:
+        with concurrent.futures.ThreadPoolExecutor(max_workers, thread_name_prefix="build_all") as executor:
+            while pending or running:
+                ready = [] if failed else [pkg for pkg in pending.values() if pkg.requires <= done]
+                n_compile = sum(pkg.compile for pkg in (*running.values(), *ready))
+                for pkg in ready:
+                    del pending[pkg.name]
+                    pkg_jobs = max(1, jobs // n_compile) if pkg.compile else 1
+                    logger.info(f"Starting {pkg.name!r}")
+                    dependencies = {i: keys[i] for i in pkg.requires}
+                    future = executor.submit(_run_package, pkg, workdir, pkg_jobs, writer, jobserver, dependencies)
+                    running[future] = pkg
+
+                if not running:
+                    break
+                finished, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in finished:
+                    pkg = running.pop(future)
+                    ex = future.exception()
+                    if ex is not None:
+                        logger.error(f"Failed to install {pkg.name!r}: {ex}")
+                        failed.append(ex)
+                    else:
+                        logger.info(f"Finished {pkg.name!r}")
+                        done.add(pkg.name)
+
+    if failed:
+        raise failed[0]
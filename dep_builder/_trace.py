@@ -0,0 +1,290 @@
+"""Functions for recording timing spans and exporting them as Chrome trace events."""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import atexit
+import tempfile
+import threading
+import contextlib
+from pathlib import Path
+from collections.abc import Iterable, Iterator, Mapping
+from typing import NamedTuple, Any
+
+__all__ = ["Span", "Tracer", "get_tracer", "TRACE_DIR_ENV_VAR"]
+
+#: The environment variable with the directory wherein every process writes its spans upon exiting.
+TRACE_DIR_ENV_VAR = "DEP_BUILDER_TRACE_DIR"
+
+#: The offset (in seconds) between the performance counter and the Unix epoch,
+#: so that the spans of different processes share a common time axis.
+_EPOCH_OFFSET = time.time() - time.perf_counter()
+
+
+def _process_name() -> str:
+    if not sys.argv or not sys.argv[0]:
+        return "python"
+    # Use the package name for `python -m <package>`
+    head, tail = os.path.split(sys.argv[0])
+    return os.path.basename(head) if tail == "__main__.py" else tail
+
+
+class Span(NamedTuple):
+    """A single timed span, as recorded by :class:`Tracer`."""
+
+    #: The name of the span.
+    name: str
+    #: The start time (in seconds since the Unix epoch).
+    start: float
+    #: The duration (in seconds).
+    duration: float
+    #: The nesting depth of the span within its thread.
+    depth: int = 0
+    #: Whether the span exited without raising an exception.
+    success: bool = True
+    #: The ID of the process that recorded the span.
+    pid: int = 0
+    #: The name of the process that recorded the span.
+    process: str = ""
+    #: The identifier of the thread that recorded the span.
+    tid: int = 0
+    #: The name of the thread that recorded the span.
+    thread: str = ""
+    #: Additional JSON-serializable data, *e.g.* the resource usage of the span.
+    args: Mapping[str, Any] = {}
+
+    @property
+    def end(self) -> float:
+        """The end time (in seconds since the Unix epoch)."""
+        return self.start + self.duration
+
+
+class Tracer:
+    """A thread-safe collection of timed spans, exportable as Chrome trace events or a flat JSON summary.
+
+    Spans are recorded by all :class:`~dep_builder.TimeLogger` blocks, as well as by :meth:`span`.
+    The Chrome trace can be viewed with `Perfetto <https://ui.perfetto.dev>`_ or ``chrome://tracing``,
+    showing the overlap of all spans across threads and processes.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        >>> from dep_builder import Tracer
+
+        >>> tracer = Tracer()
+        >>> with tracer.span("configure"):
+        ...     pass
+        >>> tracer.write_chrome_trace("trace.json")  # doctest: +SKIP
+
+    """
+
+    __slots__ = ("_spans", "_lock", "_local")
+
+    @property
+    def spans(self) -> list[Span]:
+        """A list with all recorded spans, sorted by their start time."""
+        with self._lock:
+            return sorted(self._spans, key=lambda i: (i.start, i.depth))
+
+    def __init__(self) -> None:
+        """Initialize the instance."""
+        self._spans: list[Span] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __repr__(self) -> str:
+        """Implement :func:`repr(self) <repr>`."""
+        with self._lock:
+            n_spans = len(self._spans)
+        return f"<{type(self).__name__} with {n_spans} span(s)>"
+
+    @property
+    def depth(self) -> int:
+        """The number of open spans in the current thread."""
+        ret: int = getattr(self._local, "depth", 0)
+        return ret
+
+    @contextlib.contextmanager
+    def open(self) -> Iterator[int]:
+        """Context manager for increasing the nesting depth of the current thread, yielding the old depth."""
+        depth = self.depth
+        self._local.depth = depth + 1
+        try:
+            yield depth
+        finally:
+            self._local.depth = depth
+
+    def add(
+        self,
+        name: str,
+        start: float,
+        duration: float,
+        *,
+        depth: int = 0,
+        success: bool = True,
+        args: None | Mapping[str, Any] = None,
+    ) -> Span:
+        """Record a span of the current process and thread.
+
+        Parameters
+        ----------
+        name : str
+            The name of the span.
+        start : float
+            The start time, as returned by :func:`time.perf_counter`.
+        duration : float
+            The duration (in seconds).
+        depth : int
+            The nesting depth of the span within the current thread.
+        success : bool
+            Whether the span exited without raising an exception.
+        args : None | Mapping[str, Any]
+            Additional JSON-serializable data.
+
+        Returns
+        -------
+        dep_builder.Span
+            The recorded span.
+
+        """
+        thread = threading.current_thread()
+        span = Span(
+            name, start + _EPOCH_OFFSET, duration, depth, success,
+            os.getpid(), _process_name(), threading.get_ident(), thread.name, dict(args or {}),
+        )
+        with self._lock:
+            self._spans.append(span)
+        return span
+
+    @contextlib.contextmanager
+    def span(self, name: str, **args: Any) -> Iterator[None]:
+        """Context manager for recording a span without any logging.
+
+        Parameters
+        ----------
+        name : str
+            The name of the span.
+        **args : Any
+            Additional JSON-serializable data.
+
+        """
+        with self.open() as depth:
+            start = time.perf_counter()
+            success = False
+            try:
+                yield
+                success = True
+            finally:
+                self.add(name, start, time.perf_counter() - start, depth=depth, success=success, args=args)
+
+    def extend(self, spans: Iterable[Span]) -> None:
+        """Add the passed spans, *e.g.* as recorded by other processes."""
+        with self._lock:
+            self._spans.extend(spans)
+
+    def load(self, path: str | os.PathLike[str]) -> None:
+        """Add all spans from the passed JSON summary, as written by :meth:`write_summary`."""
+        with open(path, "r", encoding="utf8") as f:
+            data = json.load(f)
+        self.extend(Span(**{k: v for k, v in i.items() if k in Span._fields}) for i in data["spans"])
+
+    def summary(self) -> dict[str, Any]:
+        """Return a flat, JSON-serializable summary of all spans.
+
+        Returns
+        -------
+        dict[str, Any]
+            A dictionary with the total wall time and a list of all spans, sorted by their start time.
+
+        """
+        spans = self.spans
+        wall_time = max((i.end for i in spans), default=0.0) - min((i.start for i in spans), default=0.0)
+        return {
+            "wall_time": wall_time,
+            "spans": [{**i._asdict(), "args": dict(i.args)} for i in spans],
+        }
+
+    def chrome_trace(self) -> dict[str, Any]:
+        """Return all spans in the Chrome trace event format.
+
+        Returns
+        -------
+        dict[str, Any]
+            A JSON-serializable dictionary with all spans as complete (``"X"``) events,
+            plus metadata events naming every process and thread.
+
+        """
+        spans = self.spans
+        events: list[dict[str, Any]] = []
+        for pid, process in sorted({(i.pid, i.process) for i in spans}):
+            events.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": f"{process} ({pid})"}})
+        for pid, tid, thread in sorted({(i.pid, i.tid, i.thread) for i in spans}):
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread}})
+        for i in spans:
+            events.append({
+                "name": i.name,
+                "cat": "dep_builder",
+                "ph": "X",
+                "ts": round(i.start * 1e6),
+                "dur": round(i.duration * 1e6),
+                "pid": i.pid,
+                "tid": i.tid,
+                "args": {"success": i.success, **i.args},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    @staticmethod
+    def _write(path: str | os.PathLike[str], data: Mapping[str, Any]) -> None:
+        path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f".{os.path.basename(path)}.")
+        try:
+            with open(fd, "w", encoding="utf8") as f:
+                json.dump(data, f, indent=1)
+            os.replace(tmp, path)
+        finally:
+            if os.path.isfile(tmp):
+                os.remove(tmp)
+
+    def write_chrome_trace(self, path: str | os.PathLike[str]) -> None:
+        """Write all spans as Chrome trace events (see :meth:`chrome_trace`) to the passed file."""
+        self._write(path, self.chrome_trace())
+
+    def write_summary(self, path: str | os.PathLike[str]) -> None:
+        """Write the flat JSON summary of all spans (see :meth:`summary`) to the passed file."""
+        self._write(path, self.summary())
+
+
+_TRACER: None | Tracer = None
+_TRACER_LOCK = threading.Lock()
+
+
+def _dump_tracer(tracer: Tracer) -> None:
+    directory = os.environ.get(TRACE_DIR_ENV_VAR)
+    if directory and tracer.spans:
+        tracer.write_summary(Path(directory) / f"spans-{os.getpid()}.json")
+
+
+def get_tracer() -> Tracer:
+    """Return the default :class:`Tracer`, wherein all :class:`~dep_builder.TimeLogger` blocks are recorded.
+
+    If the ``DEP_BUILDER_TRACE_DIR`` environment variable is set, all spans are written to
+    ``spans-<pid>.json`` within that directory when the interpreter exits,
+    allowing the spans of (child) processes to be merged via :meth:`Tracer.load`.
+
+    Returns
+    -------
+    dep_builder.Tracer
+        The default tracer.
+
+    """
+    global _TRACER
+    with _TRACER_LOCK:
+        if _TRACER is None:
+            _TRACER = tracer = Tracer()
+            atexit.register(_dump_tracer, tracer)
+        return _TRACER
@@ -0,0 +1,68 @@
+"""Fixtures shared by all tests."""
+
+from __future__ import annotations
+
+import os
+import stat
+from pathlib import Path
+
+import pytest
+
+from dep_builder import BuildCache
+from dep_builder import _build_cache
+
+#: A stand-in for an autoconf ``configure`` script.
+#: It logs its arguments to ``invocations`` in the build directory, copies the cache file it is passed
+#: to ``cache.in`` and then appends a number of entries to it, mimicking a real ``configure`` run.
+#: The ``STUB_FAIL`` environment variable makes it fail due to an inconsistent cache (``cache``),
+#: or due to any other reason (``other``).
+STUB_CONFIGURE = r"""#!/bin/sh
+echo "$*" >> invocations
+cache_file=
+for arg in "$@"; do
+    case "$arg" in
+        --cache-file=*) cache_file="${arg#--cache-file=}";;
+    esac
+done
+
+echo "This file contains any messages produced by compilers while running configure." > config.log
+if [ "$STUB_FAIL" = "other" ]; then
+    echo "configure: error: library 'foo' not found" >> config.log
+    exit 1
+elif [ "$STUB_FAIL" = "cache" ] && [ -n "$cache_file" ]; then
+    echo "configure: error: changes in the environment can compromise the build" >> config.log
+    exit 1
+fi
+
+if [ -n "$cache_file" ]; then
+    touch "$cache_file"
+    cp "$cache_file" cache.in
+    cat >> "$cache_file" << 'EOF'
+ac_cv_prog_ac_ct_CC=${ac_cv_prog_ac_ct_CC=gcc}
+ac_cv_header_stdio_h=${ac_cv_header_stdio_h=yes}
+ac_cv_header_foo_h=${ac_cv_header_foo_h=no}
+ac_cv_func_bar=${ac_cv_func_bar=no}
+ac_cv_lib_m_cos=${ac_cv_lib_m_cos='yes'}
+EOF
+fi
+echo "#!/bin/sh" > config.status
+"""
+
+
+@pytest.fixture
+def cache_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Point all :mod:`dep_builder` caches to a temporary directory."""
+    ret = tmp_path / "cache"
+    monkeypatch.setenv("DEP_BUILDER_CACHE_DIR", os.fspath(ret))
+    monkeypatch.setattr(_build_cache, "_BUILD_CACHE", BuildCache(ret / "builds"))
+    return ret
+
+
+@pytest.fixture
+def src_path(tmp_path: Path) -> Path:
+    """Return a source directory with a stand-in ``configure`` script (see :data:`STUB_CONFIGURE`)."""
+    ret = tmp_path / "src"
+    ret.mkdir()
+    (ret / "configure").write_text(STUB_CONFIGURE)
+    (ret / "configure").chmod(stat.S_IRWXU)
+    return ret
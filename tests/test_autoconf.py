@@ -0,0 +1,83 @@
+"""Tests for sharing the autoconf cache between :func:`dep_builder.configure` runs."""
+
+from __future__ import annotations
+
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from dep_builder import configure, get_autoconf_cache_file
+
+
+def _invocations(build_path: Path) -> list[str]:
+    return (build_path / "invocations").read_text().splitlines()
+
+
+def _entries(path: Path) -> set[str]:
+    return {i.split("=", 1)[0] for i in path.read_text().splitlines() if not i.startswith("#")}
+
+
+def test_merge(tmp_path: Path, cache_dir: Path, src_path: Path) -> None:
+    shared_path = get_autoconf_cache_file()
+    assert shared_path is not None
+    assert cache_dir in shared_path.parents
+    shared_path.parent.mkdir(parents=True)
+    shared_path.write_text("ac_cv_path_SED=${ac_cv_path_SED=/usr/bin/sed}\n")
+
+    build1 = tmp_path / "build1"
+    configure(src_path, build1)
+    assert _invocations(build1) == [f"--cache-file={build1 / 'config.cache'}"]
+    assert _entries(build1 / "cache.in") == {"ac_cv_path_SED"}
+
+    # Negative header, library and function checks are not shared,
+    # as they may change once other packages have been installed
+    expected = {"ac_cv_path_SED", "ac_cv_prog_ac_ct_CC", "ac_cv_header_stdio_h", "ac_cv_lib_m_cos"}
+    assert _entries(shared_path) == expected
+
+    build2 = tmp_path / "build2"
+    configure(src_path, build2, ["--enable-foo"])
+    assert _invocations(build2) == [f"--cache-file={build2 / 'config.cache'} --enable-foo"]
+    assert _entries(build2 / "cache.in") == expected
+    assert _entries(shared_path) == expected
+
+
+@pytest.mark.parametrize("config_args", [["-C"], ["--config-cache"], ["--cache-file=my.cache"]])
+def test_explicit_cache(tmp_path: Path, cache_dir: Path, src_path: Path, config_args: list[str]) -> None:
+    configure(src_path, tmp_path / "build", config_args)
+    assert _invocations(tmp_path / "build") == [" ".join(config_args)]
+    assert not (cache_dir / "autoconf").exists()
+
+
+def test_disabled(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, src_path: Path) -> None:
+    monkeypatch.setenv("DEP_BUILDER_CACHE_DIR", "")
+    assert get_autoconf_cache_file() is None
+    configure(src_path, tmp_path / "build", ["--enable-foo"])
+    assert _invocations(tmp_path / "build") == ["--enable-foo"]
+
+
+def test_no_cache(tmp_path: Path, cache_dir: Path, src_path: Path) -> None:
+    configure(src_path, tmp_path / "build", cache=False)
+    assert _invocations(tmp_path / "build") == [""]
+    assert not (cache_dir / "autoconf").exists()
+
+
+def test_cache_error(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, cache_dir: Path, src_path: Path) -> None:
+    monkeypatch.setenv("STUB_FAIL", "cache")
+    build_path = tmp_path / "build"
+    configure(src_path, build_path, ["--enable-foo"])
+    assert _invocations(build_path) == [f"--cache-file={build_path / 'config.cache'} --enable-foo", "--enable-foo"]
+
+    # Entries of the failed run are not merged into the shared cache
+    shared_path = get_autoconf_cache_file()
+    assert shared_path is not None
+    assert not shared_path.exists()
+
+
+def test_other_error(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, cache_dir: Path, src_path: Path) -> None:
+    # Failures unrelated to the cache are not retried
+    monkeypatch.setenv("STUB_FAIL", "other")
+    build_path = tmp_path / "build"
+    with pytest.raises(subprocess.CalledProcessError):
+        configure(src_path, build_path)
+    assert _invocations(build_path) == [f"--cache-file={build_path / 'config.cache'}"]
@@ -0,0 +1,81 @@
+"""Tests for caching the autotools bootstrap output via :func:`dep_builder.autogen`."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+import pytest
+
+from dep_builder import autogen, get_build_cache
+from dep_builder import _build_cache
+
+#: A stand-in ``autogen.sh`` that creates and modifies a number of files, counting its invocations.
+STUB_AUTOGEN = """#!/bin/sh
+echo run >> ../autogen.count
+echo "#!/bin/sh" > configure
+echo "generated" >> Makefile.in
+mkdir -p m4 autom4te.cache
+echo "m4" > m4/libtool.m4
+echo "output" > autom4te.cache/output.0
+ln -sf m4/libtool.m4 aclocal.m4
+"""
+
+
+def _make_src(path: Path) -> Path:
+    (path / "src").mkdir(parents=True)
+    (path / "src" / "autogen.sh").write_text(STUB_AUTOGEN)
+    (path / "src" / "Makefile.in").write_text("template\n")
+    (path / "src" / "README").write_text("readme\n")
+    return path / "src"
+
+
+def _n_runs(path: Path) -> int:
+    count = path / "autogen.count"
+    return len(count.read_text().splitlines()) if count.exists() else 0
+
+
+def test_autogen(tmp_path: Path, cache_dir: Path) -> None:
+    src1 = _make_src(tmp_path / "a")
+    autogen(src1, "sh autogen.sh", source="abc")
+    assert _n_runs(tmp_path / "a") == 1
+    cache = get_build_cache()
+    assert cache is not None
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    # Restore the output into a pristine copy of the source tree, without running the script
+    src2 = _make_src(tmp_path / "b")
+    (src2 / "README").write_text("modified\n")
+    autogen(src2, "sh autogen.sh", source="abc")
+    assert _n_runs(tmp_path / "b") == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    assert (src2 / "configure").read_text() == "#!/bin/sh\n"
+    assert (src2 / "Makefile.in").read_text() == "template\ngenerated\n"
+    assert (src2 / "m4" / "libtool.m4").read_text() == "m4\n"
+    assert os.readlink(src2 / "aclocal.m4") == "m4/libtool.m4"
+    # Unmodified files are not part of the cached output, nor are the autotools' own caches
+    assert (src2 / "README").read_text() == "modified\n"
+    assert not (src2 / "autom4te.cache").exists()
+
+
+@pytest.mark.parametrize("source,command", [("def", "sh autogen.sh"), ("abc", "sh ./autogen.sh")])
+def test_autogen_miss(tmp_path: Path, cache_dir: Path, source: str, command: str) -> None:
+    autogen(_make_src(tmp_path / "a"), "sh autogen.sh", source="abc")
+    autogen(_make_src(tmp_path / "b"), command, source=source)
+    assert _n_runs(tmp_path / "b") == 1
+
+
+def test_autogen_no_source(tmp_path: Path, cache_dir: Path) -> None:
+    for name in ("a", "b"):
+        autogen(_make_src(tmp_path / name), "sh autogen.sh")
+        assert _n_runs(tmp_path / name) == 1
+    assert os.listdir(cache_dir / "builds" / "objects") == []
+
+
+def test_autogen_disabled(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("DEP_BUILDER_CACHE_DIR", "")
+    monkeypatch.setattr(_build_cache, "_BUILD_CACHE", None)
+    for name in ("a", "b"):
+        autogen(_make_src(tmp_path / name), "sh autogen.sh", source="abc")
+        assert _n_runs(tmp_path / name) == 1
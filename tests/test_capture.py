@@ -0,0 +1,37 @@
+"""Tests for :func:`dep_builder.run_captured`."""
+
+from __future__ import annotations
+
+import gzip
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from dep_builder import run_captured
+from dep_builder import _capture
+
+
+def test_run_captured(tmp_path: Path, caplog: pytest.LogCaptureFixture) -> None:
+    log_path = tmp_path / "make.log.gz"
+    run_captured("echo 'warning: first'; echo 'error: second'; echo 'warning: error'", log_path)
+    with gzip.open(log_path, "rb") as f:
+        assert f.read() == b"warning: first\nerror: second\nwarning: error\n"
+    assert "3 line(s) (44.0 B), 2 warning(s), 2 error(s)" in caplog.text
+
+
+def test_run_captured_failure(tmp_path: Path, caplog: pytest.LogCaptureFixture) -> None:
+    with pytest.raises(subprocess.CalledProcessError):
+        run_captured("seq 1 1000; exit 3", tmp_path / "make.log.gz", tail=2)
+    assert "999\n" in caplog.text
+    assert "998\n" not in caplog.text
+
+
+def test_run_captured_write_error(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    def write(self: gzip.GzipFile, data: bytes) -> int:
+        raise OSError("No space left on device")
+
+    # The output exceeds the pipe buffer, so the child would block if the pipe were not drained
+    monkeypatch.setattr(_capture.gzip.GzipFile, "write", write)
+    with pytest.raises(OSError, match="No space left on device"):
+        run_captured("head -c 10000000 /dev/zero", tmp_path / "make.log.gz")
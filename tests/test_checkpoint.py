@@ -0,0 +1,105 @@
+"""Tests for :class:`dep_builder.Checkpoint`."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+
+from dep_builder import Checkpoint
+
+INPUTS = {"version": "1.0", "config_args": ["--enable-foo"]}
+
+
+class _Pipeline:
+    """A stand-in installer pipeline recording which of its stages have been executed."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.calls: list[str] = []
+
+    def stage(self, name: str, ret: Any = None) -> Callable[..., Any]:
+        def func(*args: Any, **kwargs: Any) -> Any:
+            self.calls.append(name)
+            return ret
+        return func
+
+    def run(self, checkpoint: Checkpoint, fail: None | str = None) -> Path:
+        src_path: Path = checkpoint.run("unpack", self.stage("unpack", self.path / "src"))
+        src_path.mkdir(exist_ok=True)
+        checkpoint.run("configure", self.stage("configure"), src_path, self.path / "build")
+        if fail == "build":
+            checkpoint.run("build", self.fail)
+        checkpoint.run("build", self.stage("build", 42), self.path / "build")
+        return src_path
+
+    def fail(self) -> None:
+        self.calls.append("build")
+        raise RuntimeError("build failed")
+
+
+@pytest.fixture
+def pipeline(tmp_path: Path) -> _Pipeline:
+    (tmp_path / "build").mkdir()
+    return _Pipeline(tmp_path)
+
+
+def test_resume(tmp_path: Path, pipeline: _Pipeline) -> None:
+    path = tmp_path / ".state.json"
+    with pytest.raises(RuntimeError):
+        pipeline.run(Checkpoint(path, INPUTS, resume=True), fail="build")
+    assert pipeline.calls == ["unpack", "configure", "build"]
+
+    pipeline.calls.clear()
+    checkpoint = Checkpoint(path, INPUTS, resume=True)
+    assert checkpoint.stages == ["unpack", "configure"]
+    assert pipeline.run(checkpoint) == tmp_path / "src"
+    assert pipeline.calls == ["build"]
+    assert checkpoint.stages == ["unpack", "configure", "build"]
+
+    checkpoint.clear()
+    assert not path.exists()
+    assert checkpoint.stages == []
+
+
+def test_no_resume(tmp_path: Path, pipeline: _Pipeline) -> None:
+    path = tmp_path / ".state.json"
+    pipeline.run(Checkpoint(path, INPUTS))
+    pipeline.calls.clear()
+
+    checkpoint = Checkpoint(path, INPUTS)
+    assert checkpoint.stages == []
+    pipeline.run(checkpoint)
+    assert pipeline.calls == ["unpack", "configure", "build"]
+
+
+def test_changed_inputs(tmp_path: Path, pipeline: _Pipeline) -> None:
+    path = tmp_path / ".state.json"
+    pipeline.run(Checkpoint(path, INPUTS))
+    pipeline.calls.clear()
+
+    checkpoint = Checkpoint(path, {**INPUTS, "version": "2.0"}, resume=True)
+    assert checkpoint.stages == []
+    pipeline.run(checkpoint)
+    assert pipeline.calls == ["unpack", "configure", "build"]
+
+
+def test_missing_path(tmp_path: Path, pipeline: _Pipeline) -> None:
+    path = tmp_path / ".state.json"
+    pipeline.run(Checkpoint(path, INPUTS))
+    pipeline.calls.clear()
+
+    # The configure stage is rerun as its build directory is gone, and so are all subsequent stages
+    (tmp_path / "build").rmdir()
+    checkpoint = Checkpoint(path, INPUTS, resume=True)
+    assert checkpoint.stages == ["unpack", "configure", "build"]
+    pipeline.run(checkpoint)
+    assert pipeline.calls == ["configure", "build"]
+
+
+def test_invalid_output(tmp_path: Path) -> None:
+    checkpoint = Checkpoint(tmp_path / ".state.json", INPUTS)
+    with pytest.raises(TypeError):
+        checkpoint.run("stage", lambda: [1, 2])
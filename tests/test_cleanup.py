@@ -0,0 +1,108 @@
+"""Tests for :class:`dep_builder.Cleaner`."""
+
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from dep_builder import Cleaner
+from dep_builder import _cleanup
+
+
+def _make_tree(path: Path, n_files: int = 10) -> Path:
+    (path / "sub").mkdir(parents=True)
+    for i in range(n_files):
+        (path / "sub" / f"file{i}").write_text(str(i))
+    return path
+
+
+def test_remove_recreate(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # Block the background deletion until the tree has been recreated
+    event = threading.Event()
+    rmtree = shutil.rmtree
+
+    def slow_rmtree(path: str, **kwargs: Any) -> None:
+        event.wait()
+        rmtree(path, **kwargs)
+
+    monkeypatch.setattr(_cleanup.shutil, "rmtree", slow_rmtree)
+    cleaner = Cleaner()
+    try:
+        path = _make_tree(tmp_path / "build")
+        cleaner.remove(path)
+        assert not path.exists()
+
+        _make_tree(path, n_files=1)
+        assert sorted(os.listdir(path / "sub")) == ["file0"]
+    finally:
+        event.set()
+        cleaner.close()
+
+    assert sorted(os.listdir(path / "sub")) == ["file0"]
+    assert os.listdir(tmp_path) == ["build"]
+    assert cleaner.n_trees == 1
+
+
+def test_wait(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    event = threading.Event()
+    rmtree = shutil.rmtree
+
+    def slow_rmtree(path: str, **kwargs: Any) -> None:
+        event.wait(0.2)
+        rmtree(path, **kwargs)
+
+    monkeypatch.setattr(_cleanup.shutil, "rmtree", slow_rmtree)
+    cleaner = Cleaner(max_workers=1)
+    try:
+        for i in range(3):
+            cleaner.remove(_make_tree(tmp_path / f"build{i}"))
+        cleaner.wait()
+        trash_dirs = [i for i in os.listdir(tmp_path) if i.startswith(".dep_builder_trash-")]
+        assert len(trash_dirs) == 1
+        assert os.listdir(tmp_path / trash_dirs[0]) == []
+        assert cleaner.background_time > 0
+    finally:
+        cleaner.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_remove_in_place(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    def rename(src: str, dst: str) -> None:
+        raise PermissionError(src)
+
+    # Trees that cannot be moved are deleted synchronously
+    monkeypatch.setattr(_cleanup.os, "rename", rename)
+    cleaner = Cleaner()
+    try:
+        path = _make_tree(tmp_path / "build")
+        cleaner.remove(path)
+        assert not path.exists()
+        _make_tree(path)
+    finally:
+        cleaner.close()
+    assert path.is_dir()
+
+
+def test_remove_missing(tmp_path: Path) -> None:
+    cleaner = Cleaner()
+    cleaner.remove(tmp_path / "missing")
+    cleaner.close()
+    assert cleaner.n_trees == 0
+    assert os.listdir(tmp_path) == []
+
+
+def test_closed(tmp_path: Path) -> None:
+    cleaner = Cleaner()
+    cleaner.close()
+    with pytest.raises(RuntimeError):
+        cleaner.remove(_make_tree(tmp_path / "build"))
+
+
+def test_max_workers() -> None:
+    with pytest.raises(ValueError):
+        Cleaner(max_workers=0)
@@ -0,0 +1,72 @@
+"""Tests for incremental :func:`dep_builder.configure` runs."""
+
+from __future__ import annotations
+
+import stat
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from dep_builder import configure
+
+
+def _n_runs(build_path: Path) -> int:
+    return len((build_path / "invocations").read_text().splitlines())
+
+
+def test_incremental(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, src_path: Path) -> None:
+    monkeypatch.setenv("DEP_BUILDER_CACHE_DIR", "")
+    build_path = tmp_path / "build"
+    configure(src_path, build_path, ["--enable-foo"], incremental=True)
+    assert _n_runs(build_path) == 1
+
+    # Identical inputs
+    configure(src_path, build_path, ["--enable-foo"], incremental=True)
+    assert _n_runs(build_path) == 1
+
+    # Changed arguments
+    configure(src_path, build_path, ["--enable-bar"], incremental=True)
+    assert _n_runs(build_path) == 2
+    configure(src_path, build_path, ["--enable-bar"], incremental=True)
+    assert _n_runs(build_path) == 2
+
+    # Changed configure script
+    config_path = src_path / "configure"
+    config_path.chmod(stat.S_IRWXU)
+    config_path.write_text(config_path.read_text() + "\n# A comment\n")
+    configure(src_path, build_path, ["--enable-bar"], incremental=True)
+    assert _n_runs(build_path) == 3
+
+    # Changed toolchain
+    monkeypatch.setenv("CFLAGS", "-O3")
+    configure(src_path, build_path, ["--enable-bar"], incremental=True)
+    assert _n_runs(build_path) == 4
+
+    # Missing configure output
+    (build_path / "config.status").unlink()
+    configure(src_path, build_path, ["--enable-bar"], incremental=True)
+    assert _n_runs(build_path) == 5
+
+
+def test_incremental_failure(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, src_path: Path) -> None:
+    monkeypatch.setenv("DEP_BUILDER_CACHE_DIR", "")
+    build_path = tmp_path / "build"
+    configure(src_path, build_path, incremental=True)
+
+    # An interrupted reconfiguration is never mistaken for a successful one
+    monkeypatch.setenv("STUB_FAIL", "other")
+    with pytest.raises(subprocess.CalledProcessError):
+        configure(src_path, build_path, ["--enable-foo"], incremental=True)
+    monkeypatch.delenv("STUB_FAIL")
+    configure(src_path, build_path, incremental=True)
+    assert _n_runs(build_path) == 3
+
+
+def test_not_incremental(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, src_path: Path) -> None:
+    monkeypatch.setenv("DEP_BUILDER_CACHE_DIR", "")
+    build_path = tmp_path / "build"
+    configure(src_path, build_path)
+    with pytest.raises(FileExistsError):
+        configure(src_path, build_path)
+    assert not (build_path / ".dep_builder_configure").exists()
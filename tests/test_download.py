@@ -0,0 +1,180 @@
+"""Tests for :func:`dep_builder.download` against a local HTTP stand-in server."""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import http.server
+from pathlib import Path
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+
+from dep_builder import download
+from dep_builder import _download
+
+#: The content served by the stand-in server.
+PAYLOAD = os.urandom(256 * 1024)
+
+_RANGE_PATTERN = re.compile(r"bytes=(\d+)-(\d*)")
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    """A stand-in server that can throttle, drop connections and ignore ``Range`` headers."""
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.ignore_range = False
+        #: The number of upcoming responses that are dropped halfway through.
+        self.n_drops = 0
+        #: The delay (in seconds) between two chunks of a response.
+        self.delay = 0.0
+        self.requests: list[None | str] = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/payload.bin"
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    server: _Server
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_HEAD(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(PAYLOAD)))
+        self.send_header("Accept-Ranges", "none" if self.server.ignore_range else "bytes")
+        self.end_headers()
+
+    def do_GET(self) -> None:
+        range_header = self.headers.get("Range")
+        with self.server.lock:
+            self.server.requests.append(range_header)
+            drop = self.server.n_drops > 0
+            self.server.n_drops -= drop
+
+        match = _RANGE_PATTERN.fullmatch(range_header or "")
+        if match is None or self.server.ignore_range:
+            start, stop = 0, len(PAYLOAD)
+            self.send_response(200)
+        else:
+            start = int(match[1])
+            stop = int(match[2]) + 1 if match[2] else len(PAYLOAD)
+            if start >= len(PAYLOAD):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(PAYLOAD)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{stop - 1}/{len(PAYLOAD)}")
+
+        body = PAYLOAD[start:stop]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if drop:
+            body = body[:len(body) // 2]
+        for i in range(0, len(body), 16 * 1024):
+            self.wfile.write(body[i:i + 16 * 1024])
+            self.wfile.flush()
+            if self.server.delay:
+                threading.Event().wait(self.server.delay)
+        if drop:
+            self.close_connection = True
+            self.connection.shutdown(2)
+
+
+@pytest.fixture
+def server(monkeypatch: pytest.MonkeyPatch) -> Iterator[_Server]:
+    # Do not wait in between retries
+    monkeypatch.setattr(_download.time, "sleep", lambda seconds: None)
+    ret = _Server()
+    thread = threading.Thread(target=ret.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield ret
+    finally:
+        ret.shutdown()
+        ret.server_close()
+        thread.join()
+
+
+def test_download(server: _Server, tmp_path: Path) -> None:
+    path = tmp_path / "payload.bin"
+    assert download(server.url, path) == len(PAYLOAD)
+    assert path.read_bytes() == PAYLOAD
+    assert server.requests == [None]
+
+
+def test_resume_dropped_connection(server: _Server, tmp_path: Path) -> None:
+    server.n_drops = 2
+    server.delay = 0.001
+    path = tmp_path / "payload.bin"
+    assert download(server.url, path, chunk_size=1024, retries=3) == len(PAYLOAD)
+    assert path.read_bytes() == PAYLOAD
+    assert len(server.requests) == 3
+    assert server.requests[0] is None
+    # The second attempt resumes halfway through the payload, the third halfway through the remainder
+    assert server.requests[1] == f"bytes={len(PAYLOAD) // 2}-"
+    assert server.requests[2] == f"bytes={len(PAYLOAD) - len(PAYLOAD) // 4}-"
+
+
+def test_resume_dropped_connection_exhausted(server: _Server, tmp_path: Path) -> None:
+    server.n_drops = 3
+    with pytest.raises(_download._RETRY_EXCEPTIONS):
+        download(server.url, tmp_path / "payload.bin", chunk_size=1024, retries=2)
+
+
+def test_range_ignored(server: _Server, tmp_path: Path) -> None:
+    server.ignore_range = True
+    path = tmp_path / "payload.bin"
+    path.write_bytes(b"garbage")
+    assert download(server.url, path, resume=True) == len(PAYLOAD)
+    assert path.read_bytes() == PAYLOAD
+    assert server.requests == ["bytes=7-"]
+
+
+def test_range_ignored_dropped_connection(server: _Server, tmp_path: Path) -> None:
+    server.ignore_range = True
+    server.n_drops = 1
+    path = tmp_path / "payload.bin"
+    assert download(server.url, path, chunk_size=1024, retries=1) == len(PAYLOAD)
+    assert path.read_bytes() == PAYLOAD
+    assert server.requests == [None, f"bytes={len(PAYLOAD) // 2}-"]
+
+
+def test_already_complete(server: _Server, tmp_path: Path) -> None:
+    path = tmp_path / "payload.bin"
+    path.write_bytes(PAYLOAD)
+    assert download(server.url, path, resume=True) == len(PAYLOAD)
+    assert path.read_bytes() == PAYLOAD
+    assert server.requests == [f"bytes={len(PAYLOAD)}-"]
+
+
+@pytest.mark.parametrize("n_drops", [0, 2])
+def test_segmented(server: _Server, tmp_path: Path, n_drops: int) -> None:
+    server.n_drops = n_drops
+    path = tmp_path / "payload.bin"
+    assert download(server.url, path, chunk_size=1024, segments=4, retries=2) == len(PAYLOAD)
+    assert path.read_bytes() == PAYLOAD
+
+    step = len(PAYLOAD) // 4
+    expected = {f"bytes={i}-{i + step - 1}" for i in range(0, len(PAYLOAD), step)}
+    assert expected <= set(server.requests)
+    assert len(server.requests) == 4 + n_drops
+
+
+def test_segmented_range_ignored(server: _Server, tmp_path: Path) -> None:
+    server.ignore_range = True
+    path = tmp_path / "payload.bin"
+    assert download(server.url, path, chunk_size=1024, segments=4) == len(PAYLOAD)
+    assert path.read_bytes() == PAYLOAD
+    assert server.requests == [None]
@@ -0,0 +1,101 @@
+"""Tests for :func:`dep_builder._extract.extract_tar`."""
+
+from __future__ import annotations
+
+import io
+import tarfile
+from pathlib import Path
+
+import pytest
+
+from dep_builder._extract import extract_tar
+
+
+def test_duplicate_members(tmp_path: Path) -> None:
+    archive = tmp_path / "archive.tar"
+    with tarfile.open(archive, "w") as tar:
+        for i in range(100):
+            for j in range(3):
+                data = f"{i}-{j}\n".encode() * 100
+                info = tarfile.TarInfo(f"pkg/file{i}")
+                info.size = len(data)
+                info.mode = 0o444
+                tar.addfile(info, io.BytesIO(data))
+
+    assert extract_tar(archive, tmp_path / "out", workers=8) == "pkg"
+    for i in range(100):
+        # The last member wins
+        assert (tmp_path / "out" / "pkg" / f"file{i}").read_text() == f"{i}-2\n" * 100
+
+
+def _make_archive(path: Path, names: list[str]) -> Path:
+    """Create a gzip-compressed tar archive with a file for every name, containing the name itself."""
+    with tarfile.open(path, "w:gz") as tar:
+        for name in names:
+            data = name.encode()
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return path
+
+
+@pytest.mark.parametrize("name", ["pkg/../../evil.txt", "pkg/sub/../../../evil.txt"])
+@pytest.mark.parametrize("strip_root", [False, True])
+def test_path_traversal(tmp_path: Path, name: str, strip_root: bool) -> None:
+    archive = _make_archive(tmp_path / "archive.tar.gz", ["pkg/README", name])
+    with pytest.raises(tarfile.TarError, match="path traversal"):
+        extract_tar(archive, tmp_path / "out", strip_root=strip_root)
+    assert not (tmp_path / "evil.txt").exists()
+
+
+def test_multiple_roots(tmp_path: Path) -> None:
+    archive = _make_archive(tmp_path / "archive.tar.gz", ["pkg/README", "other/README"])
+    with pytest.raises(ValueError, match="single top-directory"):
+        extract_tar(archive, tmp_path / "out")
+
+
+NAMES = [
+    "pkg/README",
+    "pkg/include/highfive/H5File.hpp",
+    "pkg/include/highfive/bits/H5Utils.hpp",
+    "pkg/include/other.h",
+    "pkg/src/main.cpp",
+]
+
+
+@pytest.mark.parametrize("members,expected", [
+    (None, [i.split("/", 1)[1] for i in NAMES]),
+    (["include/highfive"], ["include/highfive/H5File.hpp", "include/highfive/bits/H5Utils.hpp"]),
+    (["include/highfive/"], ["include/highfive/H5File.hpp", "include/highfive/bits/H5Utils.hpp"]),
+    (["include/*.h", "README"], ["README", "include/other.h"]),
+    (["*.cpp"], ["src/main.cpp"]),
+    (["include/high"], []),
+])
+@pytest.mark.parametrize("strip_root", [False, True])
+def test_members(tmp_path: Path, members: None | list[str], expected: list[str], strip_root: bool) -> None:
+    archive = _make_archive(tmp_path / "archive.tar.gz", NAMES)
+    out = tmp_path / "out"
+    assert extract_tar(archive, out, members=members, strip_root=strip_root) == "pkg"
+
+    root = out if strip_root else out / "pkg"
+    files = sorted(i.relative_to(root).as_posix() for i in out.rglob("*") if i.is_file())
+    assert files == expected
+    for name in expected:
+        assert (root / name).read_text() == f"pkg/{name}"
+
+
+def test_strip_root_existing_dest(tmp_path: Path) -> None:
+    # Extracting into an existing tree replaces files and keeps unrelated ones
+    dest = tmp_path / "prefix"
+    (dest / "include").mkdir(parents=True)
+    (dest / "include" / "other.h").write_text("old")
+    (dest / "lib").mkdir()
+    (dest / "lib" / "libfoo.so").write_text("keep")
+
+    archive = _make_archive(tmp_path / "archive.tar.gz", NAMES)
+    assert extract_tar(archive, dest, members=["include"], strip_root=True) == "pkg"
+    assert (dest / "include" / "other.h").read_text() == "pkg/include/other.h"
+    assert (dest / "include" / "highfive" / "H5File.hpp").is_file()
+    assert (dest / "lib" / "libfoo.so").read_text() == "keep"
+    assert not (dest / "pkg").exists()
+    assert not (dest / "README").exists()
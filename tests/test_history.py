@@ -0,0 +1,158 @@
+"""Tests for :class:`dep_builder.History` and :func:`dep_builder.record_history`."""
+
+from __future__ import annotations
+
+import json
+import statistics
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from dep_builder import History, TimeLogger, record_history
+
+
+def _entry(
+    wall_time: float,
+    *,
+    package: str = "gmp",
+    version: str = "6.2.1",
+    key: str = "key",
+    success: bool = True,
+    **stage: float,
+) -> dict[str, Any]:
+    return {
+        "key": key,
+        "package": package,
+        "version": version,
+        "success": success,
+        "stages": {"Build": {"wall_time": wall_time, **stage}},
+    }
+
+
+def _write(path: Path, entries: list[dict[str, Any]]) -> History:
+    history = History(path)
+    for entry in entries:
+        history.append(entry)
+    return history
+
+
+def test_compare(tmp_path: Path) -> None:
+    samples = [10.0, 11.0, 10.0, 11.0, 10.0]
+    history = _write(tmp_path / "history.jsonl", [_entry(i) for i in samples] + [_entry(20.0, version="6.3.0")])
+    (comparison,) = history.compare()
+    assert comparison.package == "gmp"
+    assert comparison.version == "6.3.0"
+    assert comparison.stage == "Build"
+    assert comparison.metric == "wall_time"
+    assert comparison.value == 20.0
+    assert comparison.mean == pytest.approx(statistics.mean(samples))
+    assert comparison.stdev == pytest.approx(statistics.stdev(samples))
+    assert comparison.n_baseline == 5
+    assert comparison.regression
+    assert comparison.ratio == pytest.approx(20.0 / 10.4)
+
+
+@pytest.mark.parametrize("value,regression", [(11.5, False), (12.0, True)])
+def test_compare_threshold(tmp_path: Path, value: float, regression: bool) -> None:
+    # mean 10.5, stdev ~0.55, so the threshold of 3 standard deviations is at ~12.14;
+    # a ratio of at least 1.1 is required as well
+    samples = [10.0, 11.0, 10.0, 11.0]
+    history = _write(tmp_path / "history.jsonl", [_entry(i) for i in [*samples, value]])
+    (comparison,) = history.compare(threshold=2.5)
+    assert comparison.regression is regression
+
+
+def test_compare_min_ratio(tmp_path: Path) -> None:
+    # A very stable stage: exceeding the mean by many standard deviations is not enough
+    history = _write(tmp_path / "history.jsonl", [_entry(i) for i in [10.0, 10.01, 10.0, 10.3]])
+    (comparison,) = history.compare()
+    assert comparison.value > comparison.mean + 3 * comparison.stdev
+    assert not comparison.regression
+
+
+def test_compare_min_runs(tmp_path: Path) -> None:
+    history = _write(tmp_path / "history.jsonl", [_entry(10.0), _entry(20.0)])
+    assert history.compare() == []
+    history.append(_entry(30.0))
+    assert len(history.compare()) == 1
+
+
+def test_compare_baseline(tmp_path: Path) -> None:
+    entries = [
+        _entry(100.0),
+        _entry(100.0),
+        *(_entry(10.0) for _ in range(3)),
+        _entry(1000.0, success=False),
+        _entry(1.0, key="other", package="hdf5"),
+        _entry(30.0),
+    ]
+    history = _write(tmp_path / "history.jsonl", entries)
+
+    # Failed runs and runs with a different key are ignored, as are those outside the window
+    (comparison,) = history.compare(window=3)
+    assert (comparison.mean, comparison.stdev, comparison.n_baseline) == (10.0, 0.0, 3)
+    assert comparison.regression
+
+    (comparison,) = history.compare(window=5)
+    assert comparison.n_baseline == 5
+    assert not comparison.regression
+
+
+def test_compare_metrics(tmp_path: Path) -> None:
+    entries = [_entry(10.0, user_time=i, system_time=1.0, max_rss=2**30) for i in [30.0, 31.0, 30.0, 60.0]]
+    history = _write(tmp_path / "history.jsonl", entries)
+    comparisons = {i.metric: i for i in history.compare()}
+
+    # The peak RSS is not a per-stage metric
+    assert comparisons.keys() == {"wall_time", "cpu_time"}
+    assert comparisons["cpu_time"].value == 61.0
+    assert comparisons["cpu_time"].regression
+    assert not comparisons["wall_time"].regression
+
+
+def test_corrupt_lines(tmp_path: Path, caplog: pytest.LogCaptureFixture) -> None:
+    path = tmp_path / "history.jsonl"
+    history = _write(path, [_entry(10.0)])
+    with open(path, "a", encoding="utf8") as f:
+        f.write('{"key": "key", "pack\n')
+    history.append(_entry(11.0))
+    assert [i["stages"]["Build"]["wall_time"] for i in history.entries()] == [10.0, 11.0]
+    assert "Skipping corrupt line 2" in caplog.text
+
+
+def test_record_history(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = tmp_path / "history.jsonl"
+    monkeypatch.setenv("DEP_BUILDER_HISTORY", str(path))
+
+    with record_history("gmp", "6.2.1", ["--enable-cxx"]):
+        with TimeLogger("Configure GMP"):
+            pass
+        for _ in range(2):
+            with TimeLogger("Build GMP"):
+                pass
+
+    with pytest.raises(RuntimeError):
+        with record_history("gmp", "6.3.0", ["--enable-cxx"]), TimeLogger("Configure GMP"):
+            raise RuntimeError
+
+    with record_history("gmp", "6.3.0", ["--disable-cxx"]):
+        pass
+
+    entries = [json.loads(i) for i in path.read_text().splitlines()]
+    assert [(i["version"], i["success"]) for i in entries] == [("6.2.1", True), ("6.3.0", False), ("6.3.0", True)]
+    assert entries[0]["stages"].keys() == {"Configure GMP", "Build GMP"}
+    assert entries[1]["stages"].keys() == {"Configure GMP"}
+    assert entries[2]["stages"] == {}
+
+    # Runs of different versions are comparable, those with different configure arguments are not
+    assert entries[0]["key"] == entries[1]["key"]
+    assert entries[0]["key"] != entries[2]["key"]
+
+
+def test_record_history_disabled(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("DEP_BUILDER_HISTORY", "")
+    monkeypatch.setenv("DEP_BUILDER_CACHE_DIR", str(tmp_path))
+    with record_history("gmp", "6.2.1"), TimeLogger("Build GMP"):
+        pass
+    assert list(tmp_path.iterdir()) == []
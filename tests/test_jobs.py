@@ -0,0 +1,103 @@
+"""Tests for :func:`dep_builder.get_job_count` against a stand-in ``/proc`` and cgroup file system."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from dep_builder import get_job_count
+from dep_builder import _jobs
+
+GiB = 1024**3
+
+
+class _Root:
+    """A stand-in root directory with the ``/proc`` and ``/sys/fs/cgroup`` files read by :mod:`dep_builder._jobs`."""
+
+    def __init__(self, path: Path) -> None:
+        self.proc = path / "proc"
+        self.cgroup = path / "sys" / "fs" / "cgroup"
+
+    def write(self, path: Path, content: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+    def set_meminfo(self, available: int) -> None:
+        self.write(self.proc / "meminfo", f"MemTotal: {64 * GiB // 1024} kB\nMemAvailable: {available // 1024} kB\n")
+
+    def set_v2(self, **files: str) -> None:
+        """Place the process in the ``/build.slice/job`` cgroup v2, the files being written to its parent."""
+        self.write(self.proc / "self" / "cgroup", "0::/build.slice/job\n")
+        (self.cgroup / "build.slice" / "job").mkdir(parents=True, exist_ok=True)
+        for name, content in files.items():
+            self.write(self.cgroup / "build.slice" / name.replace("_", "."), content)
+
+
+@pytest.fixture
+def root(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> _Root:
+    ret = _Root(tmp_path)
+    ret.proc.mkdir()
+    ret.cgroup.mkdir(parents=True)
+    monkeypatch.setattr(_jobs, "_PROC_ROOT", ret.proc)
+    monkeypatch.setattr(_jobs, "_CGROUP_ROOT", ret.cgroup)
+    monkeypatch.setattr(_jobs.os, "sched_getaffinity", lambda pid: set(range(16)), raising=False)
+    ret.set_meminfo(64 * GiB)
+    return ret
+
+
+def test_unrestricted(root: _Root) -> None:
+    assert get_job_count() == 16
+
+
+def test_cgroup_v2_cpu(root: _Root) -> None:
+    root.set_v2(cpu_max="250000 100000\n")
+    assert get_job_count() == 3
+
+
+def test_cgroup_v2_unlimited(root: _Root) -> None:
+    root.set_v2(cpu_max="max 100000\n", memory_max="max\n", memory_current="0\n")
+    assert get_job_count() == 16
+
+
+def test_cgroup_v2_memory(root: _Root) -> None:
+    root.set_meminfo(32 * GiB)
+    root.set_v2(memory_max=f"{4 * GiB}\n", memory_current=f"{GiB}\n")
+    assert get_job_count(memory_per_job=GiB) == 3
+
+
+def test_cgroup_v1(root: _Root) -> None:
+    root.write(root.cgroup / "cpu,cpuacct" / "cpu.cfs_quota_us", "400000\n")
+    root.write(root.cgroup / "cpu,cpuacct" / "cpu.cfs_period_us", "100000\n")
+    assert get_job_count() == 4
+
+
+def test_cgroup_v1_unlimited(root: _Root) -> None:
+    root.write(root.cgroup / "cpu" / "cpu.cfs_quota_us", "-1\n")
+    root.write(root.cgroup / "cpu" / "cpu.cfs_period_us", "100000\n")
+    root.write(root.cgroup / "memory" / "memory.limit_in_bytes", f"{2**63 - 4096}\n")
+    root.write(root.cgroup / "memory" / "memory.usage_in_bytes", f"{GiB}\n")
+    assert get_job_count() == 16
+
+
+def test_cgroup_v1_memory(root: _Root) -> None:
+    root.write(root.cgroup / "memory" / "memory.limit_in_bytes", f"{2 * GiB}\n")
+    root.write(root.cgroup / "memory" / "memory.usage_in_bytes", f"{GiB // 2}\n")
+    assert get_job_count(memory_per_job=GiB // 2) == 3
+
+
+@pytest.mark.parametrize("available,expected", [(3 * GiB, 6), (64 * GiB, 16), (0, 1)])
+def test_mem_available(root: _Root, available: int, expected: int) -> None:
+    root.set_meminfo(available)
+    assert get_job_count() == expected
+
+
+def test_max_jobs(root: _Root) -> None:
+    root.set_v2(cpu_max="800000 100000\n")
+    assert get_job_count(max_jobs=2) == 2
+    assert get_job_count(max_jobs=0) == 1
+
+
+def test_invalid(root: _Root) -> None:
+    with pytest.raises(ValueError):
+        get_job_count(memory_per_job=0)
@@ -0,0 +1,133 @@
+"""Tests for :func:`dep_builder.load_manifest` and :func:`dep_builder.build_all`."""
+
+from __future__ import annotations
+
+import sys
+import subprocess
+from pathlib import Path
+from collections.abc import Iterator
+
+import pytest
+
+from dep_builder import Cleaner, Package, load_manifest, build_all
+from dep_builder import _cleanup
+
+#: A command writing the number of jobs passed to the package into ``<root>/<name>.jobs``.
+WRITE_JOBS = '["{python}", "-c", "import os; open(\'{root}/{name}.jobs\', \'w\').write(os.environ[\'DEP_BUILDER_JOBS\'])"]'
+
+
+@pytest.fixture(autouse=True)
+def cleaner(monkeypatch: pytest.MonkeyPatch) -> Iterator[Cleaner]:
+    # Use a private cleaner, rather than one that is closed (and logs) at interpreter exit
+    ret = Cleaner()
+    monkeypatch.setattr(_cleanup, "_CLEANER", ret)
+    try:
+        yield ret
+    finally:
+        ret.close()
+
+
+def _write_manifest(path: Path, content: str) -> Path:
+    path.write_text(content)
+    return path
+
+
+def test_load_manifest(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("GMP_VERSION", "6.3.0")
+    manifest = _write_manifest(tmp_path / "deps.toml", """
+[packages.gmp]
+version = "$GMP_VERSION"
+compile = true
+commands = [["{python}", "{root}/install_gmp.py", "{version}", "--prefix={prefix}"]]
+
+[packages.libint]
+version = "2.7.2"
+requires = ["gmp"]
+commands = [["echo", "{name}-{version}"], ["echo", "$GMP_VERSION"]]
+""")
+    packages = load_manifest(manifest, prefix="/opt/deps")
+    assert packages.keys() == {"gmp", "libint"}
+
+    gmp = packages["gmp"]
+    assert gmp.commands == ((sys.executable, f"{tmp_path}/install_gmp.py", "6.3.0", "--prefix=/opt/deps"),)
+    assert gmp.requires == frozenset()
+    assert gmp.compile
+
+    libint = packages["libint"]
+    assert libint.commands == (("echo", "libint-2.7.2"), ("echo", "6.3.0"))
+    assert libint.requires == {"gmp"}
+    assert not libint.compile
+
+
+def test_load_manifest_unknown_requires(tmp_path: Path) -> None:
+    manifest = _write_manifest(tmp_path / "deps.toml", """
+[packages.libint]
+requires = ["gmp"]
+""")
+    with pytest.raises(ValueError, match="requires unknown package"):
+        load_manifest(manifest)
+
+
+def test_load_manifest_cycle(tmp_path: Path) -> None:
+    manifest = _write_manifest(tmp_path / "deps.toml", """
+[packages.a]
+requires = ["c"]
+
+[packages.b]
+requires = ["a"]
+
+[packages.c]
+requires = ["b"]
+
+[packages.d]
+""")
+    with pytest.raises(ValueError, match=r"cycle between the following packages: \['a', 'b', 'c'\]"):
+        load_manifest(manifest)
+
+
+def test_build_all(tmp_path: Path, cleaner: Cleaner) -> None:
+    manifest = _write_manifest(tmp_path / "deps.toml", f"""
+[packages.a]
+compile = true
+commands = [{WRITE_JOBS}]
+
+[packages.b]
+compile = true
+commands = [{WRITE_JOBS}]
+
+[packages.c]
+commands = [{WRITE_JOBS}]
+
+[packages.d]
+requires = ["a", "b", "c"]
+compile = true
+commands = [
+    ["{{python}}", "-c", "import os; assert all(os.path.isfile(f'{{root}}/{{{{i}}}}.jobs') for i in 'abc')"],
+    {WRITE_JOBS},
+]
+""")
+    build_all(load_manifest(manifest), jobs=4, workdir=tmp_path / "work")
+    cleaner.close()
+    assert list((tmp_path / "work").iterdir()) == []
+
+    # The CPU budget is split between the concurrently running packages that are compiled
+    jobs = {name: (tmp_path / f"{name}.jobs").read_text() for name in "abcd"}
+    assert jobs == {"a": "2", "b": "2", "c": "1", "d": "4"}
+
+
+def test_build_all_failure(tmp_path: Path) -> None:
+    packages = {
+        "a": Package("a", [[sys.executable, "-c", "raise SystemExit(3)"]]),
+        "b": Package("b", [[sys.executable, "-c", f"open({str(tmp_path / 'b')!r}, 'w')"]], requires=["a"]),
+    }
+    with pytest.raises(subprocess.CalledProcessError) as info:
+        build_all(packages, jobs=2, workdir=tmp_path / "work")
+    assert info.value.returncode == 3
+    assert not (tmp_path / "b").exists()
+
+
+def test_build_all_invalid(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="requires unknown package"):
+        build_all({"a": Package("a", [], requires=["b"])}, jobs=1)
+    with pytest.raises(ValueError, match="must be larger than 0"):
+        build_all({}, jobs=0)
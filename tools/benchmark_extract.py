@@ -0,0 +1,82 @@
+"""Python script for benchmarking the extraction throughput (files/s) of tar archives."""
+
+from __future__ import annotations
+
+import os
+import io
+import time
+import shutil
+import tarfile
+import argparse
+import tempfile
+from collections.abc import Callable
+
+import dep_builder
+from dep_builder._extract import extract_tar, DEFAULT_WORKERS
+
+
+def create_archive(path: str, n_files: int, file_size: int = 2048) -> None:
+    """Create a ``.tar.gz`` archive with ``n_files`` small files, akin to Boost's headers."""
+    data = os.urandom(file_size)
+    with tarfile.open(path, "w:gz") as tar:
+        for i in range(n_files):
+            info = tarfile.TarInfo(f"bench/dir{i // 100:04d}/file{i:06d}.hpp")
+            info.size = file_size
+            tar.addfile(info, io.BytesIO(data))
+
+
+def extract_baseline(archive_path: str, path: str) -> None:
+    """Extract the archive the way :func:`dep_builder.unpack` did originally."""
+    abs_path = os.path.abspath(path)
+    with tarfile.open(archive_path, "r") as tar:
+        {i.split(os.sep)[0 if not i.startswith(".") else 1] for i in tar.getnames()}
+        for member in tar.getmembers():
+            member_path = os.path.abspath(os.path.join(path, member.name))
+            if os.path.commonprefix([abs_path, member_path]) != abs_path:
+                raise tarfile.TarError("Attempted path traversal in tar file")
+        tar.extractall(path)
+
+
+def run(name: str, func: Callable[[str, str], object], archive_path: str, n_files: int, repeat: int) -> None:
+    """Time ``func`` and print its best throughput in files per second."""
+    timings = []
+    for _ in range(repeat):
+        path = tempfile.mkdtemp(dir=os.getcwd())
+        try:
+            start = time.perf_counter()
+            func(archive_path, path)
+            timings.append(time.perf_counter() - start)
+        finally:
+            shutil.rmtree(path)
+    duration = min(timings)
+    print(f"{name:<24} {duration:8.3f}s {n_files / duration:12.0f} files/s")
+
+
+def main(n_files: int, workers: list[int], repeat: int = 3, archive_path: str | None = None) -> None:
+    """Run the script."""
+    with tempfile.TemporaryDirectory() as tmp:
+        if archive_path is None:
+            archive_path = os.path.join(tmp, "bench.tar.gz")
+            create_archive(archive_path, n_files)
+        else:
+            with tarfile.open(archive_path, "r") as tar:
+                n_files = sum(i.isreg() for i in tar)
+
+        run("tarfile.extractall", extract_baseline, archive_path, n_files, repeat)
+        for n in workers:
+            run(f"extract_tar(workers={n})", lambda i, j: extract_tar(i, j, workers=n), archive_path, n_files, repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(usage="python ./benchmark_extract.py -n 20000", description=__doc__)
+    parser.add_argument("--license", dest="license", action=dep_builder._argparse.LicenseAction)
+    parser.add_argument("--version", action="version", version=f"%(prog)s {dep_builder.__version__}")
+    parser.add_argument("-n", "--n-files", type=int, default=20000, dest="n_files",
+                        help="The number of files in the synthetic archive")
+    parser.add_argument("-j", "--workers", type=int, nargs="+", default=[1, DEFAULT_WORKERS],
+                        help="The number of extraction worker threads to benchmark")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="The number of repetitions")
+    parser.add_argument("--archive", default=None, help="Benchmark an existing archive instead")
+
+    args = parser.parse_args()
+    main(args.n_files, args.workers, args.repeat, args.archive)
@@ -2,13 +2,12 @@
 
 from __future__ import annotations
 
-import shutil
 import os
 import argparse
 from pathlib import Path
 
 import dep_builder
-from dep_builder import TimeLogger, download_and_unpack, parse_version
+from dep_builder import TimeLogger, download_and_unpack, parse_version, remove_tree
 
 URL_TEMPLATE = "https://boostorg.jfrog.io/artifactory/main/release/{version}/source/boost_{version_underscore}.tar.gz"
 
@@ -16,23 +15,27 @@ download_boost = TimeLogger("Download and unpack Boost")(download_and_unpack)
 parse_boost_version = TimeLogger("Parsing Boost version")(parse_version)
 
 
+def get_url(version: str) -> str:
+    """Return the URL of the Boost source archive."""
+    version_underscore = version.replace(".", "_")
+    return URL_TEMPLATE.format(version=version, version_underscore=version_underscore)
+
+
 def main(version: str, prefix: str | None = None) -> None:
     """Run the script."""
     parse_boost_version(version)
-    version_underscore = version.replace(".", "_")
-    url = URL_TEMPLATE.format(version=version, version_underscore=version_underscore)
+    url = get_url(version)
+
+    if prefix is not None:
+        # Only extract the headers, directly into the prefix
+        download_boost(url, members=["boost"], dest=os.path.join(prefix, "include"))
+        return
 
     src_path: None | Path = None
     try:
         src_path = download_boost(url)
-        if prefix is not None:
-            shutil.move(
-                os.path.join(src_path, "boost"),
-                os.path.join(prefix, "include", "boost"),
-            )
     finally:
-        if src_path is not None:
-            shutil.rmtree(src_path, ignore_errors=True)
+        remove_tree(src_path)
 
 
 if __name__ == "__main__":
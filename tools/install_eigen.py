@@ -2,13 +2,12 @@
 
 from __future__ import annotations
 
-import shutil
 import os
 import argparse
 from pathlib import Path
 
 import dep_builder
-from dep_builder import TimeLogger, download_and_unpack, parse_version
+from dep_builder import TimeLogger, download_and_unpack, parse_version, remove_tree
 
 URL_TEMPLATE = "https://gitlab.com/libeigen/eigen/-/archive/{version}/eigen-{version}.tar.gz"
 
@@ -16,22 +15,26 @@ download_eigen = TimeLogger("Download and unpack Eigen")(download_and_unpack)
 parse_eigen_version = TimeLogger("Parsing Eigen version")(parse_version)
 
 
+def get_url(version: str) -> str:
+    """Return the URL of the Eigen source archive."""
+    return URL_TEMPLATE.format(version=version)
+
+
 def main(version: str, prefix: str | None = None) -> None:
     """Run the script."""
     parse_eigen_version(version)
-    url = URL_TEMPLATE.format(version=version)
+    url = get_url(version)
+
+    if prefix is not None:
+        # Only extract the headers, directly into the prefix
+        download_eigen(url, members=["Eigen"], dest=os.path.join(prefix, "include"))
+        return
 
     src_path: None | Path = None
     try:
         src_path = download_eigen(url)
-        if prefix is not None:
-            shutil.move(
-                os.path.join(src_path, "Eigen"),
-                os.path.join(prefix, "include", "Eigen"),
-            )
     finally:
-        if src_path is not None:
-            shutil.rmtree(src_path, ignore_errors=True)
+        remove_tree(src_path)
 
 
 if __name__ == "__main__":
@@ -2,50 +2,107 @@
 
 from __future__ import annotations
 
-import shutil
 import os
 import argparse
 from pathlib import Path
 
 import dep_builder
-from dep_builder import TimeLogger, unpack, configure, read_config_log, build, parse_version
+from dep_builder import (
+    TimeLogger, unpack, configure, read_config_log, build, parse_version, remove_tree,
+    build_key, source_digest, restore_build, install_build, compiler_cache,
+    Checkpoint, logger, record_history, compile_profile, capture_output,
+)
 
 unpack_gmp = TimeLogger("Download and unpack GMP")(unpack)
 read_config_log_gmp = TimeLogger("Dumping GMP config log")(read_config_log)
-build_gmp = TimeLogger("Build GMP")(build)
-configure_gmp = TimeLogger("Configure GMP")(configure)
+build_gmp = TimeLogger("Build GMP", profile=True)(build)
+configure_gmp = TimeLogger("Configure GMP", profile=True)(configure)
 parse_gmp_version = TimeLogger("Parsing GMP version")(parse_version)
+restore_gmp = TimeLogger("Restore cached GMP build")(restore_build)
+install_gmp = TimeLogger("Install GMP")(install_build)
 
 
-def main(version: str, args: list[str]) -> None:
+def main(
+    version: str,
+    args: list[str],
+    incremental: bool = False,
+    resume: bool = False,
+    compile_report: None | str = None,
+    log_dir: None | str = None,
+) -> None:
     """Run the script."""
     parse_gmp_version(version)
 
     archive_path = Path(__file__).parent / "src" / f"gmp-{version}.tar.xz"
-    src_path: None | Path = None
-    build_path = Path(os.getcwd()) / "build"
-
-    try:
-        src_path = unpack_gmp(archive_path)
-        try:
-            config_args = ["--enable-cxx"] + args
-            configure_gmp(src_path, build_path, config_args=config_args)
-        finally:
-            read_config_log_gmp(build_path)
-        build_gmp(build_path)
-    finally:
-        shutil.rmtree(build_path, ignore_errors=True)
-        if src_path is not None:
-            shutil.rmtree(src_path, ignore_errors=True)
+    config_args = ["--enable-cxx"] + args
+    with record_history("gmp", version, config_args), capture_output(log_dir):
+        key = build_key("gmp", version, source_digest(archive_path), config_args)
+        if restore_gmp(key):
+            return
+
+        build_path = Path(os.getcwd()) / "build"
+        staging_path = Path(os.getcwd()) / "staging"
+
+        checkpoint = Checkpoint(
+            Path(os.getcwd()) / ".install_gmp.json",
+            {"version": version, "config_args": config_args},
+            resume=resume,
+        )
+        # Clear the state and directories left behind by a previous run, unless resuming from it
+        if not checkpoint.stages:
+            checkpoint.clear()
+            remove_tree(staging_path)
+            if not incremental and not resume:
+                remove_tree(build_path)
+
+        with compiler_cache(os.getcwd()), compile_profile(compile_report, os.getcwd()):
+            try:
+                src_path = checkpoint.run("unpack", unpack_gmp, archive_path)
+                try:
+                    checkpoint.run(
+                        "configure", configure_gmp, src_path, build_path,
+                        config_args=config_args, incremental=incremental or resume,
+                    )
+                finally:
+                    read_config_log_gmp(build_path)
+                checkpoint.run("build", build_gmp, build_path, destdir=staging_path)
+                checkpoint.run("install", install_gmp, key, staging_path)
+            except BaseException:
+                # Keep the state and all directories around so the pipeline can be resumed
+                logger.info("Rerun with '--resume' to continue from the first incomplete stage")
+                raise
+
+        checkpoint.clear()
+        # Keep the source and build directories around for the next incremental build
+        if not incremental:
+            remove_tree(build_path)
+            remove_tree(src_path)
+        remove_tree(staging_path)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(usage="python ./install_gmp.py 6.2.1", description=__doc__)
     parser.add_argument("--license", dest="license", action=dep_builder._argparse.LicenseAction)
     parser.add_argument("--version", action="version", version=f"%(prog)s {dep_builder.__version__}")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Reuse the source and build directories of the previous run, skipping unchanged configure steps",
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Resume from the first stage that did not complete in the previous (failed) run with identical inputs",
+    )
+    parser.add_argument(
+        "--compile-report", default=None, metavar="FILE",
+        help="Write the duration and resource usage of every compiler invocation, ranked by duration, to FILE",
+    )
+    parser.add_argument(
+        "--log-dir", default=None, metavar="DIR",
+        help="Write the output of all configure and build steps to compressed log files in DIR",
+    )
     parser.add_argument("version", help="The library version")
     parser.add_argument("args", metavar="ARGS", default=[], nargs=argparse.REMAINDER,
                         help="Arguments to pass the 'configure' file")
 
     args = parser.parse_args()
-    main(args.version, args.args)
+    main(args.version, args.args, args.incremental, args.resume, args.compile_report, args.log_dir)
@@ -2,53 +2,132 @@
 
 from __future__ import annotations
 
-import shutil
 import os
 import argparse
 from pathlib import Path
 
+from packaging.version import Version
+
 import dep_builder
-from dep_builder import TimeLogger, download_and_unpack, configure, read_config_log, build, parse_version
+from dep_builder import (
+    TimeLogger, download_and_unpack, configure, read_config_log, build, parse_version, remove_tree,
+    build_key, source_digest, restore_build, install_build, compiler_cache,
+    Checkpoint, logger, record_history, compile_profile, capture_output,
+)
 
 URL_TEMPLATE = "https://support.hdfgroup.org/ftp/HDF5/releases/hdf5-{version_short}/hdf5-{version}/src/hdf5-{version}.tar.gz"
 
 download_hdf5 = TimeLogger("Download and unpack HDF5")(download_and_unpack)
 read_config_log_hdf5 = TimeLogger("Dumping HDF5 config log")(read_config_log)
-build_hdf5 = TimeLogger("Build HDF5")(build)
-configure_hdf5 = TimeLogger("Configure HDF5")(configure)
+build_hdf5 = TimeLogger("Build HDF5", profile=True)(build)
+configure_hdf5 = TimeLogger("Configure HDF5", profile=True)(configure)
 parse_hdf5_version = TimeLogger("Parsing HDF5 version")(parse_version)
+restore_hdf5 = TimeLogger("Restore cached HDF5 build")(restore_build)
+install_hdf5 = TimeLogger("Install HDF5")(install_build)
 
 
-def main(version: str, args: list[str]) -> None:
-    """Run the script."""
-    version_obj = parse_hdf5_version(version)
+#: The default configuration arguments of every build backend.
+CONFIG_ARGS = {
+    "autotools": ["--enable-build-mode=production"],
+    "cmake": ["-DCMAKE_BUILD_TYPE=Release", "-DBUILD_TESTING=OFF", "-DHDF5_BUILD_EXAMPLES=OFF"],
+}
+
+
+def get_url(version: str) -> str:
+    """Return the URL of the HDF5 source archive."""
+    version_obj = Version(version)
     version_short = f"{version_obj.release[0]}.{version_obj.release[1]}"
-    url = URL_TEMPLATE.format(version=version, version_short=version_short)
+    return URL_TEMPLATE.format(version=version, version_short=version_short)
+
+
+def main(
+    version: str,
+    args: list[str],
+    incremental: bool = False,
+    resume: bool = False,
+    backend: str = "autotools",
+    compile_report: None | str = None,
+    log_dir: None | str = None,
+) -> None:
+    """Run the script."""
+    parse_hdf5_version(version)
+    url = get_url(version)
+
+    config_args = CONFIG_ARGS[backend] + args
+    with record_history("hdf5", version, config_args), capture_output(log_dir):
+        key = build_key("hdf5", version, source_digest(url), config_args)
+        if restore_hdf5(key):
+            return
+
+        build_path = Path(os.getcwd()) / "build"
+        staging_path = Path(os.getcwd()) / "staging"
+
+        checkpoint = Checkpoint(
+            Path(os.getcwd()) / ".install_hdf5.json",
+            {"version": version, "backend": backend, "config_args": config_args},
+            resume=resume,
+        )
+        # Clear the state and directories left behind by a previous run, unless resuming from it
+        if not checkpoint.stages:
+            checkpoint.clear()
+            remove_tree(staging_path)
+            if not incremental and not resume:
+                remove_tree(build_path)
 
-    src_path: None | Path = None
-    build_path = Path(os.getcwd()) / "build"
+        with compiler_cache(os.getcwd()), compile_profile(compile_report, os.getcwd()):
+            try:
+                src_path = checkpoint.run("download", download_hdf5, url)
+                try:
+                    checkpoint.run(
+                        "configure", configure_hdf5, src_path, build_path,
+                        config_args=config_args, incremental=incremental or resume, backend=backend,
+                    )
+                finally:
+                    read_config_log_hdf5(build_path, backend=backend)
+                checkpoint.run(
+                    "build", build_hdf5, build_path, destdir=staging_path, backend=backend,
+                )
+                checkpoint.run("install", install_hdf5, key, staging_path)
+            except BaseException:
+                # Keep the state and all directories around so the pipeline can be resumed
+                logger.info("Rerun with '--resume' to continue from the first incomplete stage")
+                raise
 
-    try:
-        src_path = download_hdf5(url)
-        try:
-            config_args = ["--enable-build-mode=production"] + args
-            configure_hdf5(src_path, build_path, config_args=config_args)
-        finally:
-            read_config_log_hdf5(build_path)
-        build_hdf5(build_path)
-    finally:
-        shutil.rmtree(build_path, ignore_errors=True)
-        if src_path is not None:
-            shutil.rmtree(src_path, ignore_errors=True)
+        checkpoint.clear()
+        # Keep the source and build directories around for the next incremental build
+        if not incremental:
+            remove_tree(build_path)
+            remove_tree(src_path)
+        remove_tree(staging_path)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(usage="python ./install_hdf5.py 12.1", description=__doc__)
     parser.add_argument("--license", dest="license", action=dep_builder._argparse.LicenseAction)
     parser.add_argument("--version", action="version", version=f"%(prog)s {dep_builder.__version__}")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Reuse the source and build directories of the previous run, skipping unchanged configure steps",
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Resume from the first stage that did not complete in the previous (failed) run with identical inputs",
+    )
+    parser.add_argument(
+        "--backend", choices=sorted(CONFIG_ARGS), default="autotools",
+        help="The build backend; 'cmake' uses Ninja if available",
+    )
+    parser.add_argument(
+        "--compile-report", default=None, metavar="FILE",
+        help="Write the duration and resource usage of every compiler invocation, ranked by duration, to FILE",
+    )
+    parser.add_argument(
+        "--log-dir", default=None, metavar="DIR",
+        help="Write the output of all configure and build steps to compressed log files in DIR",
+    )
     parser.add_argument("version", help="The library version")
     parser.add_argument("args", metavar="ARGS", default=[], nargs=argparse.REMAINDER,
-                        help="Arguments to pass the 'configure' file")
+                        help="Arguments to pass the 'configure' file (or 'cmake')")
 
     args = parser.parse_args()
-    main(args.version, args.args)
+    main(args.version, args.args, args.incremental, args.resume, args.backend, args.compile_report, args.log_dir)
@@ -2,13 +2,11 @@
 
 from __future__ import annotations
 
-import shutil
-import os
 import argparse
 from pathlib import Path
 
 import dep_builder
-from dep_builder import TimeLogger, download_and_unpack, parse_version
+from dep_builder import TimeLogger, download_and_unpack, parse_version, remove_tree
 
 URL_TEMPLATE = "https://github.com/BlueBrain/HighFive/archive/refs/tags/v{version}.tar.gz"
 
@@ -16,22 +14,26 @@ download_highfive = TimeLogger("Download and unpack HighFive")(download_and_unpa
 parse_highfive_version = TimeLogger("Parsing HighFive version")(parse_version)
 
 
+def get_url(version: str) -> str:
+    """Return the URL of the HighFive source archive."""
+    return URL_TEMPLATE.format(version=version)
+
+
 def main(version: str, prefix: str | None = None) -> None:
     """Run the script."""
     parse_highfive_version(version)
-    url = URL_TEMPLATE.format(version=version)
+    url = get_url(version)
+
+    if prefix is not None:
+        # Only extract the headers, directly into the prefix
+        download_highfive(url, members=["include/highfive"], dest=prefix)
+        return
 
     src_path: None | Path = None
     try:
         src_path = download_highfive(url)
-        if prefix is not None:
-            shutil.move(
-                os.path.join(src_path, "include", "highfive"),
-                os.path.join(prefix, "include", "highfive"),
-            )
     finally:
-        if src_path is not None:
-            shutil.rmtree(src_path, ignore_errors=True)
+        remove_tree(src_path)
 
 
 if __name__ == "__main__":
@@ -2,61 +2,143 @@
 
 from __future__ import annotations
 
-import subprocess
-import shutil
 import os
 import stat
 import argparse
 from pathlib import Path
 
 import dep_builder
-from dep_builder import TimeLogger, download_and_unpack, configure, read_config_log, build, parse_version
+from dep_builder import (
+    TimeLogger, download_and_unpack, configure, read_config_log, build, parse_version, remove_tree,
+    build_key, source_digest, restore_build, install_build, compiler_cache,
+    Checkpoint, logger, record_history, compile_profile, capture_output, autogen,
+)
 
 URL_TEMPLATE = "https://github.com/evaleev/libint/archive/refs/tags/v{version}.tar.gz"
 
+#: The estimated peak memory usage (in bytes) of a single Libint compilation job.
+MEMORY_PER_JOB = 2 * 1024**3
+
 download_libint = TimeLogger("Download and unpack Libint")(download_and_unpack)
 read_config_log_libint = TimeLogger("Dumping Libint config log")(read_config_log)
-build_libint = TimeLogger("Build Libint")(build)
-configure_libint = TimeLogger("Configure Libint")(configure)
+build_libint = TimeLogger("Build Libint", profile=True)(build)
+configure_libint = TimeLogger("Configure Libint", profile=True)(configure)
 parse_libint_version = TimeLogger("Parsing Libint version")(parse_version)
+restore_libint = TimeLogger("Restore cached Libint build")(restore_build)
+install_libint = TimeLogger("Install Libint")(install_build)
+
+
+#: The default configuration arguments of every build backend.
+CONFIG_ARGS = {
+    "autotools": ["--enable-shared=yes"],
+    "cmake": ["-DCMAKE_BUILD_TYPE=Release", "-DBUILD_SHARED_LIBS=ON"],
+}
+
+
+def get_url(version: str) -> str:
+    """Return the URL of the Libint source archive."""
+    return URL_TEMPLATE.format(version=version)
 
 
-@TimeLogger("Run Libint autogen")
-def run_autogen(src_path: str | os.PathLike[str]) -> None:
+@TimeLogger("Run Libint autogen", profile=True)
+def run_autogen(src_path: str | os.PathLike[str], source: None | str = None) -> None:
     os.chmod(os.path.join(src_path, "autogen.sh"), stat.S_IRUSR | stat.S_IXUSR)
-    subprocess.run("bash autogen.sh", shell=True, cwd=src_path, check=True)
+    autogen(src_path, "bash autogen.sh", source=source)
 
 
-def main(version: str, args: list[str]) -> None:
+def main(
+    version: str,
+    args: list[str],
+    incremental: bool = False,
+    resume: bool = False,
+    backend: str = "autotools",
+    compile_report: None | str = None,
+    log_dir: None | str = None,
+) -> None:
     """Run the script."""
     parse_libint_version(version)
-    url = URL_TEMPLATE.format(version=version)
-
-    src_path: None | Path = None
-    build_path = Path(os.getcwd()) / "build"
-
-    try:
-        src_path = download_libint(url)
-        run_autogen(src_path)
-        try:
-            config_args = ["--enable-shared=yes"] + args
-            configure_libint(src_path, build_path, config_args=config_args)
-        finally:
-            read_config_log_libint(build_path)
-        build_libint(build_path)
-    finally:
-        shutil.rmtree(build_path, ignore_errors=True)
-        if src_path is not None:
-            shutil.rmtree(src_path, ignore_errors=True)
+    url = get_url(version)
+
+    config_args = CONFIG_ARGS[backend] + args
+    with record_history("libint", version, config_args), capture_output(log_dir):
+        source = source_digest(url)
+        key = build_key("libint", version, source, config_args)
+        if restore_libint(key):
+            return
+
+        build_path = Path(os.getcwd()) / "build"
+        staging_path = Path(os.getcwd()) / "staging"
+
+        checkpoint = Checkpoint(
+            Path(os.getcwd()) / ".install_libint.json",
+            {"version": version, "backend": backend, "config_args": config_args},
+            resume=resume,
+        )
+        # Clear the state and directories left behind by a previous run, unless resuming from it
+        if not checkpoint.stages:
+            checkpoint.clear()
+            remove_tree(staging_path)
+            if not incremental and not resume:
+                remove_tree(build_path)
+
+        with compiler_cache(os.getcwd()), compile_profile(compile_report, os.getcwd()):
+            try:
+                src_path = checkpoint.run("download", download_libint, url)
+                # The CMake build does not require the autotools bootstrap
+                if backend == "autotools":
+                    checkpoint.run("autogen", run_autogen, src_path, source)
+                try:
+                    checkpoint.run(
+                        "configure", configure_libint, src_path, build_path,
+                        config_args=config_args, incremental=incremental or resume, backend=backend,
+                    )
+                finally:
+                    read_config_log_libint(build_path, backend=backend)
+                # Some of the generated Libint translation units require multiple GB of memory
+                checkpoint.run(
+                    "build", build_libint, build_path, memory_per_job=MEMORY_PER_JOB, destdir=staging_path, backend=backend,
+                )
+                checkpoint.run("install", install_libint, key, staging_path)
+            except BaseException:
+                # Keep the state and all directories around so the pipeline can be resumed
+                logger.info("Rerun with '--resume' to continue from the first incomplete stage")
+                raise
+
+        checkpoint.clear()
+        # Keep the source and build directories around for the next incremental build
+        if not incremental:
+            remove_tree(build_path)
+            remove_tree(src_path)
+        remove_tree(staging_path)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(usage="python ./install_libint.py 2.7.1", description=__doc__)
     parser.add_argument("--license", dest="license", action=dep_builder._argparse.LicenseAction)
     parser.add_argument("--version", action="version", version=f"%(prog)s {dep_builder.__version__}")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Reuse the source and build directories of the previous run, skipping unchanged configure steps",
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Resume from the first stage that did not complete in the previous (failed) run with identical inputs",
+    )
+    parser.add_argument(
+        "--backend", choices=sorted(CONFIG_ARGS), default="autotools",
+        help="The build backend; 'cmake' uses Ninja if available",
+    )
+    parser.add_argument(
+        "--compile-report", default=None, metavar="FILE",
+        help="Write the duration and resource usage of every compiler invocation, ranked by duration, to FILE",
+    )
+    parser.add_argument(
+        "--log-dir", default=None, metavar="DIR",
+        help="Write the output of all configure and build steps to compressed log files in DIR",
+    )
     parser.add_argument("version", help="The library version")
     parser.add_argument("args", metavar="ARGS", default=[], nargs=argparse.REMAINDER,
-                        help="Arguments to pass the 'configure' file")
+                        help="Arguments to pass the 'configure' file (or 'cmake')")
 
     args = parser.parse_args()
-    main(args.version, args.args)
+    main(args.version, args.args, args.incremental, args.resume, args.backend, args.compile_report, args.log_dir)
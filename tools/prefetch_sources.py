@@ -0,0 +1,47 @@
+"""Python script for concurrently downloading all dependency sources into the source cache."""
+
+from __future__ import annotations
+
+import argparse
+
+import dep_builder
+from dep_builder import TimeLogger, prefetch
+
+import install_boost
+import install_eigen
+import install_hdf5
+import install_highfive
+import install_libint
+
+GET_URL = {
+    "boost": install_boost.get_url,
+    "eigen": install_eigen.get_url,
+    "hdf5": install_hdf5.get_url,
+    "highfive": install_highfive.get_url,
+    "libint": install_libint.get_url,
+}
+
+prefetch_sources = TimeLogger("Prefetch sources")(prefetch)
+
+
+def main(versions: dict[str, str | None], max_workers: int = 4) -> None:
+    """Run the script."""
+    urls = [GET_URL[name](version) for name, version in versions.items() if version is not None]
+    prefetch_sources(urls, max_workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        usage="python ./prefetch_sources.py --boost 1.83.0 --hdf5 1.14.2", description=__doc__,
+    )
+    parser.add_argument("--license", dest="license", action=dep_builder._argparse.LicenseAction)
+    parser.add_argument("--version", action="version", version=f"%(prog)s {dep_builder.__version__}")
+    for name in GET_URL:
+        parser.add_argument(f"--{name}", metavar="VERSION", default=None, help=f"The {name} version")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=4, dest="max_workers",
+        help="The maximum number of concurrent downloads",
+    )
+
+    args = parser.parse_args()
+    main({name: getattr(args, name) for name in GET_URL}, args.max_workers)